@@ -1,3 +1,4 @@
+from .memory import memory_report, node_memory
 from .printer import ASTPrinter
 
-__all__ = ["ASTPrinter"]
+__all__ = ["ASTPrinter", "memory_report", "node_memory"]
@@ -1,12 +1,40 @@
 from abc import ABC, abstractmethod
-from typing import Any, Generic, TypeVar
+from functools import cache
+from itertools import count
+from typing import Any, Generic, TypeVar, TYPE_CHECKING
 
-from scanner.token import Token
+from scanner.token import Token, TokenType
+
+from .inline_cache import InlineCache
+
+if TYPE_CHECKING:
+    from .fused import GlobalCall, LocalAdd, LocalCompare, LocalIncrement
 
 R = TypeVar("R")
 
+# Expressions and statements draw their ids from this one counter, so every
+# node has a distinct small integer that later passes can use to index flat
+# tables rather than hashing the node itself.
+NODE_IDS = count()
+
+
+# Every field slot a node class declares or inherits, base classes first. Fused
+# nodes add slots to the node they subclass, so a class's own __slots__ only
+# tells part of the story. The id is not a field: it identifies the node
+# within this process.
+@cache
+def all_slots(cls: type) -> tuple[str, ...]:
+    return tuple(
+        slot
+        for klass in reversed(cls.__mro__)
+        for slot in getattr(klass, "__slots__", ())
+        if slot != "_id"
+    )
+
 
 class Expr(ABC):
+    __slots__ = ("_id",)
+
     class Visitor(ABC, Generic[R]):
         @abstractmethod
         def visit_assign_expr(self, expr: "Assign") -> R:
@@ -40,6 +68,14 @@ class Expr(ABC):
         def visit_set_expr(self, expr: "Set") -> R:
             raise NotImplementedError()
 
+        @abstractmethod
+        def visit_super_expr(self, expr: "Super") -> R:
+            raise NotImplementedError()
+
+        @abstractmethod
+        def visit_this_expr(self, expr: "This") -> R:
+            raise NotImplementedError()
+
         @abstractmethod
         def visit_unary_expr(self, expr: "Unary") -> R:
             raise NotImplementedError()
@@ -48,22 +84,53 @@ class Expr(ABC):
         def visit_variable_expr(self, expr: "Variable") -> R:
             raise NotImplementedError()
 
+        # Fused nodes are visited as the node they replace unless a visitor
+        # has a specialised evaluator for them.
+        def visit_global_call_expr(self, expr: "GlobalCall") -> R:
+            return self.visit_call_expr(expr)
+
+        def visit_local_add_expr(self, expr: "LocalAdd") -> R:
+            return self.visit_binary_expr(expr)
+
+        def visit_local_compare_expr(self, expr: "LocalCompare") -> R:
+            return self.visit_binary_expr(expr)
+
+        def visit_local_increment_expr(self, expr: "LocalIncrement") -> R:
+            return self.visit_assign_expr(expr)
+
     @abstractmethod
     def accept(self, visitor: Visitor[R]) -> R:
         raise NotImplementedError()
 
+    # Nodes pickle as a bare tuple of their fields. A node loaded from a cache
+    # takes a fresh id so it cannot collide with nodes parsed in this process.
+    def __getstate__(self) -> tuple:
+        return tuple(getattr(self, slot) for slot in all_slots(type(self)))
+
+    def __setstate__(self, state: tuple) -> None:
+        self._id = next(NODE_IDS)
+        for slot, value in zip(all_slots(type(self)), state):
+            setattr(self, slot, value)
+
 
 class Assign(Expr):
+    __slots__ = ("_name", "_value", "_local")
+
     def __init__(self, name: Token, value: Expr) -> None:
+        self._id = next(NODE_IDS)
         self._name = name
         self._value = value
+        self._local: tuple[int, int] | None = None
 
     def accept(self, visitor: Expr.Visitor[R]) -> R:
         return visitor.visit_assign_expr(self)
 
 
 class Binary(Expr):
+    __slots__ = ("_left", "_right", "_operator")
+
     def __init__(self, left: Expr, operator: Token, right: Expr) -> None:
+        self._id = next(NODE_IDS)
         self._left = left
         self._right = right
         self._operator = operator
@@ -73,26 +140,37 @@ class Binary(Expr):
 
 
 class Call(Expr):
+    __slots__ = ("_callee", "_paren", "_arguments", "_cache")
+
     def __init__(self, callee: Expr, paren: Token, arguments: list[Expr]) -> None:
+        self._id = next(NODE_IDS)
         self._callee = callee
         self._paren = paren
         self._arguments = arguments
+        self._cache = InlineCache()
 
     def accept(self, visitor: Expr.Visitor[R]) -> R:
         return visitor.visit_call_expr(self)
 
 
 class Get(Expr):
+    __slots__ = ("_object", "_name", "_cache")
+
     def __init__(self, obj: Expr, name: Token) -> None:
+        self._id = next(NODE_IDS)
         self._object = obj
         self._name = name
+        self._cache = InlineCache()
 
     def accept(self, visitor: Expr.Visitor[R]) -> R:
         return visitor.visit_get_expr(self)
 
 
 class Grouping(Expr):
+    __slots__ = ("_expression",)
+
     def __init__(self, expression: Expr) -> None:
+        self._id = next(NODE_IDS)
         self._expression = expression
 
     def accept(self, visitor: Expr.Visitor[R]) -> R:
@@ -100,7 +178,10 @@ class Grouping(Expr):
 
 
 class Literal(Expr):
+    __slots__ = ("_value",)
+
     def __init__(self, value: Any) -> None:
+        self._id = next(NODE_IDS)
         self._value = value
 
     def accept(self, visitor: Expr.Visitor[R]) -> R:
@@ -108,7 +189,10 @@ class Literal(Expr):
 
 
 class Logical(Expr):
+    __slots__ = ("_left", "_right", "_operator")
+
     def __init__(self, left: Expr, operator: Token, right: Expr) -> None:
+        self._id = next(NODE_IDS)
         self._left = left
         self._right = right
         self._operator = operator
@@ -118,17 +202,55 @@ class Logical(Expr):
 
 
 class Set(Expr):
+    __slots__ = ("_object", "_name", "_value", "_cache")
+
     def __init__(self, obj: Expr, name: Token, value: Expr) -> None:
+        self._id = next(NODE_IDS)
         self._object = obj
         self._name = name
         self._value = value
+        self._cache = InlineCache()
 
     def accept(self, visitor: Expr.Visitor[R]) -> R:
         return visitor.visit_set_expr(self)
 
 
+# `super.method` looks the method up on the superclass but binds it to the
+# current receiver, so the node carries a `this` of its own that the Resolver
+# resolves alongside `super`.
+class Super(Expr):
+    __slots__ = ("_keyword", "_method", "_this", "_local")
+
+    def __init__(self, keyword: Token, method: Token) -> None:
+        self._id = next(NODE_IDS)
+        self._keyword = keyword
+        self._method = method
+        self._this = This(
+            Token(TokenType.THIS, "this", None, keyword.line, keyword.start)
+        )
+        self._local: tuple[int, int] | None = None
+
+    def accept(self, visitor: Expr.Visitor[R]) -> R:
+        return visitor.visit_super_expr(self)
+
+
+class This(Expr):
+    __slots__ = ("_keyword", "_local")
+
+    def __init__(self, keyword: Token) -> None:
+        self._id = next(NODE_IDS)
+        self._keyword = keyword
+        self._local: tuple[int, int] | None = None
+
+    def accept(self, visitor: Expr.Visitor[R]) -> R:
+        return visitor.visit_this_expr(self)
+
+
 class Unary(Expr):
+    __slots__ = ("_operator", "_right")
+
     def __init__(self, operator: Token, right: Expr) -> None:
+        self._id = next(NODE_IDS)
         self._operator = operator
         self._right = right
 
@@ -137,8 +259,12 @@ class Unary(Expr):
 
 
 class Variable(Expr):
+    __slots__ = ("_name", "_local")
+
     def __init__(self, name: Token) -> None:
+        self._id = next(NODE_IDS)
         self._name = name
+        self._local: tuple[int, int] | None = None
 
     def accept(self, visitor: Expr.Visitor[R]) -> R:
         return visitor.visit_variable_expr(self)
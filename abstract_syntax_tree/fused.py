@@ -0,0 +1,85 @@
+from operator import add, eq, ge, gt, le, lt, ne, sub
+from typing import Any, Callable, TypeVar
+
+from scanner.token import TokenType
+
+from .expressions import Assign, Binary, Call, Expr
+
+R = TypeVar("R")
+
+COMPARISONS: dict[TokenType, Callable[[Any, Any], bool]] = {
+    TokenType.BANG_EQUAL: ne,
+    TokenType.EQUAL_EQUAL: eq,
+    TokenType.GREATER: gt,
+    TokenType.GREATER_EQUAL: ge,
+    TokenType.LESS: lt,
+    TokenType.LESS_EQUAL: le,
+}
+INCREMENTS: dict[TokenType, Callable[[Any, Any], Any]] = {
+    TokenType.PLUS: add,
+    TokenType.MINUS: sub,
+}
+
+
+# Superinstructions for the tree-walker: each stands in for a common shape of
+# plain nodes and is built from them once the program has been resolved. A
+# fused node subclasses the node it replaces and keeps its id and fields, so
+# anything other than a specialised evaluator sees the original node. The
+# extra fields carry the resolved (depth, slot) of the locals involved and the
+# constant operand, which the evaluators would otherwise look up every time.
+class LocalCompare(Binary):
+    __slots__ = ("_depth", "_slot", "_compare", "_constant")
+
+    def __init__(self, expr: Binary, depth: int, slot: int) -> None:
+        super().__init__(expr._left, expr._operator, expr._right)
+        self._id = expr._id
+        self._depth = depth
+        self._slot = slot
+        self._compare = COMPARISONS[expr._operator.type]
+        self._constant = expr._right._value
+
+    def accept(self, visitor: Expr.Visitor[R]) -> R:
+        return visitor.visit_local_compare_expr(self)
+
+
+class LocalIncrement(Assign):
+    __slots__ = ("_depth", "_slot", "_increment", "_constant")
+
+    def __init__(self, expr: Assign, depth: int, slot: int) -> None:
+        super().__init__(expr._name, expr._value)
+        self._id = expr._id
+        self._local = expr._local
+        self._depth = depth
+        self._slot = slot
+        self._increment = INCREMENTS[expr._value._operator.type]
+        self._constant = expr._value._right._value
+
+    def accept(self, visitor: Expr.Visitor[R]) -> R:
+        return visitor.visit_local_increment_expr(self)
+
+
+class LocalAdd(Binary):
+    __slots__ = ("_left_local", "_right_local")
+
+    def __init__(
+        self, expr: Binary, left: tuple[int, int], right: tuple[int, int]
+    ) -> None:
+        super().__init__(expr._left, expr._operator, expr._right)
+        self._id = expr._id
+        self._left_local = left
+        self._right_local = right
+
+    def accept(self, visitor: Expr.Visitor[R]) -> R:
+        return visitor.visit_local_add_expr(self)
+
+
+class GlobalCall(Call):
+    __slots__ = ()
+
+    def __init__(self, expr: Call) -> None:
+        super().__init__(expr._callee, expr._paren, expr._arguments)
+        self._id = expr._id
+        self._cache = expr._cache
+
+    def accept(self, visitor: Expr.Visitor[R]) -> R:
+        return visitor.visit_global_call_expr(self)
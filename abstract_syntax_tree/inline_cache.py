@@ -0,0 +1,39 @@
+from typing import Any, Callable
+
+POLYMORPHIC_LIMIT = 4
+
+# Never equal to a runtime value, so an empty cache can't hit by accident
+# (a call site evaluating `nil` must not match a cache whose key is None).
+EMPTY = object()
+
+
+# A per-site cache owned by a node. The most recent key and value sit in the
+# monomorphic slot, which the engines check inline with an `is` test. Misses go
+# through `miss`, which also remembers up to POLYMORPHIC_LIMIT keys so a site
+# that alternates between a few classes keeps hitting. Past that the site is
+# megamorphic and every miss is recomputed. Caches hold runtime objects, so
+# they never survive pickling; a loaded node starts with an empty cache.
+class InlineCache:
+    __slots__ = ("key", "value", "_entries")
+
+    def __init__(self) -> None:
+        self.key: Any = EMPTY
+        self.value: Any = None
+        self._entries: dict[Any, Any] | None = None
+
+    def miss(self, key: Any, compute: Callable[[Any], Any]) -> Any:
+        entries = self._entries
+        if entries is not None and key in entries:
+            value = entries[key]
+        else:
+            value = compute(key)
+            if entries is None:
+                entries = self._entries = {}
+            if len(entries) < POLYMORPHIC_LIMIT:
+                entries[key] = value
+        self.key = key
+        self.value = value
+        return value
+
+    def __reduce__(self) -> tuple:
+        return (InlineCache, ())
@@ -0,0 +1,65 @@
+from sys import getsizeof
+
+from scanner.token import Token
+
+from .expressions import Expr, all_slots
+from .inline_cache import InlineCache
+from .statements import Stmt
+
+
+class NodeMemory:
+    __slots__ = ("count", "size")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.size = 0
+
+
+# Sizes are shallow: a node is charged for itself and for the lists and inline
+# caches it owns (block bodies, arguments, parameters). Tokens are reported on
+# their own row and counted once however many nodes refer to them. Lexeme
+# strings are interned and shared, so they are left out.
+def node_memory(statements: list[Stmt]) -> dict[str, NodeMemory]:
+    usage: dict[str, NodeMemory] = {}
+    seen_tokens: set[int] = set()
+
+    def record(kind: str, size: int) -> NodeMemory:
+        memory = usage.get(kind)
+        if memory is None:
+            memory = usage[kind] = NodeMemory()
+        memory.size += size
+        return memory
+
+    def visit(value: object, owner: NodeMemory | None) -> None:
+        if isinstance(value, (Expr, Stmt)):
+            memory = record(type(value).__name__, getsizeof(value))
+            memory.count += 1
+            for slot in all_slots(type(value)):
+                visit(getattr(value, slot, None), memory)
+        elif isinstance(value, InlineCache):
+            if owner is not None:
+                owner.size += getsizeof(value)
+        elif isinstance(value, list):
+            if owner is not None:
+                owner.size += getsizeof(value)
+            for item in value:
+                visit(item, owner)
+        elif isinstance(value, Token) and id(value) not in seen_tokens:
+            seen_tokens.add(id(value))
+            record("Token", getsizeof(value)).count += 1
+
+    for statement in statements:
+        visit(statement, None)
+    return usage
+
+
+def memory_report(statements: list[Stmt], source_size: int) -> str:
+    usage = node_memory(statements)
+    lines = [f"{'node':<14}{'count':>10}{'bytes':>12}"]
+    ordered = sorted(usage.items(), key=lambda entry: entry[1].size, reverse=True)
+    for kind, memory in ordered:
+        lines.append(f"{kind:<14}{memory.count:>10,}{memory.size:>12,}")
+    total = sum(memory.size for memory in usage.values())
+    lines.append(f"{'total':<14}{'':>10}{total:>12,}")
+    lines.append(f"{'source':<14}{'':>10}{source_size:>12,}")
+    return "\n".join(lines)
@@ -10,6 +10,8 @@ from .expressions import (
     Literal,
     Logical,
     Set,
+    Super,
+    This,
     Unary,
     Variable,
 )
@@ -41,6 +43,8 @@ class ASTPrinter(Expr.Visitor[str], Stmt.Visitor[str]):
 
     def visit_class_stmt(self, stmt: Class) -> str:
         builder = f"(class {stmt._name.lexeme}"
+        if stmt._superclass is not None:
+            builder += f" < {self.print(stmt._superclass)}"
         for method in stmt._methods:
             builder += f" {self.print(method)}"
         builder += ")"
@@ -114,6 +118,12 @@ class ASTPrinter(Expr.Visitor[str], Stmt.Visitor[str]):
     def visit_set_expr(self, expr: Set) -> str:
         return self._parenthesize2("=", expr._object, expr._name.lexeme, expr._value)
 
+    def visit_super_expr(self, expr: Super) -> str:
+        return self._parenthesize2("super", expr._method.lexeme)
+
+    def visit_this_expr(self, expr: This) -> str:
+        return "this"
+
     def visit_unary_expr(self, expr: Unary) -> str:
         return self._parenthesize(expr._operator.lexeme, expr._right)
 
@@ -130,11 +140,12 @@ class ASTPrinter(Expr.Visitor[str], Stmt.Visitor[str]):
 
     def _parenthesize2(self, name: str, *parts: Any) -> str:
         builder = f"({name}"
-        builder = self._transform(builder, parts)
+        builder += self._transform(*parts)
         builder += ")"
         return builder
 
-    def _transform(self, builder: str, *parts: Any) -> str:
+    def _transform(self, *parts: Any) -> str:
+        builder = ""
         for part in parts:
             builder += " "
             match part:
@@ -142,8 +153,8 @@ class ASTPrinter(Expr.Visitor[str], Stmt.Visitor[str]):
                     builder += part.accept(self)
                 case Token():
                     builder += part.lexeme
-                case tuple():
-                    builder += self._transform(builder, *part)
+                case list() | tuple():
+                    builder += self._transform(*part)
                 case _:
                     builder += part
         return builder
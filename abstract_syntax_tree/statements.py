@@ -3,12 +3,14 @@ from typing import Generic, TypeVar
 
 from scanner.token import Token
 
-from .expressions import Expr
+from .expressions import NODE_IDS, Expr, Variable, all_slots
 
 R = TypeVar("R")
 
 
 class Stmt(ABC):
+    __slots__ = ("_id",)
+
     class Visitor(ABC, Generic[R]):
         @abstractmethod
         def visit_block_stmt(self, stmt: "Block") -> R:
@@ -50,26 +52,50 @@ class Stmt(ABC):
     def accept(self, visitor: Visitor[R]) -> R:
         raise NotImplementedError()
 
+    # Nodes pickle as a bare tuple of their fields. A node loaded from a cache
+    # takes a fresh id so it cannot collide with nodes parsed in this process.
+    def __getstate__(self) -> tuple:
+        return tuple(getattr(self, slot) for slot in all_slots(type(self)))
+
+    def __setstate__(self, state: tuple) -> None:
+        self._id = next(NODE_IDS)
+        for slot, value in zip(all_slots(type(self)), state):
+            setattr(self, slot, value)
+
 
 class Block(Stmt):
+    __slots__ = ("_statements", "_scope_size")
+
     def __init__(self, statements: list[Stmt]) -> None:
+        self._id = next(NODE_IDS)
         self._statements = statements
+        self._scope_size = 0
 
     def accept(self, visitor: Stmt.Visitor[R]) -> R:
         return visitor.visit_block_stmt(self)
 
 
 class Class(Stmt):
-    def __init__(self, name: Token, methods: list["Function"]) -> None:
+    __slots__ = ("_name", "_superclass", "_methods", "_local")
+
+    def __init__(
+        self, name: Token, superclass: Variable | None, methods: list["Function"]
+    ) -> None:
+        self._id = next(NODE_IDS)
         self._name = name
+        self._superclass = superclass
         self._methods = methods
+        self._local: tuple[int, int] | None = None
 
     def accept(self, visitor: Stmt.Visitor[R]) -> R:
         return visitor.visit_class_stmt(self)
 
 
 class Expression(Stmt):
+    __slots__ = ("_expression",)
+
     def __init__(self, expression: Expr) -> None:
+        self._id = next(NODE_IDS)
         self._expression = expression
 
     def accept(self, visitor: Stmt.Visitor[R]) -> R:
@@ -77,19 +103,27 @@ class Expression(Stmt):
 
 
 class Function(Stmt):
+    __slots__ = ("_name", "_params", "_body", "_local", "_scope_size")
+
     def __init__(self, name: Token, params: list[Token], body: list[Stmt]) -> None:
+        self._id = next(NODE_IDS)
         self._name = name
         self._params = params
         self._body = body
+        self._local: tuple[int, int] | None = None
+        self._scope_size = 0
 
     def accept(self, visitor: Stmt.Visitor[R]) -> R:
         return visitor.visit_function_stmt(self)
 
 
 class If(Stmt):
+    __slots__ = ("_condition", "_then_branch", "_else_branch")
+
     def __init__(
         self, condition: Expr, then_branch: Stmt, else_branch: Stmt | None
     ) -> None:
+        self._id = next(NODE_IDS)
         self._condition = condition
         self._then_branch = then_branch
         self._else_branch = else_branch
@@ -99,7 +133,10 @@ class If(Stmt):
 
 
 class Print(Stmt):
+    __slots__ = ("_expression",)
+
     def __init__(self, expression: Expr) -> None:
+        self._id = next(NODE_IDS)
         self._expression = expression
 
     def accept(self, visitor: Stmt.Visitor[R]) -> R:
@@ -107,7 +144,10 @@ class Print(Stmt):
 
 
 class Return(Stmt):
+    __slots__ = ("_keyword", "_value")
+
     def __init__(self, keyword: Token, value: Expr | None) -> None:
+        self._id = next(NODE_IDS)
         self._keyword = keyword
         self._value = value
 
@@ -116,16 +156,24 @@ class Return(Stmt):
 
 
 class Var(Stmt):
+    __slots__ = ("_name", "_initializer", "_local")
+
     def __init__(self, name: Token, initializer: Expr | None) -> None:
+        self._id = next(NODE_IDS)
         self._name = name
         self._initializer = initializer
+        self._local: tuple[int, int] | None = None
 
     def accept(self, visitor: Stmt.Visitor[R]) -> R:
         return visitor.visit_var_stmt(self)
 
 
 class While(Stmt):
-    def __init__(self, condition: Expr, body: Stmt) -> None:
+    __slots__ = ("_keyword", "_condition", "_body")
+
+    def __init__(self, keyword: Token, condition: Expr, body: Stmt) -> None:
+        self._id = next(NODE_IDS)
+        self._keyword = keyword
         self._condition = condition
         self._body = body
 
@@ -0,0 +1,5 @@
+from .compiler import ClosureCompiler
+from .functions import CompiledFunction
+from .interpreter import ClosureInterpreter
+
+__all__ = ["ClosureCompiler", "ClosureInterpreter", "CompiledFunction"]
@@ -0,0 +1,570 @@
+from typing import Any, Callable, TYPE_CHECKING
+
+from abstract_syntax_tree.expressions import (
+    Expr,
+    Assign,
+    Binary,
+    Call,
+    Get,
+    Grouping,
+    Literal,
+    Logical,
+    Set,
+    Super,
+    This,
+    Unary,
+    Variable,
+)
+from abstract_syntax_tree.statements import (
+    Stmt,
+    Block,
+    Class,
+    Expression,
+    Function,
+    If,
+    Print,
+    Return,
+    Var,
+    While,
+)
+from environment import LocalEnvironment
+from errors import LoxNativeError, LoxRuntimeError
+from lox_builtins import (
+    LoxBoundMethod,
+    LoxCallable,
+    LoxClass,
+    LoxInstance,
+    MemoizedFunction,
+)
+from scanner.token import Token, TokenType
+
+from .functions import NEXT, CompiledFunction
+
+if TYPE_CHECKING:
+    from .interpreter import ClosureInterpreter
+
+Closure = Callable[[Any], Any]
+
+
+class ClosureCompiler(Expr.Visitor[Closure], Stmt.Visitor[Closure]):
+    def __init__(self, interpreter: "ClosureInterpreter") -> None:
+        self._interpreter = interpreter
+        self._globals = interpreter.globals._values
+
+    def compile(self, x: Expr | Stmt) -> Closure:
+        return x.accept(self)
+
+    def compile_statements(self, statements: list[Stmt]) -> Closure:
+        executors = tuple(self.compile(statement) for statement in statements)
+        if not executors:
+            return lambda env: NEXT
+        if len(executors) == 1:
+            return executors[0]
+
+        def sequence(env: Any) -> Any:
+            for execute in executors:
+                result = execute(env)
+                if result is not NEXT:
+                    return result
+            return NEXT
+
+        return sequence
+
+    def _compile_function(
+        self, stmt: Function, is_initializer: bool = False
+    ) -> Callable[[Any], CompiledFunction]:
+        name = stmt._name
+        arity = len(stmt._params)
+        body = self.compile_statements(stmt._body)
+        size = stmt._scope_size
+        return lambda env: CompiledFunction(
+            name, arity, body, size, env, is_initializer
+        )
+
+    def _compile_local(self, depth: int, slot: int) -> Closure:
+        match depth:
+            case 0:
+                return lambda env: env._values[slot]
+            case 1:
+                return lambda env: env._enclosing._values[slot]
+            case 2:
+                return lambda env: env._enclosing._enclosing._values[slot]
+        return lambda env: env.get_at(depth, slot)
+
+    def _compile_define(self, stmt: Stmt, name: Token, value: Closure) -> Closure:
+        local = stmt._local
+        if local is not None:
+            slot = local[1]
+
+            def define_local(env: Any) -> Any:
+                env._values[slot] = value(env)
+                return NEXT
+
+            return define_local
+        values = self._globals
+        lexeme = name.lexeme
+
+        def define_global(env: Any) -> Any:
+            values[lexeme] = value(env)
+            return NEXT
+
+        return define_global
+
+    def visit_block_stmt(self, stmt: Block) -> Closure:
+        body = self.compile_statements(stmt._statements)
+        size = stmt._scope_size
+        return lambda env: body(LocalEnvironment(size, env))
+
+    def visit_class_stmt(self, stmt: Class) -> Closure:
+        name = stmt._name.lexeme
+        methods = tuple(
+            (
+                method._name.lexeme,
+                self._compile_function(method, method._name.lexeme == "init"),
+            )
+            for method in stmt._methods
+        )
+        if stmt._superclass is None:
+
+            def klass(env: Any) -> LoxClass:
+                return LoxClass(name, None, {key: make(env) for key, make in methods})
+
+            return self._compile_define(stmt, stmt._name, klass)
+        superclass = self.compile(stmt._superclass)
+        superclass_name = stmt._superclass._name
+
+        def subclass(env: Any) -> LoxClass:
+            parent = superclass(env)
+            if not isinstance(parent, LoxClass):
+                raise LoxRuntimeError(superclass_name, "Superclass must be a class.")
+            enclosing = LocalEnvironment(1, env)
+            enclosing._values[0] = parent
+            return LoxClass(
+                name, parent, {key: make(enclosing) for key, make in methods}
+            )
+
+        return self._compile_define(stmt, stmt._name, subclass)
+
+    def visit_expression_stmt(self, stmt: Expression) -> Closure:
+        evaluate = self.compile(stmt._expression)
+
+        def expression(env: Any) -> Any:
+            evaluate(env)
+            return NEXT
+
+        return expression
+
+    def visit_function_stmt(self, stmt: Function) -> Closure:
+        make = self._compile_function(stmt)
+        cache = self._interpreter.call_cache
+        if cache is None or stmt not in self._interpreter._pure:
+            return self._compile_define(stmt, stmt._name, make)
+
+        def memoized(env: Any) -> MemoizedFunction:
+            return MemoizedFunction(make(env), stmt, cache)
+
+        return self._compile_define(stmt, stmt._name, memoized)
+
+    def visit_if_stmt(self, stmt: If) -> Closure:
+        condition = self.compile(stmt._condition)
+        then_branch = self.compile(stmt._then_branch)
+        if stmt._else_branch is None:
+
+            def if_then(env: Any) -> Any:
+                value = condition(env)
+                if value is not None and value is not False:
+                    return then_branch(env)
+                return NEXT
+
+            return if_then
+        else_branch = self.compile(stmt._else_branch)
+
+        def if_then_else(env: Any) -> Any:
+            value = condition(env)
+            if value is not None and value is not False:
+                return then_branch(env)
+            return else_branch(env)
+
+        return if_then_else
+
+    def visit_print_stmt(self, stmt: Print) -> Closure:
+        evaluate = self.compile(stmt._expression)
+        interpreter = self._interpreter
+        stringify = interpreter._stringify
+
+        # The output is looked up when the statement runs, not now: a function
+        # compiled for one run of a session may print during a later run, by
+        # which time the session has given the interpreter another Output.
+        def print_(env: Any) -> Any:
+            interpreter.output.write_line(stringify(evaluate(env)))
+            return NEXT
+
+        return print_
+
+    def visit_return_stmt(self, stmt: Return) -> Closure:
+        if stmt._value is None:
+            return lambda env: None
+        return self.compile(stmt._value)
+
+    def visit_var_stmt(self, stmt: Var) -> Closure:
+        if stmt._initializer is None:
+            return self._compile_define(stmt, stmt._name, lambda env: None)
+        return self._compile_define(stmt, stmt._name, self.compile(stmt._initializer))
+
+    def visit_while_stmt(self, stmt: While) -> Closure:
+        condition = self.compile(stmt._condition)
+        body = self.compile(stmt._body)
+        interpreter = self._interpreter
+        keyword = stmt._keyword
+
+        def loop(env: Any) -> Any:
+            while (value := condition(env)) is not None and value is not False:
+                interpreter._fuel -= 1
+                if interpreter._fuel < 0:
+                    interpreter._refuel_at(keyword)
+                result = body(env)
+                if result is not NEXT:
+                    return result
+            return NEXT
+
+        return loop
+
+    def visit_assign_expr(self, expr: Assign) -> Closure:
+        value = self.compile(expr._value)
+        local = expr._local
+        if local is None:
+            values = self._globals
+            name = expr._name
+
+            def assign_global(env: Any) -> Any:
+                if name.lexeme not in values:
+                    raise LoxRuntimeError(name, f"Undefined variable '{name.lexeme}'.")
+                result = values[name.lexeme] = value(env)
+                return result
+
+            return assign_global
+        depth, slot = local
+        if depth == 0:
+
+            def assign_local(env: Any) -> Any:
+                result = env._values[slot] = value(env)
+                return result
+
+            return assign_local
+
+        def assign_enclosing(env: Any) -> Any:
+            result = value(env)
+            env.assign_at(depth, slot, result)
+            return result
+
+        return assign_enclosing
+
+    def visit_binary_expr(self, expr: Binary) -> Closure:
+        left = self.compile(expr._left)
+        right = self.compile(expr._right)
+        operator = expr._operator
+        match operator.type:
+            case TokenType.BANG_EQUAL:
+                is_equal = self._interpreter._is_equal
+                return lambda env: not is_equal(left(env), right(env))
+            case TokenType.EQUAL_EQUAL:
+                is_equal = self._interpreter._is_equal
+                return lambda env: is_equal(left(env), right(env))
+            case TokenType.GREATER:
+
+                def greater(env: Any) -> Any:
+                    a, b = left(env), right(env)
+                    if isinstance(a, float) and isinstance(b, float):
+                        return a > b
+                    raise LoxRuntimeError(operator, "Operands must be numbers.")
+
+                return greater
+            case TokenType.GREATER_EQUAL:
+
+                def greater_equal(env: Any) -> Any:
+                    a, b = left(env), right(env)
+                    if isinstance(a, float) and isinstance(b, float):
+                        return a >= b
+                    raise LoxRuntimeError(operator, "Operands must be numbers.")
+
+                return greater_equal
+            case TokenType.LESS:
+
+                def less(env: Any) -> Any:
+                    a, b = left(env), right(env)
+                    if isinstance(a, float) and isinstance(b, float):
+                        return a < b
+                    raise LoxRuntimeError(operator, "Operands must be numbers.")
+
+                return less
+            case TokenType.LESS_EQUAL:
+
+                def less_equal(env: Any) -> Any:
+                    a, b = left(env), right(env)
+                    if isinstance(a, float) and isinstance(b, float):
+                        return a <= b
+                    raise LoxRuntimeError(operator, "Operands must be numbers.")
+
+                return less_equal
+            case TokenType.MINUS:
+
+                def subtract(env: Any) -> Any:
+                    a, b = left(env), right(env)
+                    if isinstance(a, float) and isinstance(b, float):
+                        return a - b
+                    raise LoxRuntimeError(operator, "Operands must be numbers.")
+
+                return subtract
+            case TokenType.PLUS:
+                interpreter = self._interpreter
+
+                def add(env: Any) -> Any:
+                    a, b = left(env), right(env)
+                    if isinstance(a, float) and isinstance(b, float):
+                        return a + b
+                    if isinstance(a, str) and isinstance(b, str):
+                        size = len(a) + len(b)
+                        if size >= interpreter._bulk_size:
+                            interpreter._charge_at(operator, size)
+                        return a + b
+                    raise LoxRuntimeError(
+                        operator, "Operands must be two numbers or two strings."
+                    )
+
+                return add
+            case TokenType.SLASH:
+
+                def divide(env: Any) -> Any:
+                    a, b = left(env), right(env)
+                    if isinstance(a, float) and isinstance(b, float):
+                        return a / b if b else float("nan")
+                    raise LoxRuntimeError(operator, "Operands must be numbers.")
+
+                return divide
+            case TokenType.STAR:
+
+                def multiply(env: Any) -> Any:
+                    a, b = left(env), right(env)
+                    if isinstance(a, float) and isinstance(b, float):
+                        return a * b
+                    raise LoxRuntimeError(operator, "Operands must be numbers.")
+
+                return multiply
+        raise LoxRuntimeError(operator, "Unknown binary operator.")
+
+    def visit_call_expr(self, expr: Call) -> Closure:
+        if type(expr._callee) is Get:
+            return self._compile_invoke(expr, expr._callee)
+        if type(expr._callee) is Super:
+            return self._compile_super_invoke(expr, expr._callee)
+        callee = self.compile(expr._callee)
+        arguments = tuple(self.compile(argument) for argument in expr._arguments)
+        paren = expr._paren
+        interpreter = self._interpreter
+        cache = expr._cache
+
+        def call(env: Any) -> Any:
+            function = callee(env)
+            values = [argument(env) for argument in arguments]
+            if function is not cache.key:
+                _check_call(paren, function, values)
+                cache.key = function
+            try:
+                return function.call(interpreter, values)
+            except LoxNativeError as e:
+                raise LoxRuntimeError(paren, e.args[0])
+            except RecursionError:
+                raise LoxRuntimeError(paren, "Stack overflow.")
+
+        return call
+
+    # `obj.method(...)` runs the method on `obj` without binding it. A field
+    # holding a callable is called like any other value.
+    def _compile_invoke(self, expr: Call, get: Get) -> Closure:
+        obj = self.compile(get._object)
+        name = get._name
+        get_cache = get._cache
+        arguments = tuple(self.compile(argument) for argument in expr._arguments)
+        paren = expr._paren
+        interpreter = self._interpreter
+        cache = expr._cache
+
+        def invoke(env: Any) -> Any:
+            instance = obj(env)
+            if not isinstance(instance, LoxInstance):
+                raise LoxRuntimeError(name, "Only instances have properties.")
+            shape = instance._shape
+            if get_cache.key is shape:
+                found = get_cache.value
+            else:
+                found = get_cache.miss(
+                    shape, lambda shape: instance._lookup(shape, name.lexeme)
+                )
+            if type(found) is int:
+                function, receiver = instance._values[found], None
+            elif found is None:
+                raise LoxRuntimeError(name, f"Undefined property '{name.lexeme}'.")
+            else:
+                function, receiver = found, instance
+            values = [argument(env) for argument in arguments]
+            if function is not cache.key:
+                _check_call(paren, function, values)
+                cache.key = function
+            try:
+                if receiver is None:
+                    return function.call(interpreter, values)
+                return function.invoke(interpreter, receiver, values)
+            except LoxNativeError as e:
+                raise LoxRuntimeError(paren, e.args[0])
+            except RecursionError:
+                raise LoxRuntimeError(paren, "Stack overflow.")
+
+        return invoke
+
+    def _compile_super_invoke(self, expr: Call, super_: Super) -> Closure:
+        method = self._compile_super_method(super_)
+        arguments = tuple(self.compile(argument) for argument in expr._arguments)
+        paren = expr._paren
+        interpreter = self._interpreter
+        cache = expr._cache
+
+        def super_invoke(env: Any) -> Any:
+            receiver, function = method(env)
+            values = [argument(env) for argument in arguments]
+            if function is not cache.key:
+                _check_call(paren, function, values)
+                cache.key = function
+            try:
+                return function.invoke(interpreter, receiver, values)
+            except LoxNativeError as e:
+                raise LoxRuntimeError(paren, e.args[0])
+            except RecursionError:
+                raise LoxRuntimeError(paren, "Stack overflow.")
+
+        return super_invoke
+
+    def _compile_super_method(self, expr: Super) -> Closure:
+        superclass = self._compile_local(*expr._local)
+        this = self._compile_local(*expr._this._local)
+        name = expr._method
+
+        def super_method(env: Any) -> tuple[Any, Any]:
+            method = superclass(env).find_method(name.lexeme)
+            if method is None:
+                raise LoxRuntimeError(name, f"Undefined property '{name.lexeme}'.")
+            return this(env), method
+
+        return super_method
+
+    def visit_get_expr(self, expr: Get) -> Closure:
+        obj = self.compile(expr._object)
+        name = expr._name
+        cache = expr._cache
+
+        def get(env: Any) -> Any:
+            instance = obj(env)
+            if isinstance(instance, LoxInstance):
+                if cache.key is instance._shape and type(cache.value) is int:
+                    return instance._values[cache.value]
+                return instance.get(name, cache)
+            raise LoxRuntimeError(name, "Only instances have properties.")
+
+        return get
+
+    def visit_grouping_expr(self, expr: Grouping) -> Closure:
+        return self.compile(expr._expression)
+
+    def visit_literal_expr(self, expr: Literal) -> Closure:
+        value = expr._value
+        return lambda env: value
+
+    def visit_logical_expr(self, expr: Logical) -> Closure:
+        left = self.compile(expr._left)
+        right = self.compile(expr._right)
+        if expr._operator.type == TokenType.OR:
+
+            def logical_or(env: Any) -> Any:
+                value = left(env)
+                if value is not None and value is not False:
+                    return value
+                return right(env)
+
+            return logical_or
+
+        def logical_and(env: Any) -> Any:
+            value = left(env)
+            if value is None or value is False:
+                return value
+            return right(env)
+
+        return logical_and
+
+    def visit_set_expr(self, expr: Set) -> Closure:
+        obj = self.compile(expr._object)
+        value = self.compile(expr._value)
+        name = expr._name
+        cache = expr._cache
+
+        def set_(env: Any) -> Any:
+            instance = obj(env)
+            if not isinstance(instance, LoxInstance):
+                raise LoxRuntimeError(name, "Only instances have fields.")
+            result = value(env)
+            if cache.key is instance._shape and cache.value[1] is instance._shape:
+                instance._values[cache.value[0]] = result
+            else:
+                instance.set(name, result, cache)
+            return result
+
+        return set_
+
+    def visit_super_expr(self, expr: Super) -> Closure:
+        method = self._compile_super_method(expr)
+        return lambda env: LoxBoundMethod(*method(env))
+
+    def visit_this_expr(self, expr: This) -> Closure:
+        return self._compile_local(*expr._local)
+
+    def visit_unary_expr(self, expr: Unary) -> Closure:
+        right = self.compile(expr._right)
+        operator = expr._operator
+        if operator.type == TokenType.BANG:
+
+            def not_(env: Any) -> Any:
+                value = right(env)
+                return value is None or value is False
+
+            return not_
+
+        def negate(env: Any) -> Any:
+            value = right(env)
+            if isinstance(value, float):
+                return -value
+            raise LoxRuntimeError(operator, "Operand must be a number.")
+
+        return negate
+
+    def visit_variable_expr(self, expr: Variable) -> Closure:
+        local = expr._local
+        if local is None:
+            values = self._globals
+            name = expr._name
+
+            def global_variable(env: Any) -> Any:
+                try:
+                    return values[name.lexeme]
+                except KeyError:
+                    raise LoxRuntimeError(name, f"Undefined variable '{name.lexeme}'.")
+
+            return global_variable
+        return self._compile_local(*local)
+
+
+def _check_call(paren: Token, function: Any, arguments: list[Any]) -> None:
+    if not isinstance(function, LoxCallable):
+        raise LoxRuntimeError(paren, "Can only call functions and classes.")
+    if len(arguments) != function.arity():
+        raise LoxRuntimeError(
+            paren,
+            f"Expected {function.arity()} arguments but got {len(arguments)}.",
+        )
@@ -0,0 +1,71 @@
+from typing import Any, Callable, TYPE_CHECKING
+
+from environment import Environment, LocalEnvironment
+from lox_builtins import LoxCallable
+from scanner.token import Token
+
+if TYPE_CHECKING:
+    from interpreter import Interpreter
+
+# Sentinel returned by compiled statements that complete without a `return`.
+NEXT = object()
+
+
+class CompiledFunction(LoxCallable):
+    def __init__(
+        self,
+        name: Token,
+        arity: int,
+        body: Callable[[LocalEnvironment], Any],
+        scope_size: int,
+        closure: Environment | LocalEnvironment,
+        is_initializer: bool = False,
+    ) -> None:
+        self._name = name
+        self._arity = arity
+        self._body = body
+        self._scope_size = scope_size
+        self._closure = closure
+        self._is_initializer = is_initializer
+
+    def arity(self) -> int:
+        return self._arity
+
+    def call(self, interpreter: "Interpreter", arguments: list[Any]) -> Any:
+        interpreter._fuel -= 1
+        if interpreter._fuel < 0:
+            interpreter._refuel()
+        if interpreter._depth >= interpreter._max_depth:
+            raise interpreter._too_deep()
+        environment = LocalEnvironment(self._scope_size, self._closure)
+        environment._values[: len(arguments)] = arguments
+        interpreter._depth += 1
+        try:
+            result = self._body(environment)
+        finally:
+            interpreter._depth -= 1
+        return None if result is NEXT else result
+
+    def invoke(
+        self, interpreter: "Interpreter", receiver: Any, arguments: list[Any]
+    ) -> Any:
+        interpreter._fuel -= 1
+        if interpreter._fuel < 0:
+            interpreter._refuel()
+        if interpreter._depth >= interpreter._max_depth:
+            raise interpreter._too_deep()
+        environment = LocalEnvironment(self._scope_size, self._closure)
+        values = environment._values
+        values[: len(arguments)] = arguments
+        values[len(arguments)] = receiver
+        interpreter._depth += 1
+        try:
+            result = self._body(environment)
+        finally:
+            interpreter._depth -= 1
+        if self._is_initializer:
+            return receiver
+        return None if result is NEXT else result
+
+    def __repr__(self) -> str:
+        return f"<fn {self._name.lexeme}>"
@@ -0,0 +1,17 @@
+from abstract_syntax_tree.statements import Stmt
+from errors import LoxRuntimeError
+from interpreter import Interpreter
+
+from .compiler import ClosureCompiler
+
+
+class ClosureInterpreter(Interpreter):
+    def interpret(self, statements: list[Stmt]) -> None:
+        program = ClosureCompiler(self).compile_statements(statements)
+        try:
+            program(self.globals)
+        except LoxRuntimeError as e:
+            self.output.flush()
+            self.diagnostics.runtime_error(e)
+        finally:
+            self.output.flush()
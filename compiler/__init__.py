@@ -0,0 +1,5 @@
+from .chunk import Chunk, OpCode
+from .compiler import Compiler
+from .function import FunctionProto
+
+__all__ = ["Chunk", "Compiler", "FunctionProto", "OpCode"]
@@ -0,0 +1,92 @@
+from array import array
+from bisect import bisect_right
+from enum import IntEnum, auto
+from typing import Any
+
+from abstract_syntax_tree.inline_cache import InlineCache
+from scanner.token import Token, TokenType
+
+
+class OpCode(IntEnum):
+    CONSTANT = 0
+    NIL = auto()
+    TRUE = auto()
+    FALSE = auto()
+    POP = auto()
+    GET_LOCAL = auto()
+    SET_LOCAL = auto()
+    GET_GLOBAL = auto()
+    DEFINE_GLOBAL = auto()
+    SET_GLOBAL = auto()
+    GET_UPVALUE = auto()
+    SET_UPVALUE = auto()
+    GET_PROPERTY = auto()
+    SET_PROPERTY = auto()
+    EQUAL = auto()
+    NOT_EQUAL = auto()
+    GREATER = auto()
+    GREATER_EQUAL = auto()
+    LESS = auto()
+    LESS_EQUAL = auto()
+    ADD = auto()
+    SUBTRACT = auto()
+    MULTIPLY = auto()
+    DIVIDE = auto()
+    NOT = auto()
+    NEGATE = auto()
+    PRINT = auto()
+    JUMP = auto()
+    JUMP_IF_FALSE = auto()
+    LOOP = auto()
+    CALL = auto()
+    CLOSURE = auto()
+    CLOSE_UPVALUE = auto()
+    RETURN = auto()
+    CLASS = auto()
+    METHOD = auto()
+    INHERIT = auto()
+    GET_SUPER = auto()
+    INVOKE = auto()
+    SUPER_INVOKE = auto()
+
+
+class Chunk:
+    def __init__(self) -> None:
+        self.code = array("B")
+        self.constants: list[Any] = []
+        # Run-length encoded position table: the instructions from `_starts[i]`
+        # on come from line `_lines[i]`, at source offset `_offsets[i]` when
+        # the scanner recorded one.
+        self._starts = array("I")
+        self._lines = array("I")
+        self._offsets: list[int | None] = []
+        self._constant_indexes: dict[tuple[type, str], int] = {}
+        # One inline cache per property instruction, addressed by an operand.
+        self.caches: list[InlineCache] = []
+
+    def write(self, byte: int, line: int, offset: int | None = None) -> None:
+        if not self._lines or self._lines[-1] != line or self._offsets[-1] != offset:
+            self._starts.append(len(self.code))
+            self._lines.append(line)
+            self._offsets.append(offset)
+        self.code.append(byte)
+
+    def add_constant(self, value: Any) -> int:
+        if isinstance(value, (str, float)):
+            key = (type(value), repr(value))
+            index = self._constant_indexes.get(key)
+            if index is None:
+                index = self._constant_indexes[key] = len(self.constants)
+                self.constants.append(value)
+            return index
+        self.constants.append(value)
+        return len(self.constants) - 1
+
+    def add_cache(self) -> int:
+        self.caches.append(InlineCache())
+        return len(self.caches) - 1
+
+    # A token standing in for the one the instruction at `index` came from.
+    def token_at(self, index: int) -> Token:
+        run = bisect_right(self._starts, index) - 1
+        return Token(TokenType.EOF, "", None, self._lines[run], self._offsets[run])
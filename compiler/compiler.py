@@ -0,0 +1,446 @@
+from enum import auto, Enum
+from typing import Optional
+
+from abstract_syntax_tree.expressions import (
+    Expr,
+    Assign,
+    Binary,
+    Call,
+    Get,
+    Grouping,
+    Literal,
+    Logical,
+    Set,
+    Super,
+    This,
+    Unary,
+    Variable,
+)
+from abstract_syntax_tree.statements import (
+    Stmt,
+    Block,
+    Class,
+    Expression,
+    Function,
+    If,
+    Print,
+    Return,
+    Var,
+    While,
+)
+from errors import Diagnostics, ErrorHandler, Phase
+from scanner.token import Token, TokenType
+
+from .chunk import OpCode
+from .function import FunctionProto
+
+UINT8_COUNT = 256
+UINT16_MAX = 65535
+
+
+class Compiler(Expr.Visitor[None], Stmt.Visitor[None]):
+    class FunctionType(Enum):
+        SCRIPT = auto()
+        FUNCTION = auto()
+        INITIALIZER = auto()
+        METHOD = auto()
+
+    class Local:
+        __slots__ = ("name", "depth", "is_captured")
+
+        def __init__(self, name: str, depth: int) -> None:
+            self.name = name
+            self.depth = depth
+            self.is_captured = False
+
+    class State:
+        def __init__(
+            self,
+            enclosing: Optional["Compiler.State"],
+            function: FunctionProto,
+            f_type: "Compiler.FunctionType",
+        ) -> None:
+            self.enclosing = enclosing
+            self.function = function
+            self.type = f_type
+            # Slot zero holds the callee itself, or the receiver in a method,
+            # as in clox.
+            receiver = f_type in (
+                Compiler.FunctionType.METHOD,
+                Compiler.FunctionType.INITIALIZER,
+            )
+            self.locals = [Compiler.Local("this" if receiver else "", 0)]
+            self.upvalues: list[tuple[int, bool]] = []
+            self.scope_depth = 0
+
+    binary_opcodes = {
+        TokenType.BANG_EQUAL: OpCode.NOT_EQUAL,
+        TokenType.EQUAL_EQUAL: OpCode.EQUAL,
+        TokenType.GREATER: OpCode.GREATER,
+        TokenType.GREATER_EQUAL: OpCode.GREATER_EQUAL,
+        TokenType.LESS: OpCode.LESS,
+        TokenType.LESS_EQUAL: OpCode.LESS_EQUAL,
+        TokenType.MINUS: OpCode.SUBTRACT,
+        TokenType.PLUS: OpCode.ADD,
+        TokenType.SLASH: OpCode.DIVIDE,
+        TokenType.STAR: OpCode.MULTIPLY,
+    }
+
+    def __init__(self, diagnostics: Diagnostics | None = None) -> None:
+        self._diagnostics = diagnostics or ErrorHandler.diagnostics
+        self._state = Compiler.State(
+            None, FunctionProto(None), Compiler.FunctionType.SCRIPT
+        )
+        # The token the instructions being emitted come from, for positions.
+        self._token = Token(TokenType.EOF, "", None, 1)
+
+    def compile(self, statements: list[Stmt]) -> FunctionProto:
+        for statement in statements:
+            self._compile(statement)
+        return self._end_function()
+
+    def _compile(self, x: Expr | Stmt) -> None:
+        x.accept(self)
+
+    def _error(self, message: str) -> None:
+        token = self._token
+        self._diagnostics.error(Phase.COMPILE, token.line, message, token.start)
+
+    def _emit(self, *data: int) -> None:
+        chunk = self._state.function.chunk
+        token = self._token
+        for byte in data:
+            chunk.write(byte, token.line, token.start)
+
+    def _emit_short(self, op: OpCode, operand: int) -> None:
+        self._emit(op, (operand >> 8) & 0xFF, operand & 0xFF)
+
+    def _make_constant(self, value: object) -> int:
+        constant = self._state.function.chunk.add_constant(value)
+        if constant > UINT16_MAX:
+            self._error("Too many constants in one chunk.")
+            return 0
+        return constant
+
+    # Property instructions carry the name constant followed by the index of
+    # the instruction's inline cache. INVOKE adds the argument count.
+    def _emit_property(self, op: OpCode, name: str, *operands: int) -> None:
+        self._emit_short(op, self._make_constant(name))
+        cache = self._state.function.chunk.add_cache()
+        if cache > UINT16_MAX:
+            self._error("Too many property accesses in one chunk.")
+            cache = 0
+        self._emit((cache >> 8) & 0xFF, cache & 0xFF, *operands)
+
+    def _emit_constant(self, value: object) -> None:
+        self._emit_short(OpCode.CONSTANT, self._make_constant(value))
+
+    def _emit_jump(self, op: OpCode) -> int:
+        self._emit(op, 0xFF, 0xFF)
+        return len(self._state.function.chunk.code) - 2
+
+    def _patch_jump(self, offset: int) -> None:
+        code = self._state.function.chunk.code
+        jump = len(code) - offset - 2
+        if jump > UINT16_MAX:
+            self._error("Too much code to jump over.")
+        code[offset] = (jump >> 8) & 0xFF
+        code[offset + 1] = jump & 0xFF
+
+    def _emit_loop(self, loop_start: int) -> None:
+        offset = len(self._state.function.chunk.code) - loop_start + 3
+        if offset > UINT16_MAX:
+            self._error("Loop body too large.")
+        self._emit_short(OpCode.LOOP, offset)
+
+    def _emit_return(self) -> None:
+        if self._state.type == Compiler.FunctionType.INITIALIZER:
+            self._emit(OpCode.GET_LOCAL, 0, OpCode.RETURN)
+        else:
+            self._emit(OpCode.NIL, OpCode.RETURN)
+
+    def _end_function(self) -> FunctionProto:
+        self._emit_return()
+        function = self._state.function
+        function.upvalue_count = len(self._state.upvalues)
+        return function
+
+    def _begin_scope(self) -> None:
+        self._state.scope_depth += 1
+
+    def _end_scope(self) -> None:
+        state = self._state
+        state.scope_depth -= 1
+        while state.locals and state.locals[-1].depth > state.scope_depth:
+            if state.locals.pop().is_captured:
+                self._emit(OpCode.CLOSE_UPVALUE)
+            else:
+                self._emit(OpCode.POP)
+
+    def _declare(self, name: Token) -> None:
+        if self._state.scope_depth == 0:
+            return
+        if len(self._state.locals) == UINT8_COUNT:
+            self._error("Too many local variables in function.")
+            return
+        self._state.locals.append(Compiler.Local(name.lexeme, -1))
+
+    def _define(self, name: Token) -> None:
+        if self._state.scope_depth == 0:
+            self._emit_short(OpCode.DEFINE_GLOBAL, self._make_constant(name.lexeme))
+            return
+        self._state.locals[-1].depth = self._state.scope_depth
+
+    def _resolve_local(self, state: "Compiler.State", name: str) -> int:
+        for i in range(len(state.locals) - 1, -1, -1):
+            if state.locals[i].name == name:
+                return i
+        return -1
+
+    def _add_upvalue(self, state: "Compiler.State", index: int, is_local: bool) -> int:
+        upvalue = (index, is_local)
+        if upvalue in state.upvalues:
+            return state.upvalues.index(upvalue)
+        if len(state.upvalues) == UINT8_COUNT:
+            self._error("Too many closure variables in function.")
+            return 0
+        state.upvalues.append(upvalue)
+        return len(state.upvalues) - 1
+
+    def _resolve_upvalue(self, state: "Compiler.State", name: str) -> int:
+        if state.enclosing is None:
+            return -1
+        local = self._resolve_local(state.enclosing, name)
+        if local != -1:
+            state.enclosing.locals[local].is_captured = True
+            return self._add_upvalue(state, local, True)
+        upvalue = self._resolve_upvalue(state.enclosing, name)
+        if upvalue != -1:
+            return self._add_upvalue(state, upvalue, False)
+        return -1
+
+    def _named_variable(self, name: Token, assign: Expr | None) -> None:
+        self._token = name
+        arg = self._resolve_local(self._state, name.lexeme)
+        if arg != -1:
+            get_op, set_op = OpCode.GET_LOCAL, OpCode.SET_LOCAL
+        elif (arg := self._resolve_upvalue(self._state, name.lexeme)) != -1:
+            get_op, set_op = OpCode.GET_UPVALUE, OpCode.SET_UPVALUE
+        else:
+            arg = self._make_constant(name.lexeme)
+            if assign is not None:
+                self._compile(assign)
+                self._token = name
+                self._emit_short(OpCode.SET_GLOBAL, arg)
+            else:
+                self._emit_short(OpCode.GET_GLOBAL, arg)
+            return
+        if assign is not None:
+            self._compile(assign)
+            self._token = name
+            self._emit(set_op, arg)
+        else:
+            self._emit(get_op, arg)
+
+    def _function(self, stmt: Function, f_type: "Compiler.FunctionType") -> None:
+        self._state = Compiler.State(
+            self._state, FunctionProto(stmt._name.lexeme), f_type
+        )
+        self._begin_scope()
+        self._state.function.arity = len(stmt._params)
+        for param in stmt._params:
+            self._declare(param)
+            self._define(param)
+        for statement in stmt._body:
+            self._compile(statement)
+        self._token = stmt._name
+        state = self._state
+        function = self._end_function()
+        self._state = state.enclosing
+        self._emit_short(OpCode.CLOSURE, self._make_constant(function))
+        for index, is_local in state.upvalues:
+            self._emit(1 if is_local else 0, index)
+
+    def visit_block_stmt(self, stmt: Block) -> None:
+        self._begin_scope()
+        for statement in stmt._statements:
+            self._compile(statement)
+        self._end_scope()
+
+    def visit_class_stmt(self, stmt: Class) -> None:
+        self._token = stmt._name
+        name_constant = self._make_constant(stmt._name.lexeme)
+        self._declare(stmt._name)
+        self._emit_short(OpCode.CLASS, name_constant)
+        self._define(stmt._name)
+        superclass = stmt._superclass
+        if superclass is not None:
+            self._named_variable(superclass._name, None)
+            self._begin_scope()
+            self._state.locals.append(Compiler.Local("super", self._state.scope_depth))
+            self._named_variable(stmt._name, None)
+            self._token = superclass._name
+            self._emit(OpCode.INHERIT)
+        self._named_variable(stmt._name, None)
+        for method in stmt._methods:
+            f_type = Compiler.FunctionType.METHOD
+            if method._name.lexeme == "init":
+                f_type = Compiler.FunctionType.INITIALIZER
+            self._function(method, f_type)
+            self._emit_short(OpCode.METHOD, self._make_constant(method._name.lexeme))
+        self._emit(OpCode.POP)
+        if superclass is not None:
+            self._end_scope()
+
+    def visit_expression_stmt(self, stmt: Expression) -> None:
+        self._compile(stmt._expression)
+        self._emit(OpCode.POP)
+
+    def visit_function_stmt(self, stmt: Function) -> None:
+        self._declare(stmt._name)
+        if self._state.scope_depth > 0:
+            # A local function may refer to itself recursively.
+            self._state.locals[-1].depth = self._state.scope_depth
+        self._function(stmt, Compiler.FunctionType.FUNCTION)
+        self._define(stmt._name)
+
+    def visit_if_stmt(self, stmt: If) -> None:
+        self._compile(stmt._condition)
+        then_jump = self._emit_jump(OpCode.JUMP_IF_FALSE)
+        self._emit(OpCode.POP)
+        self._compile(stmt._then_branch)
+        else_jump = self._emit_jump(OpCode.JUMP)
+        self._patch_jump(then_jump)
+        self._emit(OpCode.POP)
+        if stmt._else_branch is not None:
+            self._compile(stmt._else_branch)
+        self._patch_jump(else_jump)
+
+    def visit_print_stmt(self, stmt: Print) -> None:
+        self._compile(stmt._expression)
+        self._emit(OpCode.PRINT)
+
+    def visit_return_stmt(self, stmt: Return) -> None:
+        self._token = stmt._keyword
+        if stmt._value is None:
+            self._emit_return()
+        else:
+            self._compile(stmt._value)
+            self._emit(OpCode.RETURN)
+
+    def visit_var_stmt(self, stmt: Var) -> None:
+        self._token = stmt._name
+        self._declare(stmt._name)
+        if stmt._initializer is not None:
+            self._compile(stmt._initializer)
+        else:
+            self._emit(OpCode.NIL)
+        self._token = stmt._name
+        self._define(stmt._name)
+
+    def visit_while_stmt(self, stmt: While) -> None:
+        loop_start = len(self._state.function.chunk.code)
+        self._compile(stmt._condition)
+        exit_jump = self._emit_jump(OpCode.JUMP_IF_FALSE)
+        self._emit(OpCode.POP)
+        self._compile(stmt._body)
+        self._token = stmt._keyword
+        self._emit_loop(loop_start)
+        self._patch_jump(exit_jump)
+        self._emit(OpCode.POP)
+
+    def visit_assign_expr(self, expr: Assign) -> None:
+        self._named_variable(expr._name, expr._value)
+
+    def visit_binary_expr(self, expr: Binary) -> None:
+        self._compile(expr._left)
+        self._compile(expr._right)
+        self._token = expr._operator
+        self._emit(Compiler.binary_opcodes[expr._operator.type])
+
+    # `obj.method(...)` and `super.method(...)` compile to a single invoke
+    # instruction so the VM never builds a bound method for them.
+    def visit_call_expr(self, expr: Call) -> None:
+        callee = expr._callee
+        if isinstance(callee, Get):
+            self._compile(callee._object)
+        elif isinstance(callee, Super):
+            self._named_variable(callee._this._keyword, None)
+        else:
+            self._compile(callee)
+        for argument in expr._arguments:
+            self._compile(argument)
+        argc = len(expr._arguments)
+        if isinstance(callee, Get):
+            self._token = callee._name
+            self._emit_property(OpCode.INVOKE, callee._name.lexeme, argc)
+        elif isinstance(callee, Super):
+            self._named_variable(callee._keyword, None)
+            self._token = callee._method
+            self._emit_short(
+                OpCode.SUPER_INVOKE, self._make_constant(callee._method.lexeme)
+            )
+            self._emit(argc)
+        else:
+            self._token = expr._paren
+            self._emit(OpCode.CALL, argc)
+
+    def visit_get_expr(self, expr: Get) -> None:
+        self._compile(expr._object)
+        self._token = expr._name
+        self._emit_property(OpCode.GET_PROPERTY, expr._name.lexeme)
+
+    def visit_grouping_expr(self, expr: Grouping) -> None:
+        self._compile(expr._expression)
+
+    def visit_literal_expr(self, expr: Literal) -> None:
+        match expr._value:
+            case None:
+                self._emit(OpCode.NIL)
+            case True:
+                self._emit(OpCode.TRUE)
+            case False:
+                self._emit(OpCode.FALSE)
+            case _:
+                self._emit_constant(expr._value)
+
+    def visit_logical_expr(self, expr: Logical) -> None:
+        self._compile(expr._left)
+        if expr._operator.type == TokenType.OR:
+            else_jump = self._emit_jump(OpCode.JUMP_IF_FALSE)
+            end_jump = self._emit_jump(OpCode.JUMP)
+            self._patch_jump(else_jump)
+            self._emit(OpCode.POP)
+            self._compile(expr._right)
+            self._patch_jump(end_jump)
+        else:
+            end_jump = self._emit_jump(OpCode.JUMP_IF_FALSE)
+            self._emit(OpCode.POP)
+            self._compile(expr._right)
+            self._patch_jump(end_jump)
+
+    def visit_set_expr(self, expr: Set) -> None:
+        self._compile(expr._object)
+        self._compile(expr._value)
+        self._token = expr._name
+        self._emit_property(OpCode.SET_PROPERTY, expr._name.lexeme)
+
+    def visit_super_expr(self, expr: Super) -> None:
+        self._named_variable(expr._this._keyword, None)
+        self._named_variable(expr._keyword, None)
+        self._token = expr._method
+        self._emit_short(OpCode.GET_SUPER, self._make_constant(expr._method.lexeme))
+
+    def visit_this_expr(self, expr: This) -> None:
+        self._named_variable(expr._keyword, None)
+
+    def visit_unary_expr(self, expr: Unary) -> None:
+        self._compile(expr._right)
+        self._token = expr._operator
+        if expr._operator.type == TokenType.BANG:
+            self._emit(OpCode.NOT)
+        else:
+            self._emit(OpCode.NEGATE)
+
+    def visit_variable_expr(self, expr: Variable) -> None:
+        self._named_variable(expr._name, None)
@@ -0,0 +1,14 @@
+from .chunk import Chunk
+
+
+class FunctionProto:
+    __slots__ = ("name", "arity", "upvalue_count", "chunk")
+
+    def __init__(self, name: str | None) -> None:
+        self.name = name
+        self.arity = 0
+        self.upvalue_count = 0
+        self.chunk = Chunk()
+
+    def __repr__(self) -> str:
+        return "<script>" if self.name is None else f"<fn {self.name}>"
@@ -1,3 +1,3 @@
-from .environment import Environment
+from .environment import Environment, LocalEnvironment
 
-__all__ = ["Environment"]
+__all__ = ["Environment", "LocalEnvironment"]
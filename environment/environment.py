@@ -1,4 +1,4 @@
-from typing import Any, Optional
+from typing import Any, Optional, Union
 
 from errors import LoxRuntimeError
 from scanner.token import Token
@@ -28,18 +28,39 @@ class Environment:
     def define(self, name: str, value: Any) -> None:
         self._values.update({name: value})
 
-    def ancestor(self, distance: int) -> "Environment":
-        environment: Environment = self
-        for _ in range(distance):
-            if environment._enclosing:
-                environment = environment._enclosing
+    def __repr__(self) -> str:
+        return f"values: {self._values}\nenclosing environment: {self._enclosing}"
+
+
+class LocalEnvironment:
+    __slots__ = ("_values", "_enclosing")
+
+    def __init__(
+        self, size: int, enclosing: Union["LocalEnvironment", Environment]
+    ) -> None:
+        self._values: list[Any] = [None] * size
+        self._enclosing = enclosing
+
+    def ancestor(self, distance: int) -> "LocalEnvironment":
+        environment = self
+        while distance:
+            environment = environment._enclosing
+            distance -= 1
         return environment
 
-    def get_at(self, distance: int, name: str) -> Any:
-        return self.ancestor(distance)._values.get(name)
+    def get_at(self, distance: int, slot: int) -> Any:
+        environment = self
+        while distance:
+            environment = environment._enclosing
+            distance -= 1
+        return environment._values[slot]
 
-    def assign_at(self, distance: int, name: Token, value: Any) -> None:
-        self.ancestor(distance)._values.update({name.lexeme: value})
+    def assign_at(self, distance: int, slot: int, value: Any) -> None:
+        environment = self
+        while distance:
+            environment = environment._enclosing
+            distance -= 1
+        environment._values[slot] = value
 
     def __repr__(self) -> str:
-        return f"values: {self._values}\nenclosing environment: {self._enclosing}"
+        return f"slots: {self._values}\nenclosing environment: {self._enclosing}"
@@ -1,4 +1,13 @@
+from .diagnostics import Diagnostic, Diagnostics, Phase
 from .error_handler import ErrorHandler
-from .errors import LoxParseError, LoxRuntimeError, LoxReturn
+from .errors import LoxNativeError, LoxParseError, LoxRuntimeError
 
-__all__ = ["ErrorHandler", "LoxParseError", "LoxRuntimeError", "LoxReturn"]
+__all__ = [
+    "Diagnostic",
+    "Diagnostics",
+    "ErrorHandler",
+    "LoxNativeError",
+    "LoxParseError",
+    "LoxRuntimeError",
+    "Phase",
+]
@@ -0,0 +1,100 @@
+import sys
+
+from dataclasses import dataclass
+from enum import Enum
+
+from scanner.token import Token, TokenType
+
+from .errors import LoxRuntimeError
+
+
+class Phase(str, Enum):
+    SCAN = "scan"
+    PARSE = "parse"
+    RESOLVE = "resolve"
+    COMPILE = "compile"
+    RUNTIME = "runtime"
+
+
+# Columns count from 1 and are only known when the offset of the error and the
+# source text are both available.
+@dataclass
+class Diagnostic:
+    phase: Phase
+    line: int
+    column: int | None
+    message: str
+    where: str = ""
+
+    def __str__(self) -> str:
+        if self.phase == Phase.RUNTIME:
+            return f"{self.message}\n[line {self.line}]"
+        return f"[line {self.line}] Error{self.where}: {self.message}"
+
+
+# Collects the errors of one run, from scanning through to execution. Each
+# pipeline stage is handed the same object, so separate runs never see each
+# other's errors. With `echo` on, every diagnostic is also printed as it is
+# reported: static errors to stderr and runtime errors to stdout.
+class Diagnostics:
+    def __init__(self, source: str | None = None, echo: bool = True) -> None:
+        self.source = source
+        self._echo = echo
+        self.items: list[Diagnostic] = []
+        self.had_error = False
+        self.had_runtime_error = False
+
+    def error(
+        self,
+        phase: Phase,
+        identifier: int | Token,
+        message: str,
+        offset: int | None = None,
+    ) -> None:
+        if isinstance(identifier, Token):
+            where = (
+                " at end"
+                if identifier.type == TokenType.EOF
+                else f" a '{identifier.lexeme}'"
+            )
+            line = identifier.line
+            if offset is None:
+                offset = identifier.start
+        else:
+            where = ""
+            line = identifier
+        self.add(Diagnostic(phase, line, self._column(offset), message, where))
+
+    def runtime_error(self, error: LoxRuntimeError) -> None:
+        token, message = error.args
+        column = self._column(token.start)
+        self.add(Diagnostic(Phase.RUNTIME, token.line, column, message))
+
+    def add(self, diagnostic: Diagnostic) -> None:
+        self.items.append(diagnostic)
+        if diagnostic.phase == Phase.RUNTIME:
+            self.had_runtime_error = True
+            if self._echo:
+                print(diagnostic)
+        else:
+            self.had_error = True
+            if self._echo:
+                print(diagnostic, file=sys.stderr)
+
+    def clear(self) -> None:
+        self.items.clear()
+        self.had_error = False
+        self.had_runtime_error = False
+
+    @property
+    def exit_code(self) -> int:
+        if self.had_error:
+            return 65
+        if self.had_runtime_error:
+            return 70
+        return 0
+
+    def _column(self, offset: int | None) -> int | None:
+        if offset is None or self.source is None:
+            return None
+        return offset - self.source.rfind("\n", 0, offset)
@@ -1,37 +1,53 @@
-import sys
-
-from typing import assert_never
-
-from scanner.token import Token, TokenType
+from scanner.token import Token
 
+from .diagnostics import Diagnostic, Diagnostics, Phase
 from .errors import LoxRuntimeError
 
 
+# The process-wide error state from before runs had their own Diagnostics.
+# Stages constructed without one report here, and the class flags keep working
+# for code that still reads or resets them.
 class ErrorHandler:
     had_error = False
     had_runtime_error = False
+    diagnostics: "SharedDiagnostics"
 
     @staticmethod
     def report(line: int, where: str, message: str) -> None:
-        print(f"[line {line}] Error{where}: {message}", file=sys.stderr)
-        ErrorHandler.had_error = True
+        diagnostic = Diagnostic(Phase.PARSE, line, None, message, where)
+        ErrorHandler.diagnostics.add(diagnostic)
 
     @staticmethod
     def error(identifier: int | Token, message: str) -> None:
-        match identifier:
-            case int():
-                ErrorHandler.report(identifier, "", message)
-            case Token():
-                where = (
-                    " at end"
-                    if identifier.type == TokenType.EOF
-                    else f" a '{identifier.lexeme}'"
-                )
-                ErrorHandler.report(identifier.line, where, message)
-            case _:
-                assert_never(identifier)
+        ErrorHandler.diagnostics.error(Phase.PARSE, identifier, message)
 
     @staticmethod
     def runtime_error(error: LoxRuntimeError) -> None:
-        print(f"{error.args[1]}\n[line {error.args[0].line}]")
-        ErrorHandler.had_runtime_error = True
+        ErrorHandler.diagnostics.runtime_error(error)
+
+
+# Keeps its flags on ErrorHandler and, as it lives as long as the process,
+# prints diagnostics without keeping them.
+class SharedDiagnostics(Diagnostics):
+    @property
+    def had_error(self) -> bool:
+        return ErrorHandler.had_error
+
+    @had_error.setter
+    def had_error(self, value: bool) -> None:
+        ErrorHandler.had_error = value
+
+    @property
+    def had_runtime_error(self) -> bool:
+        return ErrorHandler.had_runtime_error
+
+    @had_runtime_error.setter
+    def had_runtime_error(self, value: bool) -> None:
+        ErrorHandler.had_runtime_error = value
+
+    def add(self, diagnostic: Diagnostic) -> None:
+        super().add(diagnostic)
+        self.items.clear()
+
+
+ErrorHandler.diagnostics = SharedDiagnostics()
@@ -2,9 +2,11 @@ class LoxParseError(Exception):
     pass
 
 
-class LoxReturn(RuntimeError):
+class LoxRuntimeError(RuntimeError):
     pass
 
 
-class LoxRuntimeError(RuntimeError):
+# Raised by native functions, which don't know where they were called from.
+# The call site reraises it as a LoxRuntimeError on its own line.
+class LoxNativeError(RuntimeError):
     pass
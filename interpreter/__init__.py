@@ -1,3 +1,6 @@
 from .interpreter import Interpreter
+from .limits import Limits
+from .output import Output
+from .profiler import ProfilingInterpreter
 
-__all__ = ["Interpreter"]
\ No newline at end of file
+__all__ = ["Interpreter", "Limits", "Output", "ProfilingInterpreter"]
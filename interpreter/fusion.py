@@ -0,0 +1,176 @@
+from typing import TYPE_CHECKING
+
+from abstract_syntax_tree.expressions import (
+    Assign,
+    Binary,
+    Call,
+    Expr,
+    Get,
+    Grouping,
+    Literal,
+    Logical,
+    Set,
+    Super,
+    This,
+    Unary,
+    Variable,
+)
+from abstract_syntax_tree.fused import (
+    COMPARISONS,
+    INCREMENTS,
+    GlobalCall,
+    LocalAdd,
+    LocalCompare,
+    LocalIncrement,
+)
+from abstract_syntax_tree.statements import (
+    Block,
+    Class,
+    Expression,
+    Function,
+    If,
+    Print,
+    Return,
+    Stmt,
+    Var,
+    While,
+)
+from scanner.token import TokenType
+
+if TYPE_CHECKING:
+    from .interpreter import Interpreter
+
+
+# Rewrites a resolved program in place, children before parents, replacing the
+# node shapes that dominate loops with fused nodes:
+#   local < 10          LocalCompare (any comparison with a number literal)
+#   i = i + 1           LocalIncrement (or - a number literal, same local)
+#   a + b               LocalAdd (two locals)
+#   f(x)                GlobalCall (callee is a global variable)
+# It runs when the Interpreter is handed a program, after any caching, so
+# fused nodes never end up in a .loxc file.
+class Fuser(Expr.Visitor[Expr], Stmt.Visitor[None]):
+    def __init__(self, interpreter: "Interpreter") -> None:
+        self._interpreter = interpreter
+
+    def fuse(self, statements: list[Stmt]) -> None:
+        for statement in statements:
+            statement.accept(self)
+
+    def _fuse(self, expr: Expr) -> Expr:
+        return expr.accept(self)
+
+    def visit_block_stmt(self, stmt: Block) -> None:
+        self.fuse(stmt._statements)
+
+    def visit_class_stmt(self, stmt: Class) -> None:
+        self.fuse(stmt._methods)
+
+    def visit_expression_stmt(self, stmt: Expression) -> None:
+        stmt._expression = self._fuse(stmt._expression)
+
+    def visit_function_stmt(self, stmt: Function) -> None:
+        self.fuse(stmt._body)
+
+    def visit_if_stmt(self, stmt: If) -> None:
+        stmt._condition = self._fuse(stmt._condition)
+        stmt._then_branch.accept(self)
+        if stmt._else_branch is not None:
+            stmt._else_branch.accept(self)
+
+    def visit_print_stmt(self, stmt: Print) -> None:
+        stmt._expression = self._fuse(stmt._expression)
+
+    def visit_return_stmt(self, stmt: Return) -> None:
+        if stmt._value is not None:
+            stmt._value = self._fuse(stmt._value)
+
+    def visit_var_stmt(self, stmt: Var) -> None:
+        if stmt._initializer is not None:
+            stmt._initializer = self._fuse(stmt._initializer)
+
+    def visit_while_stmt(self, stmt: While) -> None:
+        stmt._condition = self._fuse(stmt._condition)
+        stmt._body.accept(self)
+
+    def visit_assign_expr(self, expr: Assign) -> Expr:
+        expr._value = self._fuse(expr._value)
+        local = expr._local
+        value = expr._value
+        if (
+            local is not None
+            and type(value) is Binary
+            and value._operator.type in INCREMENTS
+            and type(value._left) is Variable
+            and value._left._local == local
+            and _is_number(value._right)
+        ):
+            return LocalIncrement(expr, *local)
+        return expr
+
+    def visit_binary_expr(self, expr: Binary) -> Expr:
+        expr._left = self._fuse(expr._left)
+        expr._right = self._fuse(expr._right)
+        if type(expr._left) is not Variable:
+            return expr
+        left = expr._left._local
+        if left is None:
+            return expr
+        if expr._operator.type in COMPARISONS and _is_number(expr._right):
+            return LocalCompare(expr, *left)
+        if expr._operator.type == TokenType.PLUS and type(expr._right) is Variable:
+            right = expr._right._local
+            if right is not None:
+                return LocalAdd(expr, left, right)
+        return expr
+
+    def visit_call_expr(self, expr: Call) -> Expr:
+        expr._callee = self._fuse(expr._callee)
+        expr._arguments = [self._fuse(argument) for argument in expr._arguments]
+        if type(expr._callee) is Variable and expr._callee._local is None:
+            return GlobalCall(expr)
+        return expr
+
+    def visit_get_expr(self, expr: Get) -> Expr:
+        expr._object = self._fuse(expr._object)
+        return expr
+
+    def visit_grouping_expr(self, expr: Grouping) -> Expr:
+        expr._expression = self._fuse(expr._expression)
+        return expr
+
+    def visit_literal_expr(self, expr: Literal) -> Expr:
+        return expr
+
+    def visit_logical_expr(self, expr: Logical) -> Expr:
+        expr._left = self._fuse(expr._left)
+        expr._right = self._fuse(expr._right)
+        return expr
+
+    def visit_set_expr(self, expr: Set) -> Expr:
+        expr._object = self._fuse(expr._object)
+        expr._value = self._fuse(expr._value)
+        return expr
+
+    def visit_super_expr(self, expr: Super) -> Expr:
+        return expr
+
+    def visit_this_expr(self, expr: This) -> Expr:
+        return expr
+
+    def visit_unary_expr(self, expr: Unary) -> Expr:
+        expr._right = self._fuse(expr._right)
+        return expr
+
+    def visit_variable_expr(self, expr: Variable) -> Expr:
+        return expr
+
+
+# Only a non-NaN number literal behaves the same in the fast paths as in the
+# general ones (NaN is equal to itself in Lox).
+def _is_number(expr: Expr) -> bool:
+    return (
+        type(expr) is Literal
+        and type(expr._value) is float
+        and expr._value == expr._value
+    )
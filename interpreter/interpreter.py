@@ -1,4 +1,7 @@
+import sys
+
 from math import isnan
+from time import monotonic
 from typing import Any
 
 from abstract_syntax_tree.expressions import (
@@ -11,9 +14,17 @@ from abstract_syntax_tree.expressions import (
     Literal,
     Logical,
     Set,
+    Super,
+    This,
     Unary,
     Variable,
 )
+from abstract_syntax_tree.fused import (
+    GlobalCall,
+    LocalAdd,
+    LocalCompare,
+    LocalIncrement,
+)
 from abstract_syntax_tree.statements import (
     Class,
     Function,
@@ -26,96 +37,268 @@ from abstract_syntax_tree.statements import (
     Var,
     While,
 )
-from environment import Environment
-from errors import ErrorHandler, LoxRuntimeError, LoxReturn
-from lox_builtins import ClockFunction, LoxCallable, LoxFunction, LoxClass, LoxInstance
+from environment import Environment, LocalEnvironment
+from errors import Diagnostics, ErrorHandler, LoxNativeError, LoxRuntimeError
+from lox_builtins import (
+    CallCache,
+    ClockFunction,
+    LoxBoundMethod,
+    LoxCallable,
+    LoxFunction,
+    LoxClass,
+    LoxInstance,
+    LoxList,
+    MemoizedFunction,
+    NativeClass,
+    NumberList,
+)
 from scanner.token import Token, TokenType
 
+from .fusion import Fuser
+from .limits import CHECK_INTERVAL, ITEMS_PER_STEP, Limits
+from .output import Output
+from .stringify import stringify
 
-class Interpreter(Expr.Visitor[Any], Stmt.Visitor[None]):
-    def __init__(self) -> None:
+
+# Statement visitors return True while a `return` is unwinding to the enclosing
+# call, with the returned value held in `_return_value`. This keeps function
+# returns off Python's exception machinery.
+class Interpreter(Expr.Visitor[Any], Stmt.Visitor[bool]):
+    def __init__(self, diagnostics: Diagnostics | None = None) -> None:
+        self.diagnostics = diagnostics or ErrorHandler.diagnostics
         self.globals = Environment(None)
-        self._environment = self.globals
-        self._locals: dict[Expr, int] = {}
-        self.globals.define("clock", ClockFunction)
+        self._environment: Environment | LocalEnvironment = self.globals
+        self._return_value: Any = None
+        self._pure: set[Function] = set()
+        self.call_cache: CallCache | None = None
+        self.output = Output()
+        self.limits = Limits()
+        self._fuel = CHECK_INTERVAL
+        self._grant = CHECK_INTERVAL
+        self._steps = 0
+        self._deadline: float | None = None
+        self._depth = 0
+        self._max_depth = sys.maxsize
+        self._instances_left = sys.maxsize
+        self._max_size = sys.maxsize
+        self._bulk_size = ITEMS_PER_STEP
+        self.globals.define("clock", ClockFunction())
+        self.globals.define("List", NativeClass("List", LoxList))
+        self.globals.define("NumberList", NativeClass("NumberList", NumberList))
+        self._builtins = dict(self.globals._values)
 
     def interpret(self, statements: list[Stmt]) -> None:
+        self._fuse(statements)
         try:
             for statement in statements:
                 self._execute(statement)
         except LoxRuntimeError as e:
-            ErrorHandler.runtime_error(e)
+            self.output.flush()
+            self.diagnostics.runtime_error(e)
+        finally:
+            self.output.flush()
+
+    # Hands out the full allowance of `limits`. Called once per run before its
+    # first `interpret`, so a script run a statement at a time shares one budget.
+    def start_limits(self) -> None:
+        limits = self.limits
+        self._steps = 0
+        self._grant = CHECK_INTERVAL
+        if limits.steps is not None:
+            self._grant = min(CHECK_INTERVAL, limits.steps)
+        self._fuel = self._grant
+        self._deadline = None
+        if limits.seconds is not None:
+            self._deadline = monotonic() + limits.seconds
+        self._depth = 0
+        self._max_depth = sys.maxsize if limits.depth is None else limits.depth
+        self._instances_left = sys.maxsize
+        if limits.instances is not None:
+            self._instances_left = limits.instances
+        self._max_size = sys.maxsize if limits.size is None else limits.size
+        self._bulk_size = min(ITEMS_PER_STEP, self._max_size + 1)
+
+    # Called by an engine whose fuel has run out, for the step that took it
+    # below zero. Raises once a limit is exceeded; otherwise hands out the next
+    # grant and returns the fuel left after that step.
+    def _refuel(self) -> int:
+        limits = self.limits
+        self._steps += self._grant
+        if limits.steps is not None and self._steps >= limits.steps:
+            raise LoxNativeError(f"Step limit of {limits.steps} exceeded.")
+        if self._deadline is not None and monotonic() >= self._deadline:
+            raise LoxNativeError(f"Time limit of {limits.seconds}s exceeded.")
+        self._grant = CHECK_INTERVAL
+        if limits.steps is not None:
+            self._grant = min(CHECK_INTERVAL, limits.steps - self._steps)
+        self._fuel = self._grant - 1
+        return self._fuel
+
+    # Depth and instances are counted exactly, one comparison per call or
+    # instance, as both are cheap next to what they guard.
+    def _too_deep(self) -> LoxNativeError:
+        return LoxNativeError(f"Call depth limit of {self.limits.depth} exceeded.")
+
+    def _too_many_instances(self) -> LoxNativeError:
+        return LoxNativeError(f"Instance limit of {self.limits.instances} exceeded.")
+
+    def _refuel_at(self, token: Token) -> None:
+        try:
+            self._refuel()
+        except LoxNativeError as e:
+            raise LoxRuntimeError(token, e.args[0])
+
+    # Called before an operation handling `items` characters or list items,
+    # whenever that is at least `_bulk_size`. One such operation can take long
+    # enough to matter, so the clock is checked as well as the steps.
+    def _charge(self, items: int) -> None:
+        limits = self.limits
+        if items > self._max_size:
+            raise self._too_big()
+        self._steps += items // ITEMS_PER_STEP
+        if limits.steps is not None and self._steps >= limits.steps:
+            raise LoxNativeError(f"Step limit of {limits.steps} exceeded.")
+        if self._deadline is not None and monotonic() >= self._deadline:
+            raise LoxNativeError(f"Time limit of {limits.seconds}s exceeded.")
+
+    def _charge_at(self, token: Token, items: int) -> None:
+        try:
+            self._charge(items)
+        except LoxNativeError as e:
+            raise LoxRuntimeError(token, e.args[0])
+
+    def _too_big(self) -> LoxNativeError:
+        return LoxNativeError(f"Size limit of {self.limits.size} exceeded.")
+
+    # Forgets everything a run left behind so the interpreter can be used for an
+    # unrelated program: globals go back to the builtins and the pure functions
+    # found in the last program are dropped. The globals dictionary is cleared
+    # in place because the VM and compiled programs hold on to it.
+    def reset(self) -> None:
+        self.globals._values.clear()
+        self.globals._values.update(self._builtins)
+        self._environment = self.globals
+        self._return_value = None
+        self._pure.clear()
+
+    def _fuse(self, statements: list[Stmt]) -> None:
+        Fuser(self).fuse(statements)
+
+    def _execute(self, statement: Stmt) -> bool:
+        return statement.accept(self)
 
-    def _execute(self, statement: Stmt) -> None:
-        statement.accept(self)
+    # The Resolver's results are stored on the nodes themselves, so evaluating a
+    # local reads its (depth, slot) straight off the node instead of hashing it
+    # into a table. A node whose `_local` stays None is a global.
+    def resolve(self, node: Expr | Stmt, depth: int, slot: int) -> None:
+        node._local = (depth, slot)
 
-    def resolve(self, expr: Expr, depth: int):
-        self._locals.update({expr: depth})
+    def resolve_scope(self, node: Block | Function, size: int) -> None:
+        node._scope_size = size
+
+    def resolve_pure(self, function: Function) -> None:
+        self._pure.add(function)
 
     def _evaluate(self, expression: Expr) -> Any:
         return expression.accept(self)
 
-    def execute_block(self, statements: list[Stmt], environment: Environment) -> None:
+    def execute_block(
+        self, statements: list[Stmt], environment: LocalEnvironment
+    ) -> bool:
         previous = self._environment
         try:
             self._environment = environment
             for statment in statements:
-                self._execute(statment)
+                if statment.accept(self):
+                    return True
+            return False
         finally:
             self._environment = previous
 
-    def visit_block_stmt(self, stmt: Block) -> None:
-        self.execute_block(stmt._statements, Environment(self._environment))
-
-    def visit_class_stmt(self, stmt: Class) -> None:
-        self._environment.define(stmt._name.lexeme, None)
+    def visit_block_stmt(self, stmt: Block) -> bool:
+        return self.execute_block(
+            stmt._statements,
+            LocalEnvironment(stmt._scope_size, self._environment),
+        )
+
+    def visit_class_stmt(self, stmt: Class) -> bool:
+        superclass = None
+        if stmt._superclass is not None:
+            superclass = self._evaluate(stmt._superclass)
+            if not isinstance(superclass, LoxClass):
+                raise LoxRuntimeError(
+                    stmt._superclass._name, "Superclass must be a class."
+                )
+        self._define(stmt, stmt._name, None)
+        environment = self._environment
+        if superclass is not None:
+            environment = LocalEnvironment(1, environment)
+            environment._values[0] = superclass
         methods: dict[str, LoxFunction] = {}
         for method in stmt._methods:
-            function = LoxFunction(method, self._environment)
+            function = LoxFunction(
+                method,
+                environment,
+                method._scope_size,
+                method._name.lexeme == "init",
+            )
             methods.update({method._name.lexeme: function})
-        klass = LoxClass(stmt._name.lexeme, methods)
-        self._environment.assign(stmt._name, klass)
+        klass = LoxClass(stmt._name.lexeme, superclass, methods)
+        self._define(stmt, stmt._name, klass)
+        return False
 
-    def visit_expression_stmt(self, stmt: Expression) -> None:
+    def visit_expression_stmt(self, stmt: Expression) -> bool:
         self._evaluate(stmt._expression)
+        return False
 
-    def visit_function_stmt(self, stmt: Function) -> None:
-        function = LoxFunction(stmt, self._environment)
-        self._environment.define(stmt._name.lexeme, function)
+    def visit_function_stmt(self, stmt: Function) -> bool:
+        function: LoxCallable = LoxFunction(stmt, self._environment, stmt._scope_size)
+        if self.call_cache is not None and stmt in self._pure:
+            function = MemoizedFunction(function, stmt, self.call_cache)
+        self._define(stmt, stmt._name, function)
+        return False
 
-    def visit_if_stmt(self, stmt: If) -> None:
+    def visit_if_stmt(self, stmt: If) -> bool:
         if self._is_truthy(self._evaluate(stmt._condition)):
-            self._execute(stmt._then_branch)
+            return self._execute(stmt._then_branch)
         elif stmt._else_branch:
-            self._execute(stmt._else_branch)
+            return self._execute(stmt._else_branch)
+        return False
 
-    def visit_print_stmt(self, stmt: Print) -> None:
+    def visit_print_stmt(self, stmt: Print) -> bool:
         val = self._evaluate(stmt._expression)
-        print(self._stringify(val))
+        self.output.write_line(self._stringify(val))
+        return False
 
-    def visit_return_stmt(self, stmt: Return) -> None:
+    def visit_return_stmt(self, stmt: Return) -> bool:
         if stmt._value is not None:
-            value = self._evaluate(stmt._value)
+            self._return_value = self._evaluate(stmt._value)
         else:
-            value = self._evaluate(Literal(None))
-        raise LoxReturn(value)
+            self._return_value = None
+        return True
 
-    def visit_var_stmt(self, stmt: Var) -> None:
+    def visit_var_stmt(self, stmt: Var) -> bool:
         if stmt._initializer is not None:
             value = self._evaluate(stmt._initializer)
         else:
-            value = self._evaluate(Literal(None))
-        self._environment.define(stmt._name.lexeme, value)
+            value = None
+        self._define(stmt, stmt._name, value)
+        return False
 
-    def visit_while_stmt(self, stmt: While) -> None:
+    def visit_while_stmt(self, stmt: While) -> bool:
         while self._is_truthy(self._evaluate(stmt._condition)):
-            self._execute(stmt._body)
+            self._fuel -= 1
+            if self._fuel < 0:
+                self._refuel_at(stmt._keyword)
+            if self._execute(stmt._body):
+                return True
+        return False
 
     def visit_assign_expr(self, expr: Assign) -> Any:
         value = self._evaluate(expr._value)
-        distance = self._locals.get(expr)
-        if distance:
-            self._environment.assign_at(distance, expr._name, value)
+        local = expr._local
+        if local is not None:
+            self._environment.assign_at(*local, value)
         else:
             self.globals.assign(expr._name, value)
         return value
@@ -147,6 +330,9 @@ class Interpreter(Expr.Visitor[Any], Stmt.Visitor[None]):
                 if isinstance(left, float) and isinstance(right, float):
                     return float(left) + float(right)
                 if isinstance(left, str) and isinstance(right, str):
+                    size = len(left) + len(right)
+                    if size >= self._bulk_size:
+                        self._charge_at(expr._operator, size)
                     return str(left) + str(right)
                 raise LoxRuntimeError(
                     expr._operator,
@@ -162,25 +348,131 @@ class Interpreter(Expr.Visitor[Any], Stmt.Visitor[None]):
                 self._check_number_operands(expr._operator, left, right)
                 return float(left) * float(right)
 
+    # A call site remembers the last callee that passed the callable and arity
+    # checks. The argument count of a site never changes, so calling the same
+    # function or class again can skip both. Calls of the form `obj.method()`
+    # and `super.method()` invoke the method on its receiver directly rather
+    # than binding it first.
     def visit_call_expr(self, expr: Call) -> Any:
-        callee = self._evaluate(expr._callee)
+        callee_expr = expr._callee
+        if type(callee_expr) is Get:
+            receiver, callee = self._find_method(callee_expr)
+        elif type(callee_expr) is Super:
+            receiver, callee = self._find_super_method(callee_expr)
+        else:
+            receiver, callee = None, self._evaluate(callee_expr)
         arguments: list[Any] = []
         for argument in expr._arguments:
             arguments.append(self._evaluate(argument))
+        if callee is not expr._cache.key:
+            self._check_call(expr, callee, arguments)
+        try:
+            if receiver is None:
+                return callee.call(self, arguments)
+            return callee.invoke(self, receiver, arguments)
+        except LoxNativeError as e:
+            raise LoxRuntimeError(expr._paren, e.args[0])
+        except RecursionError:
+            raise LoxRuntimeError(expr._paren, "Stack overflow.")
+
+    def _check_call(self, expr: Call, callee: Any, arguments: list[Any]) -> None:
         if not isinstance(callee, LoxCallable):
             raise LoxRuntimeError(expr._paren, "Can only call functions and classes.")
-        function: LoxCallable = callee
-        if len(arguments) != function.arity():
+        if len(arguments) != callee.arity():
             raise LoxRuntimeError(
                 expr._paren,
-                f"Expected {function.arity()} arguments but got {len(arguments)}.",
+                f"Expected {callee.arity()} arguments but got {len(arguments)}.",
             )
-        return function.call(self, arguments)
+        expr._cache.key = callee
 
+    # Evaluates the callee of `obj.name(...)`. A method comes back with its
+    # receiver; a field comes back as a plain value to be called as it is.
+    def _find_method(self, expr: Get) -> tuple[LoxInstance | None, Any]:
+        obj = self._evaluate(expr._object)
+        if not isinstance(obj, LoxInstance):
+            raise LoxRuntimeError(expr._name, "Only instances have properties.")
+        cache = expr._cache
+        if cache.key is obj._shape:
+            found = cache.value
+        else:
+            found = cache.miss(
+                obj._shape, lambda shape: obj._lookup(shape, expr._name.lexeme)
+            )
+        if type(found) is int:
+            return None, obj._values[found]
+        if found is None:
+            raise LoxRuntimeError(
+                expr._name, f"Undefined property '{expr._name.lexeme}'."
+            )
+        return obj, found
+
+    def _find_super_method(self, expr: Super) -> tuple[LoxInstance, Any]:
+        superclass = self._environment.get_at(*expr._local)
+        receiver = self._environment.get_at(*expr._this._local)
+        method = superclass.find_method(expr._method.lexeme)
+        if method is None:
+            raise LoxRuntimeError(
+                expr._method, f"Undefined property '{expr._method.lexeme}'."
+            )
+        return receiver, method
+
+    # Get and Set check the site's inline cache for a plain field hit before
+    # falling back to LoxInstance, which handles methods, misses and new fields.
     def visit_get_expr(self, expr: Get) -> Any:
         obj = self._evaluate(expr._object)
         if isinstance(obj, LoxInstance):
-            return obj.get(expr._name)
+            cache = expr._cache
+            if cache.key is obj._shape and type(cache.value) is int:
+                return obj._values[cache.value]
+            return obj.get(expr._name, cache)
+        raise LoxRuntimeError(expr._name, "Only instances have properties.")
+
+    # Fused nodes take their fast path when the operands are numbers, or the
+    # callee is the one the site last called, and otherwise fall back to the
+    # general evaluator for the node they replace. Their operands are locals
+    # and literals, so evaluating them a second time has no visible effect.
+    def visit_global_call_expr(self, expr: GlobalCall) -> Any:
+        name = expr._callee._name
+        try:
+            callee = self.globals._values[name.lexeme]
+        except KeyError:
+            raise LoxRuntimeError(name, f"Undefined variable '{name.lexeme}'.")
+        arguments = [self._evaluate(argument) for argument in expr._arguments]
+        if callee is not expr._cache.key:
+            self._check_call(expr, callee, arguments)
+        try:
+            return callee.call(self, arguments)
+        except LoxNativeError as e:
+            raise LoxRuntimeError(expr._paren, e.args[0])
+        except RecursionError:
+            raise LoxRuntimeError(expr._paren, "Stack overflow.")
+
+    def visit_local_add_expr(self, expr: LocalAdd) -> Any:
+        left = self._environment.get_at(*expr._left_local)
+        right = self._environment.get_at(*expr._right_local)
+        if type(left) is float and type(right) is float:
+            return left + right
+        return self.visit_binary_expr(expr)
+
+    def visit_local_compare_expr(self, expr: LocalCompare) -> Any:
+        if expr._depth:
+            left = self._environment.get_at(expr._depth, expr._slot)
+        else:
+            left = self._environment._values[expr._slot]
+        if type(left) is float:
+            return expr._compare(left, expr._constant)
+        return self.visit_binary_expr(expr)
+
+    def visit_local_increment_expr(self, expr: LocalIncrement) -> Any:
+        if expr._depth:
+            values = self._environment.ancestor(expr._depth)._values
+        else:
+            values = self._environment._values
+        value = values[expr._slot]
+        if type(value) is float:
+            value = values[expr._slot] = expr._increment(value, expr._constant)
+            return value
+        return self.visit_assign_expr(expr)
 
     def visit_grouping_expr(self, expr: Grouping) -> Any:
         return self._evaluate(expr._expression)
@@ -190,7 +482,7 @@ class Interpreter(Expr.Visitor[Any], Stmt.Visitor[None]):
 
     def visit_logical_expr(self, expr: Logical) -> Any:
         left = self._evaluate(expr._left)
-        if expr._operator == TokenType.OR:
+        if expr._operator.type == TokenType.OR:
             if self._is_truthy(left):
                 return left
         else:
@@ -203,9 +495,19 @@ class Interpreter(Expr.Visitor[Any], Stmt.Visitor[None]):
         if not isinstance(obj, LoxInstance):
             raise LoxRuntimeError(expr._name, "Only instances have fields.")
         value = self._evaluate(expr._value)
-        obj.set(expr._name, value)
+        cache = expr._cache
+        if cache.key is obj._shape and cache.value[1] is obj._shape:
+            obj._values[cache.value[0]] = value
+        else:
+            obj.set(expr._name, value, cache)
         return value
 
+    def visit_super_expr(self, expr: Super) -> Any:
+        return LoxBoundMethod(*self._find_super_method(expr))
+
+    def visit_this_expr(self, expr: This) -> Any:
+        return self._lookup_variable(expr._keyword, expr)
+
     def visit_unary_expr(self, expr: Unary) -> Any:
         right = self._evaluate(expr._right)
         match expr._operator.type:
@@ -213,16 +515,23 @@ class Interpreter(Expr.Visitor[Any], Stmt.Visitor[None]):
                 return not self._is_truthy(right)
             case TokenType.MINUS:
                 self._check_number_operand(expr._operator, right)
-                return -int(right)
+                return -float(right)
 
     def visit_variable_expr(self, expr: Variable) -> Any:
-        return self._environment.get(expr._name)
+        return self._lookup_variable(expr._name, expr)
+
+    def _define(self, stmt: Stmt, name: Token, value: Any) -> None:
+        local = stmt._local
+        if local is not None:
+            self._environment._values[local[1]] = value
+        else:
+            self.globals.define(name.lexeme, value)
 
     def _lookup_variable(self, name: Token, expr: Expr) -> Any:
-        distance = self._locals.get(expr)
-        if distance:
-            return self._environment.get_at(distance, name.lexeme)
-        return self.globals.get(name)
+        local = expr._local
+        if local is None:
+            return self.globals.get(name)
+        return self._environment.get_at(*local)
 
     def _is_truthy(self, object: Any) -> bool:
         if object is None:
@@ -241,21 +550,11 @@ class Interpreter(Expr.Visitor[Any], Stmt.Visitor[None]):
     def _check_number_operand(self, operator: Token, operand: Any) -> None:
         if isinstance(operand, float):
             return
-        raise LoxRuntimeError(operand, "Operand must be a number.")
+        raise LoxRuntimeError(operator, "Operand must be a number.")
 
     def _check_number_operands(self, operator: Token, left: Any, right: Any) -> None:
         if isinstance(left, float) and isinstance(right, float):
             return
         raise LoxRuntimeError(operator, "Operands must be numbers.")
 
-    def _stringify(self, object: Any) -> str:
-        if object is None:
-            return "nil"
-        if isinstance(object, float):
-            text = str(object)
-            if text.endswith(".0"):
-                text = text[:-2]
-            return text
-        if isinstance(object, bool):
-            return str(object).lower()
-        return str(object)
+    _stringify = staticmethod(stringify)
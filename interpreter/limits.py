@@ -0,0 +1,30 @@
+from dataclasses import dataclass
+
+# Steps run between two checks of the limits. Engines count steps down from
+# the grant they were given and only call back into the interpreter when it
+# runs out, so a run without limits pays one decrement per step.
+CHECK_INTERVAL = 1024
+
+# Operations whose work grows with the size of their operands, such as
+# concatenating strings or filling a list, are charged a step for every this
+# many characters or items on top of the step that ran them.
+ITEMS_PER_STEP = 64
+
+
+# What one run may use, however many calls to `interpret` it makes. A step is
+# a loop iteration or a call to a Lox function, the only ways a program can run
+# for longer than its length, or ITEMS_PER_STEP characters or items handled by
+# a single operation. `depth` bounds the Lox calls active at once, `instances`
+# the instances made by calling classes, native ones included, and `size` the
+# length of any one string or list. None leaves a resource unbounded.
+#
+# The limits are cooperative: engines check them between steps, so a program
+# stops at the first check after it goes over, never in the middle of an
+# operation.
+@dataclass(frozen=True)
+class Limits:
+    steps: int | None = None
+    seconds: float | None = None
+    depth: int | None = None
+    instances: int | None = None
+    size: int | None = None
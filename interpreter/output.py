@@ -0,0 +1,39 @@
+import sys
+
+from typing import TextIO
+
+
+# Where `print` statements go. Lines are collected and written to the file in
+# one call once `buffer_size` characters are waiting, so a script printing
+# millions of lines doesn't pay for a write per line. A terminal gets every
+# line as soon as it is printed. Whoever runs the program flushes before
+# anything else is written to the same stream and when it finishes.
+class Output:
+    __slots__ = ("_file", "_lines", "_pending", "_limit")
+
+    def __init__(
+        self,
+        file: TextIO | None = None,
+        buffer_size: int = 65536,
+        line_buffered: bool | None = None,
+    ) -> None:
+        self._file = sys.stdout if file is None else file
+        if line_buffered is None:
+            line_buffered = self._file.isatty()
+        self._lines: list[str] = []
+        self._pending = 0
+        self._limit = 0 if line_buffered else buffer_size
+
+    def write_line(self, text: str) -> None:
+        self._lines.append(text)
+        self._pending += len(text) + 1
+        if self._pending >= self._limit:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._lines:
+            self._lines.append("")
+            self._file.write("\n".join(self._lines))
+            self._lines.clear()
+            self._pending = 0
+        self._file.flush()
@@ -0,0 +1,214 @@
+import sys
+
+from collections import defaultdict
+from time import perf_counter
+from typing import Any
+
+from abstract_syntax_tree.expressions import Expr
+from abstract_syntax_tree.statements import Class, Function, Stmt
+from environment import LocalEnvironment
+from errors import Diagnostics
+from scanner.token import Token
+
+from .interpreter import Interpreter
+
+TOKEN_ATTRIBUTES = ("_name", "_operator", "_paren", "_keyword")
+CHILD_ATTRIBUTES = (
+    "_expression",
+    "_condition",
+    "_left",
+    "_callee",
+    "_object",
+    "_value",
+    "_initializer",
+    "_right",
+)
+
+
+class NodeStats:
+    __slots__ = ("count", "cumulative", "own")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.cumulative = 0.0
+        self.own = 0.0
+
+
+# Every node goes through `_profile`, which records how often it ran and how
+# long it took both including (cumulative) and excluding (own) the nodes it
+# evaluated. Lox function calls are additionally tracked as frames so time can
+# be attributed per function and per call stack. The plain Interpreter is left
+# untouched, so none of this costs anything unless this subclass is used.
+class ProfilingInterpreter(Interpreter):
+    def __init__(self, diagnostics: Diagnostics | None = None) -> None:
+        super().__init__(diagnostics)
+        self.node_stats: dict[Expr | Stmt, NodeStats] = {}
+        self.function_stats: dict[Function, NodeStats] = {}
+        self.stacks: defaultdict[str, float] = defaultdict(float)
+        self._node_lines: dict[Expr | Stmt, int] = {}
+        self._timers: list[float] = []
+        self._lines: list[int] = [0]
+        self._frames: list[list[Any]] = []
+        self._bodies: dict[int, Function] = {}
+
+    # `_profile` adds a Python frame to every node, about a third more frames
+    # per Lox call, so the recursion limit is raised by as much for the run to
+    # let a program recurse as deep as it would without the profiler. The limit
+    # is process-wide and is put back when the run ends, however it ends. That
+    # makes profiling unsafe while other threads run Lox code, which is why
+    # only `plox profile` uses this class and runtimes never do.
+    def interpret(self, statements: list[Stmt]) -> None:
+        self._frames.append(["<script>", 0.0])
+        recursion_limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(recursion_limit * 4 // 3)
+        start = perf_counter()
+        try:
+            super().interpret(statements)
+        finally:
+            sys.setrecursionlimit(recursion_limit)
+            self._end_frame(perf_counter() - start)
+
+    # Profiles are reported against the program as written, so nodes are not
+    # fused.
+    def _fuse(self, statements: list[Stmt]) -> None:
+        pass
+
+    def _execute(self, statement: Stmt) -> bool:
+        return self._profile(statement)
+
+    def _evaluate(self, expression: Expr) -> Any:
+        return self._profile(expression)
+
+    # Calls are timed where a function's body runs rather than around the call
+    # expression, which leaves calling to the Interpreter and adds no Python
+    # frames of its own. Bodies are recognised by the list holding them.
+    def execute_block(
+        self, statements: list[Stmt], environment: LocalEnvironment
+    ) -> bool:
+        declaration = self._bodies.get(id(statements))
+        if declaration is not None:
+            self._frames.append([declaration._name.lexeme, 0.0])
+        previous = self._environment
+        start = perf_counter()
+        try:
+            self._environment = environment
+            for statement in statements:
+                if self._profile(statement):
+                    return True
+            return False
+        finally:
+            self._environment = previous
+            if declaration is not None:
+                self._end_call(declaration, perf_counter() - start)
+
+    def visit_class_stmt(self, stmt: Class) -> bool:
+        for method in stmt._methods:
+            self._bodies[id(method._body)] = method
+        return super().visit_class_stmt(stmt)
+
+    def visit_function_stmt(self, stmt: Function) -> bool:
+        self._bodies[id(stmt._body)] = stmt
+        return super().visit_function_stmt(stmt)
+
+    def _end_call(self, declaration: Function, elapsed: float) -> None:
+        own = self._end_frame(elapsed)
+        stats = self.function_stats.get(declaration)
+        if stats is None:
+            stats = self.function_stats[declaration] = NodeStats()
+        stats.count += 1
+        stats.cumulative += elapsed
+        stats.own += own
+
+    def _end_frame(self, elapsed: float) -> float:
+        own = elapsed - self._frames[-1][1]
+        self.stacks[";".join(frame[0] for frame in self._frames)] += own
+        self._frames.pop()
+        if self._frames:
+            self._frames[-1][1] += elapsed
+        return own
+
+    def _profile(self, node: Expr | Stmt) -> Any:
+        line = self._node_lines.get(node)
+        if line is None:
+            line = self._node_lines[node] = _node_line(node) or self._lines[-1]
+        self._lines.append(line)
+        self._timers.append(0.0)
+        start = perf_counter()
+        try:
+            return node.accept(self)
+        finally:
+            elapsed = perf_counter() - start
+            children = self._timers.pop()
+            self._lines.pop()
+            if self._timers:
+                self._timers[-1] += elapsed
+            stats = self.node_stats.get(node)
+            if stats is None:
+                stats = self.node_stats[node] = NodeStats()
+            stats.count += 1
+            stats.cumulative += elapsed
+            stats.own += elapsed - children
+
+    def line_profile(self) -> list[tuple[int, str, NodeStats]]:
+        by_line: dict[tuple[int, str], NodeStats] = {}
+        for node, stats in self.node_stats.items():
+            key = (self._node_lines[node], type(node).__name__)
+            total = by_line.get(key)
+            if total is None:
+                total = by_line[key] = NodeStats()
+            total.count += stats.count
+            total.cumulative += stats.cumulative
+            total.own += stats.own
+        return sorted(
+            ((line, kind, stats) for (line, kind), stats in by_line.items()),
+            key=lambda entry: entry[2].own,
+            reverse=True,
+        )
+
+    def report(self, limit: int = 20) -> str:
+        lines = ["Lines by own time:"]
+        lines.append(f"{'own ms':>10}{'cum ms':>10}{'count':>10}{'line':>7}  node")
+        for line, kind, stats in self.line_profile()[: limit or None]:
+            lines.append(
+                f"{stats.own * 1000:>10.2f}{stats.cumulative * 1000:>10.2f}"
+                f"{stats.count:>10}{line:>7}  {kind}"
+            )
+        lines.append("")
+        lines.append("Functions by own time:")
+        lines.append(f"{'own ms':>10}{'cum ms':>10}{'calls':>10}  function")
+        functions = sorted(
+            self.function_stats.items(), key=lambda entry: entry[1].own, reverse=True
+        )
+        for declaration, stats in functions[: limit or None]:
+            lines.append(
+                f"{stats.own * 1000:>10.2f}{stats.cumulative * 1000:>10.2f}"
+                f"{stats.count:>10}  {declaration._name.lexeme} "
+                f"(line {declaration._name.line})"
+            )
+        return "\n".join(lines)
+
+    def collapsed_stacks(self) -> str:
+        # Brendan Gregg's folded format with microsecond weights.
+        return "".join(
+            f"{stack} {round(own * 1_000_000)}\n"
+            for stack, own in self.stacks.items()
+            if round(own * 1_000_000) > 0
+        )
+
+
+def _node_line(node: Expr | Stmt) -> int | None:
+    for attribute in TOKEN_ATTRIBUTES:
+        token = getattr(node, attribute, None)
+        if isinstance(token, Token):
+            return token.line
+    for attribute in CHILD_ATTRIBUTES:
+        child = getattr(node, attribute, None)
+        if isinstance(child, (Expr, Stmt)):
+            line = _node_line(child)
+            if line is not None:
+                return line
+    for child in getattr(node, "_statements", ()):
+        line = _node_line(child)
+        if line is not None:
+            return line
+    return None
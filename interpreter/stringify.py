@@ -0,0 +1,35 @@
+from functools import lru_cache
+from math import copysign
+from typing import Any
+
+RECENT_LIMIT = 1024
+
+
+# Lox prints numbers without a trailing ".0". A float that isn't integral, or
+# is NaN or infinite, never has one, so its repr is already right. Zero is
+# handled up front because -0 would find the cached text for 0.
+def stringify(value: Any) -> str:
+    if type(value) is float:
+        if not value.is_integer():
+            return repr(value)
+        if not value:
+            return "-0" if copysign(1.0, value) < 0.0 else "0"
+        return _integral(value)
+    if value is None:
+        return "nil"
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    return str(value)
+
+
+# Integral values below 1e16 are the ones Python writes as "<digits>.0"; from
+# there on repr switches to exponent notation, which is kept. The text of
+# recently printed numbers is cached, which is safe to share between threads
+# as the result depends on nothing but the value.
+@lru_cache(maxsize=RECENT_LIMIT)
+def _integral(value: float) -> str:
+    if -1e16 < value < 1e16:
+        return str(int(value))
+    return repr(value)
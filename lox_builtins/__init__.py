@@ -1,3 +1,27 @@
-from .functions import ClockFunction, LoxCallable, LoxFunction, LoxClass, LoxInstance
+from .functions import (
+    ClockFunction,
+    LoxBoundMethod,
+    LoxCallable,
+    LoxFunction,
+    LoxClass,
+    LoxInstance,
+)
+from .lists import LoxList, NativeClass, NativeMethod, NumberList
+from .memo import CallCache, MemoizedFunction
+from .shape import Shape
 
-__all__ = ["LoxCallable", "ClockFunction", "LoxFunction", "LoxClass", "LoxInstance"]
+__all__ = [
+    "LoxCallable",
+    "ClockFunction",
+    "LoxFunction",
+    "LoxBoundMethod",
+    "LoxClass",
+    "LoxInstance",
+    "LoxList",
+    "NumberList",
+    "NativeClass",
+    "NativeMethod",
+    "CallCache",
+    "MemoizedFunction",
+    "Shape",
+]
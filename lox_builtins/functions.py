@@ -2,16 +2,21 @@ from abc import ABC, abstractmethod
 from time import time
 from typing import Any, TYPE_CHECKING, Union
 
+from abstract_syntax_tree.inline_cache import InlineCache
 from abstract_syntax_tree.statements import Function
-from environment import Environment
-from errors import LoxReturn, LoxRuntimeError
+from environment import Environment, LocalEnvironment
+from errors import LoxRuntimeError
 from scanner.token import Token
 
+from .shape import Shape
+
 if TYPE_CHECKING:
     from interpreter import Interpreter
 
 
 class LoxCallable(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def arity(self) -> int:
         raise NotImplementedError()
@@ -21,69 +26,179 @@ class LoxCallable(ABC):
         raise NotImplementedError()
 
 
+# Inherited methods are copied into the subclass's table when it is created,
+# so a lookup is one dictionary probe however deep the hierarchy is.
 class LoxClass(LoxCallable):
-    def __init__(self, name: str, methods: dict[str, "LoxFunction"]) -> None:
+    def __init__(
+        self,
+        name: str,
+        superclass: Union["LoxClass", None],
+        methods: dict[str, Any],
+    ) -> None:
         self.name = name
-        self._methods = methods
+        self.superclass = superclass
+        self._methods: dict[str, Any] = {}
+        if superclass is not None:
+            self._methods.update(superclass._methods)
+        self._methods.update(methods)
+        self._shape = Shape({})
 
     def call(self, interpreter: "Interpreter", arguments: list[Any]) -> Any:
+        interpreter._instances_left -= 1
+        if interpreter._instances_left < 0:
+            raise interpreter._too_many_instances()
         instance = LoxInstance(self)
+        initializer = self._methods.get("init")
+        if initializer is not None:
+            initializer.invoke(interpreter, instance, arguments)
         return instance
 
     def arity(self) -> int:
-        return 0
+        initializer = self._methods.get("init")
+        if initializer is None:
+            return 0
+        return initializer.arity()
 
-    def find_method(self, name: str) -> Union["LoxFunction", None]:
-        if name in self._methods.keys():
-            return self._methods.get(name)
-        return None
+    def find_method(self, name: str) -> Any:
+        return self._methods.get(name)
 
     def __repr__(self) -> str:
         return self.name
 
 
+# Field values live in a plain list laid out by the instance's shape. Because
+# every shape descends from its class's root shape, a shape also identifies the
+# class, so one cache entry keyed on the shape can hold either a field index or
+# the method a name resolves to.
 class LoxInstance:
+    __slots__ = ("_klass", "_shape", "_values")
+
     def __init__(self, klass: LoxClass) -> None:
         self._klass = klass
-        self._fields: dict[str, Any] = {}
-
-    def get(self, name: Token) -> Any:
-        if name.lexeme in self._fields.keys():
-            return self._fields.get(name.lexeme)
-        method = self._klass.find_method(name.lexeme)
-        if method:
-            return method
+        self._shape = klass._shape
+        self._values: list[Any] = []
+
+    def get(self, name: Token, cache: InlineCache | None = None) -> Any:
+        shape = self._shape
+        if cache is None:
+            found = self._lookup(shape, name.lexeme)
+        elif cache.key is shape:
+            found = cache.value
+        else:
+            found = cache.miss(shape, lambda shape: self._lookup(shape, name.lexeme))
+        if type(found) is int:
+            return self._values[found]
+        if found is not None:
+            return LoxBoundMethod(self, found)
         raise LoxRuntimeError(name, f"Undefined property '{name.lexeme}'.")
 
-    def set(self, name: Token, value: Any) -> None:
-        self._fields.update({name.lexeme: value})
+    def set(self, name: Token, value: Any, cache: InlineCache | None = None) -> None:
+        shape = self._shape
+        if cache is None:
+            index, target = shape.transition(name.lexeme)
+        elif cache.key is shape:
+            index, target = cache.value
+        else:
+            index, target = cache.miss(
+                shape, lambda shape: shape.transition(name.lexeme)
+            )
+        if target is shape:
+            self._values[index] = value
+        else:
+            self._shape = target
+            self._values.append(value)
+
+    def _lookup(self, shape: Shape, name: str) -> Any:
+        index = shape.index(name)
+        if index is not None:
+            return index
+        return self._klass.find_method(name)
 
     def __repr__(self) -> str:
         return f"{self._klass.name} instance"
 
 
+# A method is called with its receiver stored in the slot after the arguments,
+# where the Resolver put `this`. Initializers hand back the receiver whatever
+# their body returns.
 class LoxFunction(LoxCallable):
-    def __init__(self, declaration: Function, closure: Environment) -> None:
+    def __init__(
+        self,
+        declaration: Function,
+        closure: Environment | LocalEnvironment,
+        scope_size: int,
+        is_initializer: bool = False,
+    ) -> None:
         self._declaration = declaration
         self._closure = closure
+        self._scope_size = scope_size
+        self._is_initializer = is_initializer
 
     def arity(self) -> int:
         return len(self._declaration._params)
 
     def call(self, interpreter: "Interpreter", arguments: list[Any]) -> Any:
-        environment = Environment(self._closure)
-        for i, param in enumerate(self._declaration._params):
-            environment.define(param.lexeme, arguments[i])
+        interpreter._fuel -= 1
+        if interpreter._fuel < 0:
+            interpreter._refuel()
+        if interpreter._depth >= interpreter._max_depth:
+            raise interpreter._too_deep()
+        environment = LocalEnvironment(self._scope_size, self._closure)
+        environment._values[: len(arguments)] = arguments
+        interpreter._depth += 1
+        try:
+            if interpreter.execute_block(self._declaration._body, environment):
+                return interpreter._return_value
+            return None
+        finally:
+            interpreter._depth -= 1
+
+    def invoke(
+        self, interpreter: "Interpreter", receiver: "LoxInstance", arguments: list[Any]
+    ) -> Any:
+        interpreter._fuel -= 1
+        if interpreter._fuel < 0:
+            interpreter._refuel()
+        if interpreter._depth >= interpreter._max_depth:
+            raise interpreter._too_deep()
+        environment = LocalEnvironment(self._scope_size, self._closure)
+        values = environment._values
+        values[: len(arguments)] = arguments
+        values[len(arguments)] = receiver
+        interpreter._depth += 1
         try:
-            interpreter.execute_block(self._declaration._body, environment)
-        except LoxReturn as rtn_val:
-            return rtn_val.args[0]
+            returned = interpreter.execute_block(self._declaration._body, environment)
+        finally:
+            interpreter._depth -= 1
+        if self._is_initializer:
+            return receiver
+        if returned:
+            return interpreter._return_value
         return None
 
     def __repr__(self) -> str:
         return f"<fn {self._declaration._name.lexeme}>"
 
 
+# Only made when a method is used as a value (`var f = obj.method;`). Calls
+# written as `obj.method(...)` invoke the method on the receiver directly.
+class LoxBoundMethod(LoxCallable):
+    __slots__ = ("_receiver", "_method")
+
+    def __init__(self, receiver: LoxInstance, method: Any) -> None:
+        self._receiver = receiver
+        self._method = method
+
+    def arity(self) -> int:
+        return self._method.arity()
+
+    def call(self, interpreter: "Interpreter", arguments: list[Any]) -> Any:
+        return self._method.invoke(interpreter, self._receiver, arguments)
+
+    def __repr__(self) -> str:
+        return repr(self._method)
+
+
 class ClockFunction(LoxCallable):
     def arity(self) -> int:
         return 0
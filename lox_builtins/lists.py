@@ -0,0 +1,183 @@
+from array import array
+from typing import Any, Callable, TYPE_CHECKING
+
+from errors import LoxNativeError
+
+from .functions import LoxCallable, LoxInstance
+from .shape import Shape
+
+if TYPE_CHECKING:
+    from interpreter import Interpreter
+
+
+# A method implemented in Python, called with the receiver and the interpreter
+# as its first arguments. Lookups and inline caches treat it like any other
+# method. Called unbound, it takes the receiver as its first argument.
+class NativeMethod(LoxCallable):
+    __slots__ = ("_arity", "_function")
+
+    def __init__(self, arity: int, function: Callable[..., Any]) -> None:
+        self._arity = arity
+        self._function = function
+
+    def arity(self) -> int:
+        return self._arity
+
+    def call(self, interpreter: "Interpreter", arguments: list[Any]) -> Any:
+        return self._function(arguments[0], interpreter, *arguments[1:])
+
+    def invoke(
+        self, interpreter: "Interpreter", receiver: Any, arguments: list[Any]
+    ) -> Any:
+        return self._function(receiver, interpreter, *arguments)
+
+    def __repr__(self) -> str:
+        return "<native fn>"
+
+
+# Looks enough like a LoxClass for instances to find their methods through
+# it, but isn't one, so it can't be inherited from.
+class NativeClass(LoxCallable):
+    def __init__(self, name: str, instance_type: type["LoxList"]) -> None:
+        self.name = name
+        self._instance_type = instance_type
+        self._methods = {
+            name: NativeMethod(arity, function)
+            for name, (arity, function) in instance_type.METHODS.items()
+        }
+        self._shape = Shape({})
+
+    def arity(self) -> int:
+        return 0
+
+    def call(self, interpreter: "Interpreter", arguments: list[Any]) -> Any:
+        interpreter._instances_left -= 1
+        if interpreter._instances_left < 0:
+            raise interpreter._too_many_instances()
+        return self._instance_type(self)
+
+    def find_method(self, name: str) -> Any:
+        return self._methods.get(name)
+
+    def __repr__(self) -> str:
+        return self.name
+
+
+def _index(index: Any, size: int) -> int:
+    if type(index) is not float or not index.is_integer():
+        raise LoxNativeError("Index must be an integer.")
+    position = int(index)
+    if not 0 <= position < size:
+        raise LoxNativeError("Index out of range.")
+    return position
+
+
+def _bounds(start: Any, end: Any, size: int) -> tuple[int, int]:
+    first = _index(start, size + 1)
+    last = _index(end, size + 1)
+    if last < first:
+        raise LoxNativeError("Index out of range.")
+    return first, last
+
+
+# Methods whose work grows with the length of a list are charged for it against
+# the interpreter's limits before they start.
+def _charge(interpreter: "Interpreter", items: int) -> None:
+    if items >= interpreter._bulk_size:
+        interpreter._charge(items)
+
+
+# Items live in a Python list, so indexing is O(1). Lists are instances, so
+# they can also carry fields.
+class LoxList(LoxInstance):
+    __slots__ = ("_items",)
+
+    def __init__(self, klass: NativeClass) -> None:
+        super().__init__(klass)
+        self._items: Any = self._new_items()
+
+    def _new_items(self) -> Any:
+        return []
+
+    def _check(self, value: Any) -> Any:
+        return value
+
+    def get_item(self, interpreter: "Interpreter", index: Any) -> Any:
+        return self._items[_index(index, len(self._items))]
+
+    def set_item(self, interpreter: "Interpreter", index: Any, value: Any) -> Any:
+        self._items[_index(index, len(self._items))] = self._check(value)
+        return value
+
+    def push(self, interpreter: "Interpreter", value: Any) -> None:
+        if len(self._items) >= interpreter._max_size:
+            raise interpreter._too_big()
+        self._items.append(self._check(value))
+
+    def pop(self, interpreter: "Interpreter") -> Any:
+        if not self._items:
+            raise LoxNativeError("Can't pop from an empty list.")
+        return self._items.pop()
+
+    def length(self, interpreter: "Interpreter") -> float:
+        return float(len(self._items))
+
+    def slice(self, interpreter: "Interpreter", start: Any, end: Any) -> "LoxList":
+        first, last = _bounds(start, end, len(self._items))
+        _charge(interpreter, last - first)
+        result = self._klass.call(interpreter, [])
+        result._items = self._items[first:last]
+        return result
+
+    METHODS: dict[str, tuple[int, Callable[..., Any]]] = {
+        "get": (1, get_item),
+        "set": (2, set_item),
+        "push": (1, push),
+        "pop": (0, pop),
+        "len": (0, length),
+        "slice": (2, slice),
+    }
+
+
+# A list of numbers stored unboxed in an array of doubles. Reductions run over
+# the array in Python's C loops rather than one Lox call per item.
+class NumberList(LoxList):
+    __slots__ = ()
+
+    def _new_items(self) -> Any:
+        return array("d")
+
+    def _check(self, value: Any) -> Any:
+        if type(value) is not float:
+            raise LoxNativeError("List values must be numbers.")
+        return value
+
+    def total(self, interpreter: "Interpreter") -> float:
+        _charge(interpreter, len(self._items))
+        return sum(self._items, 0.0)
+
+    def minimum(self, interpreter: "Interpreter") -> float | None:
+        _charge(interpreter, len(self._items))
+        return min(self._items, default=None)
+
+    def maximum(self, interpreter: "Interpreter") -> float | None:
+        _charge(interpreter, len(self._items))
+        return max(self._items, default=None)
+
+    def fill(self, interpreter: "Interpreter", value: Any, count: Any) -> None:
+        if type(count) is not float or not count.is_integer() or count < 0:
+            raise LoxNativeError("Count must be a non-negative integer.")
+        _charge(interpreter, int(count))
+        item = array("d", [self._check(value)])
+        try:
+            self._items = item * int(count)
+        except MemoryError:
+            raise LoxNativeError("Not enough memory for the list.")
+
+    METHODS = {
+        **LoxList.METHODS,
+        "sum": (0, total),
+        "min": (0, minimum),
+        "max": (0, maximum),
+        "fill": (2, fill),
+    }
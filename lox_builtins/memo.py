@@ -0,0 +1,99 @@
+from math import copysign
+from typing import Any, TYPE_CHECKING
+
+from abstract_syntax_tree.statements import Function
+
+from .functions import LoxCallable
+
+if TYPE_CHECKING:
+    from interpreter import Interpreter
+
+# Returned by `CallCache.get` when a call has not been seen.
+MISSING = object()
+
+# true == 1 and false == 0 in Python, so booleans are keyed by stand-ins.
+TRUE_KEY = object()
+FALSE_KEY = object()
+
+
+# Results of pure function calls, keyed on the declaration and the argument
+# values. Python dictionaries keep insertion order, so moving an entry to the
+# end on every hit leaves the least recently used entry first in line for
+# eviction.
+class CallCache:
+    __slots__ = ("size", "hits", "misses", "_entries")
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._entries: dict[tuple[Any, ...], Any] = {}
+
+    def get(self, key: tuple[Any, ...]) -> Any:
+        entries = self._entries
+        try:
+            value = entries.pop(key)
+        except KeyError:
+            self.misses += 1
+            return MISSING
+        entries[key] = value
+        self.hits += 1
+        return value
+
+    def put(self, key: tuple[Any, ...], value: Any) -> None:
+        entries = self._entries
+        entries[key] = value
+        if len(entries) > self.size:
+            del entries[next(iter(entries))]
+
+    def report(self) -> str:
+        return (
+            f"Pure calls: {self.hits} hits, {self.misses} misses, "
+            f"{len(self._entries)}/{self.size} entries"
+        )
+
+
+# Only nil, booleans, numbers and strings make a key. -0 and NaN are left out:
+# -0 looks up the entry for 0, and NaN never finds its own entry again.
+def call_key(declaration: Function, arguments: list[Any]) -> tuple[Any, ...] | None:
+    key = [declaration]
+    for value in arguments:
+        kind = type(value)
+        if kind is float:
+            if value != value or (value == 0.0 and copysign(1.0, value) < 0.0):
+                return None
+        elif kind is bool:
+            value = TRUE_KEY if value else FALSE_KEY
+        elif value is not None and kind is not str:
+            return None
+        key.append(value)
+    return tuple(key)
+
+
+# Wraps a function the purity analysis accepted. Arguments that can't be keyed
+# fall through to a plain call.
+class MemoizedFunction(LoxCallable):
+    __slots__ = ("_function", "_declaration", "_cache")
+
+    def __init__(
+        self, function: LoxCallable, declaration: Function, cache: CallCache
+    ) -> None:
+        self._function = function
+        self._declaration = declaration
+        self._cache = cache
+
+    def arity(self) -> int:
+        return self._function.arity()
+
+    def call(self, interpreter: "Interpreter", arguments: list[Any]) -> Any:
+        key = call_key(self._declaration, arguments)
+        if key is None:
+            return self._function.call(interpreter, arguments)
+        value = self._cache.get(key)
+        if value is MISSING:
+            value = self._function.call(interpreter, arguments)
+            self._cache.put(key, value)
+        return value
+
+    def __repr__(self) -> str:
+        return repr(self._function)
@@ -0,0 +1,31 @@
+# A shape maps field names to positions in an instance's value list. Every
+# class owns an empty root shape, and adding a field moves an instance along a
+# transition to the shape with that field appended. Transitions are shared, so
+# instances that gain the same fields in the same order end up with the same
+# shape object and inline caches can key on it with an identity check.
+class Shape:
+    __slots__ = ("_indices", "_transitions")
+
+    def __init__(self, indices: dict[str, int]) -> None:
+        self._indices = indices
+        self._transitions: dict[str, Shape] = {}
+
+    def index(self, name: str) -> int | None:
+        return self._indices.get(name)
+
+    def with_field(self, name: str) -> "Shape":
+        shape = self._transitions.get(name)
+        if shape is None:
+            indices = dict(self._indices)
+            indices.update({name: len(indices)})
+            shape = self._transitions[name] = Shape(indices)
+        return shape
+
+    # Where a store to `name` goes: the field's index and the shape the
+    # instance has afterwards, which is this shape unless the field is new.
+    def transition(self, name: str) -> tuple[int, "Shape"]:
+        index = self._indices.get(name)
+        if index is not None:
+            return index, self
+        target = self.with_field(name)
+        return target._indices[name], target
@@ -0,0 +1,196 @@
+from abstract_syntax_tree.expressions import (
+    Assign,
+    Binary,
+    Call,
+    Expr,
+    Get,
+    Grouping,
+    Literal,
+    Logical,
+    Set,
+    Super,
+    This,
+    Unary,
+    Variable,
+)
+from abstract_syntax_tree.statements import (
+    Block,
+    Class,
+    Expression,
+    Function,
+    If,
+    Print,
+    Return,
+    Stmt,
+    Var,
+    While,
+)
+from errors import LoxRuntimeError
+from interpreter import Interpreter
+from scanner.token import TokenType
+
+FOLD_CONSTANTS = 1
+ELIMINATE_DEAD_CODE = 2
+
+
+# Runs after the Resolver and rewrites the tree in place. Nodes that survive
+# keep their identity, so the slot and scope tables the Resolver recorded on
+# the interpreter stay valid; only literals, which need no table entries, and
+# empty blocks, which are registered here, are ever created. Constant
+# subexpressions are evaluated by a private Interpreter so results are exactly
+# what execution would produce. Any that would raise are left in the tree so
+# the error still happens at runtime, on the same line.
+class Optimizer(Expr.Visitor[Expr], Stmt.Visitor[Stmt | None]):
+    def __init__(
+        self, interpreter: Interpreter, level: int = ELIMINATE_DEAD_CODE
+    ) -> None:
+        self._interpreter = interpreter
+        self._level = level
+        self._evaluator = Interpreter()
+
+    def optimize(self, statements: list[Stmt]) -> list[Stmt]:
+        if self._level < FOLD_CONSTANTS:
+            return statements
+        return self._optimize_statements(statements)
+
+    def _optimize_statements(self, statements: list[Stmt]) -> list[Stmt]:
+        optimized: list[Stmt] = []
+        for statement in statements:
+            result = statement.accept(self)
+            if result is None:
+                continue
+            optimized.append(result)
+            if self._level >= ELIMINATE_DEAD_CODE and isinstance(result, Return):
+                break
+        return optimized
+
+    def _optimize_branch(self, stmt: Stmt) -> Stmt:
+        result = stmt.accept(self)
+        if result is None:
+            result = Block([])
+            self._interpreter.resolve_scope(result, 0)
+        return result
+
+    def _optimize(self, expr: Expr) -> Expr:
+        return expr.accept(self)
+
+    def _fold(self, expr: Expr) -> Expr:
+        try:
+            return Literal(expr.accept(self._evaluator))
+        except LoxRuntimeError:
+            return expr
+
+    def visit_block_stmt(self, stmt: Block) -> Stmt | None:
+        stmt._statements = self._optimize_statements(stmt._statements)
+        if self._level >= ELIMINATE_DEAD_CODE and not stmt._statements:
+            return None
+        return stmt
+
+    def visit_class_stmt(self, stmt: Class) -> Stmt | None:
+        for method in stmt._methods:
+            method.accept(self)
+        return stmt
+
+    def visit_expression_stmt(self, stmt: Expression) -> Stmt | None:
+        stmt._expression = self._optimize(stmt._expression)
+        if self._level >= ELIMINATE_DEAD_CODE and isinstance(stmt._expression, Literal):
+            return None
+        return stmt
+
+    def visit_function_stmt(self, stmt: Function) -> Stmt | None:
+        stmt._body = self._optimize_statements(stmt._body)
+        return stmt
+
+    def visit_if_stmt(self, stmt: If) -> Stmt | None:
+        stmt._condition = self._optimize(stmt._condition)
+        if self._level >= ELIMINATE_DEAD_CODE and isinstance(stmt._condition, Literal):
+            if self._evaluator._is_truthy(stmt._condition._value):
+                return stmt._then_branch.accept(self)
+            if stmt._else_branch is not None:
+                return stmt._else_branch.accept(self)
+            return None
+        stmt._then_branch = self._optimize_branch(stmt._then_branch)
+        if stmt._else_branch is not None:
+            stmt._else_branch = stmt._else_branch.accept(self)
+        return stmt
+
+    def visit_print_stmt(self, stmt: Print) -> Stmt | None:
+        stmt._expression = self._optimize(stmt._expression)
+        return stmt
+
+    def visit_return_stmt(self, stmt: Return) -> Stmt | None:
+        if stmt._value is not None:
+            stmt._value = self._optimize(stmt._value)
+        return stmt
+
+    def visit_var_stmt(self, stmt: Var) -> Stmt | None:
+        if stmt._initializer is not None:
+            stmt._initializer = self._optimize(stmt._initializer)
+        return stmt
+
+    def visit_while_stmt(self, stmt: While) -> Stmt | None:
+        stmt._condition = self._optimize(stmt._condition)
+        if (
+            self._level >= ELIMINATE_DEAD_CODE
+            and isinstance(stmt._condition, Literal)
+            and not self._evaluator._is_truthy(stmt._condition._value)
+        ):
+            return None
+        stmt._body = self._optimize_branch(stmt._body)
+        return stmt
+
+    def visit_assign_expr(self, expr: Assign) -> Expr:
+        expr._value = self._optimize(expr._value)
+        return expr
+
+    def visit_binary_expr(self, expr: Binary) -> Expr:
+        expr._left = self._optimize(expr._left)
+        expr._right = self._optimize(expr._right)
+        if isinstance(expr._left, Literal) and isinstance(expr._right, Literal):
+            return self._fold(expr)
+        return expr
+
+    def visit_call_expr(self, expr: Call) -> Expr:
+        expr._callee = self._optimize(expr._callee)
+        expr._arguments = [self._optimize(argument) for argument in expr._arguments]
+        return expr
+
+    def visit_get_expr(self, expr: Get) -> Expr:
+        expr._object = self._optimize(expr._object)
+        return expr
+
+    def visit_grouping_expr(self, expr: Grouping) -> Expr:
+        return self._optimize(expr._expression)
+
+    def visit_literal_expr(self, expr: Literal) -> Expr:
+        return expr
+
+    def visit_logical_expr(self, expr: Logical) -> Expr:
+        expr._left = self._optimize(expr._left)
+        expr._right = self._optimize(expr._right)
+        if not isinstance(expr._left, Literal):
+            return expr
+        truthy = self._evaluator._is_truthy(expr._left._value)
+        if expr._operator.type == TokenType.OR:
+            return expr._left if truthy else expr._right
+        return expr._right if truthy else expr._left
+
+    def visit_set_expr(self, expr: Set) -> Expr:
+        expr._object = self._optimize(expr._object)
+        expr._value = self._optimize(expr._value)
+        return expr
+
+    def visit_super_expr(self, expr: Super) -> Expr:
+        return expr
+
+    def visit_this_expr(self, expr: This) -> Expr:
+        return expr
+
+    def visit_unary_expr(self, expr: Unary) -> Expr:
+        expr._right = self._optimize(expr._right)
+        if isinstance(expr._right, Literal):
+            return self._fold(expr)
+        return expr
+
+    def visit_variable_expr(self, expr: Variable) -> Expr:
+        return expr
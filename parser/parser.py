@@ -1,4 +1,6 @@
-from errors import ErrorHandler, LoxParseError
+from typing import Iterable, Iterator
+
+from errors import Diagnostics, ErrorHandler, LoxParseError, Phase
 from scanner.token import Token, TokenType
 from abstract_syntax_tree.expressions import (
     Expr,
@@ -10,6 +12,8 @@ from abstract_syntax_tree.expressions import (
     Literal,
     Logical,
     Set,
+    Super,
+    This,
     Unary,
     Variable,
 )
@@ -27,32 +31,46 @@ from abstract_syntax_tree.statements import (
 )
 
 
+# The grammar only ever needs the current and the previous token, so the
+# parser pulls tokens from an iterator one at a time rather than indexing into
+# a list. Fed by `iter_tokens()` this keeps token memory constant and lets
+# `iter_statements()` hand out each declaration as soon as it is complete. The
+# next token is only fetched when it is first looked at, so a statement read
+# from an interactive stream is not held back waiting for the line after it.
 class Parser:
-    def __init__(self, tokens: list[Token]) -> None:
-        self._tokens = tokens
-        self._current = 0
+    def __init__(
+        self, tokens: Iterable[Token], diagnostics: Diagnostics | None = None
+    ) -> None:
+        self._tokens = iter(tokens)
+        self._diagnostics = diagnostics or ErrorHandler.diagnostics
+        self._current: Token | None = None
+        self._last: Token | None = None
 
     def parse(self) -> list[Stmt]:
-        statements: list[Stmt] = []
+        return list(self.iter_statements())
+
+    def iter_statements(self) -> Iterator[Stmt]:
         while not self._is_at_end():
             x = self._declaration()
             if x:
-                statements.append(x)
-        return statements
+                yield x
 
     def _peek(self) -> Token:
-        return self._tokens[self._current]
+        if self._current is None:
+            self._current = next(self._tokens)
+        return self._current
 
     def _is_at_end(self) -> bool:
         return self._peek().type == TokenType.EOF
 
     def _previous(self) -> Token:
-        return self._tokens[self._current - 1]
+        return self._last
 
     def _advance(self) -> Token:
         if not self._is_at_end():
-            self._current += 1
-        return self._previous()
+            self._last = self._current
+            self._current = None
+        return self._last
 
     def _check(self, t_type: TokenType) -> bool:
         if self._is_at_end():
@@ -67,9 +85,12 @@ class Parser:
         return False
 
     def _error(self, token: Token, message: str) -> LoxParseError:
-        ErrorHandler.error(token, message)
+        self._report(token, message)
         return LoxParseError()
 
+    def _report(self, token: Token, message: str) -> None:
+        self._diagnostics.error(Phase.PARSE, token, message)
+
     def _consume(self, t_type: TokenType, message: str) -> Token:
         if self._check(t_type):
             return self._advance()
@@ -103,6 +124,15 @@ class Parser:
             return Literal(None)
         if self._match(TokenType.NUMBER, TokenType.STRING):
             return Literal(self._previous().literal)
+        if self._match(TokenType.SUPER):
+            keyword = self._previous()
+            self._consume(TokenType.DOT, "Expect '.' after 'super'.")
+            method = self._consume(
+                TokenType.IDENTIFIER, "Expect superclass method name."
+            )
+            return Super(keyword, method)
+        if self._match(TokenType.THIS):
+            return This(self._previous())
         if self._match(TokenType.IDENTIFIER):
             return Variable(self._previous())
         if self._match(TokenType.LEFT_PAREN):
@@ -116,9 +146,7 @@ class Parser:
         if not self._check(TokenType.RIGHT_PAREN):
             while True:
                 if len(arguments) >= 255:
-                    ErrorHandler.error(
-                        self._peek(), "Can't have more than 255 arguments."
-                    )
+                    self._report(self._peek(), "Can't have more than 255 arguments.")
                 arguments.append(self._expression())
                 if not self._match(TokenType.COMMA):
                     break
@@ -210,7 +238,7 @@ class Parser:
             elif isinstance(expression, Get):
                 get = expression
                 return Set(get._object, get._name, value)
-            ErrorHandler.error(equals, "Invalid assignment target.")
+            self._report(equals, "Invalid assignment target.")
         return expression
 
     def _expression(self) -> Expr:
@@ -239,11 +267,12 @@ class Parser:
         return Var(name, initializer)
 
     def _while_statement(self) -> Stmt:
+        keyword = self._previous()
         self._consume(TokenType.LEFT_PAREN, "Expect '(' after 'while'.")
         condition = self._expression()
         self._consume(TokenType.RIGHT_PAREN, "Expect ')' after 'while' condition.")
         body = self._statement()
-        return While(condition, body)
+        return While(keyword, condition, body)
 
     def _function(self, kind: str) -> Function:
         name = self._consume(TokenType.IDENTIFIER, f"Expect {kind} name.")
@@ -252,9 +281,7 @@ class Parser:
         if not self._check(TokenType.RIGHT_PAREN):
             while True:
                 if len(parameters) >= 255:
-                    ErrorHandler.error(
-                        self._peek(), "Can't have more than 255 parameters."
-                    )
+                    self._report(self._peek(), "Can't have more than 255 parameters.")
                 parameters.append(
                     self._consume(TokenType.IDENTIFIER, "Expect parameter name.")
                 )
@@ -288,6 +315,7 @@ class Parser:
         return If(condition, then_branch, else_branch)
 
     def _for_statement(self) -> Stmt:
+        keyword = self._previous()
         self._consume(TokenType.LEFT_PAREN, "Expect '(' after 'for'.")
 
         if self._match(TokenType.SEMICOLON):
@@ -297,10 +325,12 @@ class Parser:
         else:
             initializer = self._expression_statement()
 
+        condition = None
         if not self._check(TokenType.SEMICOLON):
             condition = self._expression()
         self._consume(TokenType.SEMICOLON, "Expect ';' after 'for' condition.")
 
+        increment = None
         if not self._check(TokenType.RIGHT_PAREN):
             increment = self._expression()
         self._consume(TokenType.RIGHT_PAREN, "Expect ')' after 'for' clauses.")
@@ -311,7 +341,7 @@ class Parser:
             body = Block([body, Expression(increment)])
         if condition is None:
             condition = Literal(True)
-        body = While(condition, body)
+        body = While(keyword, condition, body)
         if initializer is not None:
             body = Block([initializer, body])
         return body
@@ -333,12 +363,16 @@ class Parser:
 
     def _class_declaration(self) -> Stmt:
         name = self._consume(TokenType.IDENTIFIER, "Expect class name.")
+        superclass: Variable | None = None
+        if self._match(TokenType.LESS):
+            self._consume(TokenType.IDENTIFIER, "Expect superclass name.")
+            superclass = Variable(self._previous())
         self._consume(TokenType.LEFT_BRACE, "Expect '{' before class body.")
         methods: list[Function] = []
         while not self._check(TokenType.RIGHT_BRACE) and not self._is_at_end():
             methods.append(self._function("method"))
         self._consume(TokenType.RIGHT_BRACE, "Expect '}' after class body.")
-        return Class(name, methods)
+        return Class(name, superclass, methods)
 
     def _declaration(self) -> Stmt | None:
         try:
@@ -0,0 +1,95 @@
+import json
+import traceback
+
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stderr, redirect_stdout
+from dataclasses import asdict, dataclass
+from functools import partial
+from glob import glob
+from io import StringIO
+from pathlib import Path
+from time import perf_counter
+from typing import Callable
+
+# Exit status recorded for a script that crashed the interpreter itself rather
+# than failing with a Lox error.
+CRASHED = 1
+
+
+class BatchError(Exception):
+    pass
+
+
+@dataclass
+class ScriptResult:
+    path: str
+    status: int
+    seconds: float
+    stdout: str
+    stderr: str
+
+
+def discover(target: str) -> list[Path]:
+    directory = Path(target)
+    if directory.is_dir():
+        paths = sorted(directory.rglob("*.lox"))
+    else:
+        paths = sorted(
+            path for path in map(Path, glob(target, recursive=True)) if path.is_file()
+        )
+    if not paths:
+        raise BatchError(f"No lox scripts found for '{target}'.")
+    return paths
+
+
+# Runs in a worker process. `execute` runs the script with its own Diagnostics
+# and returns its exit status, so nothing carries over to the next script the
+# worker is given.
+def run_script(execute: Callable[[str], int], path: Path) -> ScriptResult:
+    stdout, stderr = StringIO(), StringIO()
+    start = perf_counter()
+    with redirect_stdout(stdout), redirect_stderr(stderr):
+        try:
+            status = execute(path.read_text())
+        except Exception:
+            traceback.print_exc()
+            status = CRASHED
+    seconds = perf_counter() - start
+    return ScriptResult(
+        path=str(path),
+        status=status,
+        seconds=seconds,
+        stdout=stdout.getvalue(),
+        stderr=stderr.getvalue(),
+    )
+
+
+# `execute` is sent to the workers, so it has to be picklable: a module-level
+# function or a partial of one. Scripts are handed out in chunks to keep the
+# traffic between processes down when there are many small ones.
+def run_all(
+    paths: list[Path], execute: Callable[[str], int], jobs: int
+) -> list[ScriptResult]:
+    chunksize = max(1, len(paths) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(
+            executor.map(partial(run_script, execute), paths, chunksize=chunksize)
+        )
+
+
+def save(results: list[ScriptResult], path: Path) -> None:
+    path.write_text(json.dumps([asdict(result) for result in results], indent=2))
+
+
+def report(results: list[ScriptResult], elapsed: float) -> str:
+    statuses = Counter(result.status for result in results)
+    lines = [
+        f"{len(results)} scripts in {elapsed:.3f}s: "
+        f"{statuses[0]} ok, {statuses[65]} static errors, "
+        f"{statuses[70]} runtime errors, {statuses[CRASHED]} crashed"
+    ]
+    for result in results:
+        if result.status:
+            lines.append(f"{result.status:>4}  {result.seconds:>8.3f}s  {result.path}")
+    return "\n".join(lines)
@@ -0,0 +1,108 @@
+import json
+import re
+import statistics
+
+from contextlib import redirect_stdout
+from dataclasses import asdict, dataclass
+from io import StringIO
+from math import ceil
+from pathlib import Path
+from time import perf_counter
+from typing import Callable
+
+BENCHMARK_DIRECTORY = Path(__file__).resolve().parent.parent / "benchmarks"
+
+# Benchmarks declare how many operations one run performs with a leading
+# `// ops: N` comment so results can be reported as a throughput.
+OPS_PATTERN = re.compile(r"^//\s*ops:\s*(\d+)", re.MULTILINE)
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    engine: str
+    runs: int
+    ops: int
+    min: float
+    median: float
+    p95: float
+    ops_per_second: float
+
+
+def discover(directory: Path, names: list[str] | None = None) -> list[Path]:
+    available = {path.stem: path for path in sorted(directory.glob("*.lox"))}
+    if not names:
+        return list(available.values())
+    missing = [name for name in names if name not in available]
+    if missing:
+        raise BenchmarkError(f"Unknown benchmark(s): {', '.join(missing)}.")
+    return [available[name] for name in names]
+
+
+def measure(
+    path: Path, engine: str, runs: int, execute: Callable[[str], int]
+) -> BenchmarkResult:
+    source = path.read_text()
+    match = OPS_PATTERN.search(source)
+    ops = int(match.group(1)) if match else 1
+    timings: list[float] = []
+    for _ in range(runs):
+        with redirect_stdout(StringIO()):
+            start = perf_counter()
+            status = execute(source)
+            timings.append(perf_counter() - start)
+        if status:
+            raise BenchmarkError(f"Benchmark '{path.stem}' failed to run.")
+    timings.sort()
+    median = statistics.median(timings)
+    return BenchmarkResult(
+        name=path.stem,
+        engine=engine,
+        runs=runs,
+        ops=ops,
+        min=timings[0],
+        median=median,
+        p95=timings[ceil(0.95 * len(timings)) - 1],
+        ops_per_second=ops / median if median else 0.0,
+    )
+
+
+def save(results: list[BenchmarkResult], path: Path) -> None:
+    path.write_text(json.dumps([asdict(result) for result in results], indent=2))
+
+
+def load(path: Path) -> dict[str, BenchmarkResult]:
+    return {
+        entry["name"]: BenchmarkResult(**entry)
+        for entry in json.loads(path.read_text())
+    }
+
+
+def regression(result: BenchmarkResult, baseline: BenchmarkResult) -> float:
+    return (result.median / baseline.median - 1) * 100
+
+
+def report(
+    results: list[BenchmarkResult], baseline: dict[str, BenchmarkResult] | None
+) -> str:
+    header = f"{'benchmark':<18}{'min':>10}{'median':>10}{'p95':>10}{'ops/sec':>14}"
+    if baseline is not None:
+        header += f"{'vs base':>10}"
+    lines = [header]
+    for result in results:
+        line = (
+            f"{result.name:<18}{result.min:>9.3f}s{result.median:>9.3f}s"
+            f"{result.p95:>9.3f}s{result.ops_per_second:>14,.0f}"
+        )
+        if baseline is not None:
+            previous = baseline.get(result.name)
+            change = (
+                "n/a" if previous is None else f"{regression(result, previous):+.1f}%"
+            )
+            line += f"{change:>10}"
+        lines.append(line)
+    return "\n".join(lines)
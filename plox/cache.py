@@ -0,0 +1,131 @@
+import hashlib
+import os
+import pickle
+import sys
+import zlib
+
+from contextlib import suppress
+from dataclasses import dataclass
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+
+from abstract_syntax_tree.statements import Stmt
+
+# Bump whenever the AST or Token change shape so that artifacts written by an
+# older plox are never loaded by a newer one.
+FORMAT_VERSION = 5
+
+VERSION_TAG = f"{FORMAT_VERSION}-{sys.implementation.cache_tag}"
+
+SUFFIX = ".loxc"
+
+# Once the artifacts in a directory add up to more than this many bytes, the
+# least recently used are deleted after each save.
+MAX_SIZE = 32 * 1024 * 1024
+
+
+# Artifacts are pickles of the resolved program compressed with zlib. The
+# Resolver's results live on the nodes, so the statements are all there is to
+# store. Tokens and nodes pickle as plain tuples of their fields, and the fast
+# compression level shrinks the rest severalfold for a few milliseconds per
+# load.
+@dataclass
+class CompiledProgram:
+    statements: list[Stmt]
+
+
+def default_directory() -> Path:
+    if "PLOX_CACHE_DIR" in os.environ:
+        return Path(os.environ["PLOX_CACHE_DIR"])
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "plox"
+
+
+# Loading an artifact unpickles it, which can run arbitrary code, so the cache
+# only uses a directory owned by the current user that nobody else can write
+# to. Platforms without user ids skip the check.
+def is_trusted(directory: Path) -> bool:
+    try:
+        status = directory.stat()
+    except OSError:
+        return False
+    if not hasattr(os, "getuid"):
+        return True
+    return status.st_uid == os.getuid() and not status.st_mode & 0o022
+
+
+def cache_path(source: str, directory: Path, opt_level: int = 0) -> Path:
+    key = f"{VERSION_TAG}\0{opt_level}\0{source}"
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    return directory / f"{digest}{SUFFIX}"
+
+
+# A cache miss, an untrusted directory and an unreadable artifact are treated
+# the same way: the caller falls back to the front end and overwrites the
+# entry. A hit refreshes the artifact's mtime, which is what eviction goes by.
+def load(source: str, directory: Path, opt_level: int = 0) -> CompiledProgram | None:
+    if not is_trusted(directory):
+        return None
+    path = cache_path(source, directory, opt_level)
+    try:
+        data = zlib.decompress(path.read_bytes())
+        program = pickle.loads(data)
+    except (
+        OSError,
+        zlib.error,
+        pickle.UnpicklingError,
+        EOFError,
+        AttributeError,
+        ImportError,
+        TypeError,
+        ValueError,
+    ):
+        return None
+    if not isinstance(program, CompiledProgram):
+        return None
+    with suppress(OSError):
+        os.utime(path)
+    return program
+
+
+def save(
+    program: CompiledProgram, source: str, directory: Path, opt_level: int = 0
+) -> Path | None:
+    path = cache_path(source, directory, opt_level)
+    try:
+        directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+    except OSError:
+        return None
+    if not is_trusted(directory):
+        return None
+    try:
+        file = NamedTemporaryFile("wb", dir=directory, delete=False)
+    except OSError:
+        return None
+    # Written under a temporary name and renamed into place so that concurrent
+    # runs never see a partially written artifact.
+    try:
+        with file:
+            data = pickle.dumps(program, protocol=pickle.HIGHEST_PROTOCOL)
+            file.write(zlib.compress(data, 1))
+        os.replace(file.name, path)
+    except (OSError, RecursionError, pickle.PicklingError):
+        Path(file.name).unlink(missing_ok=True)
+        return None
+    evict(directory)
+    return path
+
+
+def evict(directory: Path, max_size: int = MAX_SIZE) -> None:
+    entries = []
+    for path in directory.glob(f"*{SUFFIX}"):
+        with suppress(OSError):
+            status = path.stat()
+            entries.append((status.st_mtime, status.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_size:
+            break
+        with suppress(OSError):
+            path.unlink()
+        total -= size
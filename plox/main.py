@@ -1,20 +1,81 @@
+import asyncio
+import os
 import sys
 
 import typer
 
-from typing import Annotated
+from contextlib import AbstractContextManager, nullcontext
+from functools import partial
+from pathlib import Path
+from time import perf_counter
+from typing import Annotated, Iterator, Optional, TextIO
 
-from abstract_syntax_tree import ASTPrinter
-from errors import ErrorHandler
-from interpreter import Interpreter
+from abstract_syntax_tree import ASTPrinter, memory_report
+from errors import Diagnostics
+from interpreter import Interpreter, Limits, Output, ProfilingInterpreter
+from lox_builtins import CallCache
+from optimizer import Optimizer
 from parser import Parser
+from plox import batch as batches
+from plox import bench as benchmarks
+from plox import cache as program_cache
+from plox.cache import CompiledProgram
+from plox.server import LoxServer
+from plox.runtime import (
+    Engine,
+    LoxRuntime,
+    ScannerKind,
+    front_end,
+    get_interpreter,
+    get_scanner,
+    run,
+)
 from resolver import Resolver
-from scanner import Scanner
+from scanner.regex_scanner import verify as verify_scanners
+from scanner.token import Token
 
 
 app = typer.Typer()
 
 
+ENGINE_HELP = "Execution engine used to run the script."
+SCANNER_HELP = "Scanner implementation used to tokenize the script."
+MEMOIZE_PURE_HELP = (
+    "Cache the results of calls to pure functions, those that only read their "
+    "own parameters and locals and call other pure functions. Not available "
+    "with --stream or the vm engine."
+)
+MEMO_SIZE_HELP = "Most results kept by --memoize-pure before evicting the oldest."
+OUTPUT_BUFFER_HELP = (
+    "Characters of print output collected before they are written, 0 to write "
+    "every line. Output to a terminal is always written line by line."
+)
+MAX_STEPS_HELP = (
+    "Loop iterations and function calls the script may run before it fails with "
+    "a runtime error. Unlimited if omitted."
+)
+TIMEOUT_HELP = (
+    "Seconds the script may run before it fails with a runtime error. Unlimited "
+    "if omitted."
+)
+MAX_DEPTH_HELP = (
+    "Function calls that may be active at once before a call fails with a "
+    "runtime error. Unlimited if omitted."
+)
+MAX_INSTANCES_HELP = (
+    "Instances the script may create before it fails with a runtime error. "
+    "Unlimited if omitted."
+)
+MAX_SIZE_HELP = (
+    "Characters in a string or items in a list the script may build before it "
+    "fails with a runtime error. Unlimited if omitted."
+)
+OPT_LEVEL_HELP = (
+    "Optimizer passes to run after resolution: 0 for none, 1 to fold constant "
+    "expressions, 2 to also remove unreachable branches and empty blocks."
+)
+
+
 @app.callback()
 def callback() -> None:
     """
@@ -27,14 +88,32 @@ def tokenize(
     filename: Annotated[
         str, typer.Argument(help="File containing the lox script to be tokenized.")
     ],
+    scanner: Annotated[
+        ScannerKind, typer.Option(help=SCANNER_HELP)
+    ] = ScannerKind.REGEX,
+    verify: Annotated[
+        bool,
+        typer.Option(
+            help="Check that both scanners produce identical tokens and errors."
+        ),
+    ] = False,
 ) -> None:
     """
     Tokenize a lox script and display the results of the lexing pass.
     """
-    tokens = get_tokens(filename)
+    if verify:
+        with open(filename) as file:
+            difference = verify_scanners(file.read())
+        if difference is not None:
+            print(f"Scanners differ: {difference}", file=sys.stderr)
+            exit(1)
+        print("Scanners agree.")
+        return
+    diagnostics = Diagnostics()
+    tokens = get_tokens(filename, scanner, diagnostics)
     for token in tokens:
         print(token)
-    if ErrorHandler.had_error:
+    if diagnostics.had_error:
         exit(65)
 
 
@@ -43,15 +122,37 @@ def parse(
     filename: Annotated[
         str, typer.Argument(help="File containing the lox script to be parsed.")
     ],
+    scanner: Annotated[
+        ScannerKind, typer.Option(help=SCANNER_HELP)
+    ] = ScannerKind.REGEX,
+    memory: Annotated[
+        bool,
+        typer.Option(
+            help="Print node counts and bytes per node type instead of the tree."
+        ),
+    ] = False,
+    optimized: Annotated[
+        bool,
+        typer.Option(help="Resolve and fully optimize the tree before displaying it."),
+    ] = False,
 ) -> None:
     """
     Parse a lox script and display the abstract syntax tree produced from the parsing pass.
     """
-    tokens = get_tokens(filename)
-    parser = Parser(tokens)
-    statements = parser.parse()
-    if ErrorHandler.had_error:
+    with open(filename) as file:
+        file_contents = file.read()
+    diagnostics = Diagnostics(file_contents)
+    if optimized:
+        interpreter = Interpreter(diagnostics)
+        statements = front_end(file_contents, interpreter, scanner, opt_level=2)
+    else:
+        tokens = get_scanner(scanner)(file_contents, True, diagnostics)
+        statements = Parser(tokens.iter_tokens(), diagnostics).parse()
+    if diagnostics.had_error:
         exit(65)
+    if memory:
+        print(memory_report(statements, len(file_contents.encode())))
+        return
     for statement in statements:
         print(ASTPrinter().print(statement))
 
@@ -59,51 +160,438 @@ def parse(
 @app.command()
 def interpret(
     filename: Annotated[
-        str, typer.Argument(help="File containing the lox script to be executed.")
+        str,
+        typer.Argument(
+            help="File containing the lox script to be executed, or - for stdin."
+        ),
     ],
+    engine: Annotated[Engine, typer.Option(help=ENGINE_HELP)] = Engine.TREE,
+    scanner: Annotated[
+        ScannerKind, typer.Option(help=SCANNER_HELP)
+    ] = ScannerKind.REGEX,
+    stream: Annotated[
+        bool,
+        typer.Option(
+            help="Execute each top-level statement as soon as it has been parsed "
+            "instead of parsing the whole script first."
+        ),
+    ] = False,
+    cache: Annotated[
+        bool,
+        typer.Option(
+            help="Reuse the parsed and resolved program from the .loxc cache, "
+            "writing it on a miss. Ignored when reading from stdin."
+        ),
+    ] = False,
+    opt_level: Annotated[int, typer.Option(min=0, max=2, help=OPT_LEVEL_HELP)] = 0,
+    memoize_pure: Annotated[bool, typer.Option(help=MEMOIZE_PURE_HELP)] = False,
+    memo_size: Annotated[int, typer.Option(min=1, help=MEMO_SIZE_HELP)] = 4096,
+    output_buffer: Annotated[int, typer.Option(min=0, help=OUTPUT_BUFFER_HELP)] = 65536,
+    max_steps: Annotated[
+        Optional[int], typer.Option(min=1, help=MAX_STEPS_HELP, show_default=False)
+    ] = None,
+    timeout: Annotated[
+        Optional[float], typer.Option(min=0, help=TIMEOUT_HELP, show_default=False)
+    ] = None,
+    max_depth: Annotated[
+        Optional[int], typer.Option(min=1, help=MAX_DEPTH_HELP, show_default=False)
+    ] = None,
+    max_instances: Annotated[
+        Optional[int],
+        typer.Option(min=0, help=MAX_INSTANCES_HELP, show_default=False),
+    ] = None,
+    max_size: Annotated[
+        Optional[int], typer.Option(min=1, help=MAX_SIZE_HELP, show_default=False)
+    ] = None,
 ) -> None:
     """
     Execute a lox script.
     """
+    if memoize_pure and (stream or engine == Engine.VM):
+        raise typer.BadParameter(
+            "needs the whole script up front and the tree or closure engine.",
+            param_hint="--memoize-pure",
+        )
+    diagnostics = Diagnostics()
+    interpreter = get_interpreter(engine, diagnostics)
+    interpreter.output = Output(buffer_size=output_buffer)
+    interpreter.limits = Limits(max_steps, timeout, max_depth, max_instances, max_size)
+    if memoize_pure:
+        interpreter.call_cache = CallCache(memo_size)
+    with open_source(filename) as file:
+        if stream:
+            source = file if scanner == ScannerKind.REGEX else file.read()
+            tokens = get_scanner(scanner)(source, diagnostics=diagnostics)
+            run_stream(tokens.iter_tokens(), interpreter, opt_level)
+        else:
+            cache_directory = None
+            if cache and filename != "-":
+                cache_directory = program_cache.default_directory()
+            run(file.read(), interpreter, scanner, cache_directory, opt_level)
+    if interpreter.call_cache is not None:
+        print(interpreter.call_cache.report(), file=sys.stderr)
+    if diagnostics.exit_code:
+        exit(diagnostics.exit_code)
+
+
+@app.command("compile")
+def compile_scripts(
+    filenames: Annotated[
+        list[str], typer.Argument(help="Files containing the lox scripts to compile.")
+    ],
+    scanner: Annotated[
+        ScannerKind, typer.Option(help=SCANNER_HELP)
+    ] = ScannerKind.REGEX,
+    opt_level: Annotated[int, typer.Option(min=0, max=2, help=OPT_LEVEL_HELP)] = 0,
+) -> None:
+    """
+    Parse and resolve lox scripts and store the results in the .loxc cache.
+    """
+    directory = program_cache.default_directory()
+    status = 0
+    for filename in filenames:
+        with open(filename) as file:
+            source = file.read()
+        interpreter = Interpreter(Diagnostics())
+        statements = front_end(source, interpreter, scanner, opt_level)
+        if statements is None:
+            status = 65
+            continue
+        path = program_cache.save(
+            CompiledProgram(statements), source, directory, opt_level
+        )
+        if path is None:
+            print(f"{filename}: could not write to {directory}", file=sys.stderr)
+            status = status or 1
+            continue
+        print(f"{filename} -> {path}")
+    if status:
+        exit(status)
+
+
+@app.command()
+def profile(
+    filename: Annotated[
+        str, typer.Argument(help="File containing the lox script to be profiled.")
+    ],
+    limit: Annotated[
+        int, typer.Option(help="Number of entries to show per table, 0 for all.")
+    ] = 20,
+    collapsed: Annotated[
+        Optional[Path],
+        typer.Option(help="Write collapsed call stacks for flamegraph tools."),
+    ] = None,
+) -> None:
+    """
+    Execute a lox script with profiling enabled and print the hottest lines and functions.
+    """
     with open(filename) as file:
         file_contents = file.read()
-    run(file_contents, Interpreter())
-    if ErrorHandler.had_error:
-        exit(65)
-    if ErrorHandler.had_runtime_error:
-        exit(70)
+    diagnostics = Diagnostics()
+    interpreter = ProfilingInterpreter(diagnostics)
+    run(file_contents, interpreter)
+    print(interpreter.report(limit), file=sys.stderr)
+    if collapsed is not None:
+        collapsed.write_text(interpreter.collapsed_stacks())
+    if diagnostics.exit_code:
+        exit(diagnostics.exit_code)
 
 
 @app.command()
-def repl() -> None:
+def repl(
+    engine: Annotated[Engine, typer.Option(help=ENGINE_HELP)] = Engine.TREE,
+) -> None:
     """
     Enter an interactive REPL for lox scripting.
     """
-    interpreter = Interpreter()
+    diagnostics = Diagnostics()
+    interpreter = get_interpreter(engine, diagnostics)
     print("> ", end="", flush=True)
     for line in sys.stdin:
         run(line, interpreter)
         print("> ", end="", flush=True)
-        ErrorHandler.had_error = False
-        ErrorHandler.had_runtime_error = False
+        diagnostics.clear()
 
 
-def run(source: str, interpreter: Interpreter) -> None:
-    scanner = Scanner(source)
-    tokens = scanner.scan_tokens()
-    parser = Parser(tokens)
-    statements = parser.parse()
-    if ErrorHandler.had_error:
-        return
+@app.command()
+def bench(
+    names: Annotated[
+        Optional[list[str]],
+        typer.Argument(
+            help="Benchmarks to run, by file name without the .lox extension. "
+            "Runs every benchmark if omitted.",
+            show_default=False,
+        ),
+    ] = None,
+    engine: Annotated[Engine, typer.Option(help=ENGINE_HELP)] = Engine.TREE,
+    runs: Annotated[
+        int, typer.Option("--runs", "-n", min=1, help="Timed runs per benchmark.")
+    ] = 5,
+    directory: Annotated[
+        Path, typer.Option(help="Directory containing the benchmark scripts.")
+    ] = benchmarks.BENCHMARK_DIRECTORY,
+    json_output: Annotated[
+        Optional[Path], typer.Option("--json", help="Write the results as JSON.")
+    ] = None,
+    baseline: Annotated[
+        Optional[Path],
+        typer.Option(help="JSON results of a previous run to compare against."),
+    ] = None,
+    max_regression: Annotated[
+        Optional[float],
+        typer.Option(
+            help="Exit with status 1 if any median is more than this many "
+            "percent slower than the baseline."
+        ),
+    ] = None,
+) -> None:
+    """
+    Run the benchmark suite and report wall time and throughput per script.
+    """
+    try:
+        paths = benchmarks.discover(directory, names)
+        results = [
+            benchmarks.measure(
+                path,
+                engine.value,
+                runs,
+                partial(
+                    run_with,
+                    engine=engine,
+                    scanner=ScannerKind.REGEX,
+                    cache_directory=None,
+                    opt_level=0,
+                ),
+            )
+            for path in paths
+        ]
+    except benchmarks.BenchmarkError as e:
+        print(e, file=sys.stderr)
+        exit(1)
+    previous = benchmarks.load(baseline) if baseline is not None else None
+    print(benchmarks.report(results, previous))
+    if json_output is not None:
+        benchmarks.save(results, json_output)
+    if previous is not None and max_regression is not None:
+        regressed = [
+            result.name
+            for result in results
+            if result.name in previous
+            and benchmarks.regression(result, previous[result.name]) > max_regression
+        ]
+        if regressed:
+            print(f"Regressed: {', '.join(regressed)}", file=sys.stderr)
+            exit(1)
+
+
+@app.command()
+def batch(
+    target: Annotated[
+        str,
+        typer.Argument(
+            help="Directory to search for .lox scripts, or a glob pattern "
+            "matching them."
+        ),
+    ],
+    engine: Annotated[Engine, typer.Option(help=ENGINE_HELP)] = Engine.TREE,
+    scanner: Annotated[
+        ScannerKind, typer.Option(help=SCANNER_HELP)
+    ] = ScannerKind.REGEX,
+    cache: Annotated[
+        bool,
+        typer.Option(
+            help="Reuse the parsed and resolved programs from the .loxc cache, "
+            "writing them on a miss."
+        ),
+    ] = False,
+    opt_level: Annotated[int, typer.Option(min=0, max=2, help=OPT_LEVEL_HELP)] = 0,
+    jobs: Annotated[
+        Optional[int],
+        typer.Option(
+            "--jobs",
+            "-j",
+            min=1,
+            help="Worker processes to run scripts in. Defaults to one per CPU.",
+            show_default=False,
+        ),
+    ] = None,
+    json_output: Annotated[
+        Optional[Path],
+        typer.Option(
+            "--json",
+            help="Write each script's exit status, time and output as JSON.",
+        ),
+    ] = None,
+) -> None:
+    """
+    Execute many lox scripts in parallel worker processes and summarize the results.
+    """
+    try:
+        paths = batches.discover(target)
+    except batches.BatchError as e:
+        print(e, file=sys.stderr)
+        exit(1)
+    cache_directory = program_cache.default_directory() if cache else None
+    execute = partial(
+        run_with,
+        engine=engine,
+        scanner=scanner,
+        cache_directory=cache_directory,
+        opt_level=opt_level,
+    )
+    start = perf_counter()
+    results = batches.run_all(paths, execute, jobs or os.cpu_count() or 1)
+    print(batches.report(results, perf_counter() - start))
+    if json_output is not None:
+        batches.save(results, json_output)
+    if any(result.status for result in results):
+        exit(1)
+
+
+@app.command()
+def serve(
+    socket: Annotated[
+        Optional[Path],
+        typer.Option(
+            help="Listen on a Unix socket at this path instead of over TCP.",
+            show_default=False,
+        ),
+    ] = None,
+    host: Annotated[
+        str, typer.Option(help="Address to listen on over TCP.")
+    ] = "127.0.0.1",
+    port: Annotated[int, typer.Option(help="Port to listen on over TCP.")] = 7878,
+    engine: Annotated[Engine, typer.Option(help=ENGINE_HELP)] = Engine.TREE,
+    workers: Annotated[
+        int,
+        typer.Option(
+            "--workers",
+            "-w",
+            min=1,
+            help="Programs run at the same time. Further requests wait for one "
+            "to finish.",
+        ),
+    ] = 4,
+    timeout: Annotated[
+        Optional[float],
+        typer.Option(
+            min=0,
+            help="Seconds a request may run before it fails with a runtime error.",
+        ),
+    ] = 5.0,
+    max_steps: Annotated[
+        Optional[int],
+        typer.Option(
+            min=1,
+            help="Loop iterations and function calls a request may run before it "
+            "fails with a runtime error. Unlimited if omitted.",
+            show_default=False,
+        ),
+    ] = None,
+    max_depth: Annotated[
+        Optional[int],
+        typer.Option(
+            min=1,
+            help="Function calls a request may have active at once before a call "
+            "fails with a runtime error. Unlimited if omitted.",
+            show_default=False,
+        ),
+    ] = None,
+    max_instances: Annotated[
+        Optional[int],
+        typer.Option(
+            min=0,
+            help="Instances a request may create before it fails with a runtime "
+            "error. Unlimited if omitted.",
+            show_default=False,
+        ),
+    ] = None,
+    max_size: Annotated[
+        Optional[int],
+        typer.Option(
+            min=1,
+            help="Characters in a string or items in a list a request may build "
+            "before it fails with a runtime error.",
+        ),
+    ] = 10_000_000,
+    opt_level: Annotated[int, typer.Option(min=0, max=2, help=OPT_LEVEL_HELP)] = 0,
+) -> None:
+    """
+    Run lox programs sent as JSON lines over a local socket.
+    """
+    runtime = LoxRuntime(
+        engine,
+        size=workers,
+        opt_level=opt_level,
+        limits=Limits(max_steps, timeout, max_depth, max_instances, max_size),
+    )
+    server = LoxServer(runtime)
+    if socket is not None:
+        serving = server.serve_unix(socket)
+        print(f"Serving on {socket}", file=sys.stderr)
+    else:
+        serving = server.serve_tcp(host, port)
+        print(f"Serving on {host}:{port}", file=sys.stderr)
+    try:
+        asyncio.run(serving)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+# Runs a script on a new interpreter for the engine and returns the exit status
+# `interpret` would give it. Batch workers are handed a partial of this, which
+# unlike a lambda can be pickled.
+def run_with(
+    source: str,
+    engine: Engine,
+    scanner: ScannerKind,
+    cache_directory: Path | None,
+    opt_level: int,
+) -> int:
+    diagnostics = Diagnostics()
+    interpreter = get_interpreter(engine, diagnostics)
+    run(source, interpreter, scanner, cache_directory, opt_level)
+    return diagnostics.exit_code
+
+
+def run_stream(
+    tokens: Iterator[Token], interpreter: Interpreter, opt_level: int = 0
+) -> None:
+    # Statements run as they are parsed, so a syntax error only stops the
+    # statements after it. Parsing carries on to report any further errors.
+    # The statements share the run's limits.
+    diagnostics = interpreter.diagnostics
+    interpreter.start_limits()
     resolver = Resolver(interpreter)
-    resolver.resolve_statements(statements)
-    if ErrorHandler.had_error:
-        return
-    interpreter.interpret(statements)
+    optimizer = Optimizer(interpreter, opt_level)
+    for statement in Parser(tokens, diagnostics).iter_statements():
+        if diagnostics.had_error:
+            continue
+        resolver.resolve(statement)
+        if diagnostics.had_error:
+            continue
+        interpreter.interpret(optimizer.optimize([statement]))
+        if diagnostics.had_runtime_error:
+            return
+
+
+def open_source(filename: str) -> AbstractContextManager[TextIO]:
+    if filename == "-":
+        return nullcontext(sys.stdin)
+    return open(filename)
 
 
-def get_tokens(filename):
+def get_tokens(
+    filename,
+    scanner: ScannerKind = ScannerKind.REGEX,
+    diagnostics: Diagnostics | None = None,
+):
     with open(filename) as file:
         file_contents = file.read()
-    tokens = Scanner(file_contents).scan_tokens()
+    if diagnostics is not None:
+        diagnostics.source = file_contents
+    offsets = diagnostics is not None
+    tokens = get_scanner(scanner)(file_contents, offsets, diagnostics).scan_tokens()
     return tokens
@@ -0,0 +1,204 @@
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
+from dataclasses import dataclass
+from enum import Enum
+from io import StringIO
+from pathlib import Path
+from queue import Queue
+from typing import Any
+
+from abstract_syntax_tree.statements import Stmt
+from closure_compiler import ClosureInterpreter
+from errors import Diagnostic, Diagnostics
+from interpreter import Interpreter, Limits, Output
+from lox_builtins import LoxCallable, LoxInstance
+from optimizer import Optimizer
+from parser import Parser
+from plox import cache as program_cache
+from plox.cache import CompiledProgram
+from resolver import PurityAnalyzer, Resolver
+from scanner import RegexScanner, Scanner
+from vm import VMInterpreter
+
+
+class Engine(str, Enum):
+    TREE = "tree"
+    CLOSURE = "closure"
+    VM = "vm"
+
+
+class ScannerKind(str, Enum):
+    CLASSIC = "classic"
+    REGEX = "regex"
+
+
+@dataclass
+class RunResult:
+    output: str
+    diagnostics: list[Diagnostic]
+    exit_code: int
+
+
+# Runs Lox programs from Python. The interpreters are created up front and
+# leased to one run at a time, so threads can share a runtime and each run
+# skips building an interpreter and its builtins. A leased interpreter is
+# reset before it goes back to the pool, and a run that has to wait for one
+# blocks until another finishes. Every run is held to `limits`.
+class LoxRuntime:
+    def __init__(
+        self,
+        engine: Engine = Engine.TREE,
+        size: int = 4,
+        scanner: ScannerKind = ScannerKind.REGEX,
+        opt_level: int = 0,
+        cache_directory: Path | None = None,
+        limits: Limits = Limits(),
+    ) -> None:
+        if size < 1:
+            raise ValueError("A runtime needs at least one interpreter.")
+        self.engine = engine
+        self.size = size
+        self.limits = limits
+        self._scanner = scanner
+        self._opt_level = opt_level
+        self._cache_directory = cache_directory
+        self._pool: Queue[Interpreter] = Queue()
+        for _ in range(size):
+            self._pool.put(self._new_interpreter())
+
+    def _new_interpreter(self) -> Interpreter:
+        interpreter = get_interpreter(self.engine)
+        interpreter.limits = self.limits
+        return interpreter
+
+    @contextmanager
+    def lease(self) -> Iterator[Interpreter]:
+        interpreter = self._pool.get()
+        try:
+            yield interpreter
+        finally:
+            interpreter.reset()
+            self._pool.put(interpreter)
+
+    # `globals` are defined alongside the builtins before the program runs.
+    # Python ints and floats become Lox numbers.
+    def run(self, source: str, globals: Mapping[str, Any] | None = None) -> RunResult:
+        with self.lease() as interpreter:
+            return self._run_on(interpreter, source, globals)
+
+    # A session keeps one interpreter of its own outside the pool.
+    def session(self) -> "LoxSession":
+        return LoxSession(self)
+
+    def _run_on(
+        self,
+        interpreter: Interpreter,
+        source: str,
+        globals: Mapping[str, Any] | None,
+    ) -> RunResult:
+        diagnostics = Diagnostics(source, echo=False)
+        output = StringIO()
+        interpreter.diagnostics = diagnostics
+        interpreter.output = Output(output, line_buffered=False)
+        for name, value in (globals or {}).items():
+            interpreter.globals.define(name, to_lox(name, value))
+        run(
+            source,
+            interpreter,
+            self._scanner,
+            self._cache_directory,
+            self._opt_level,
+        )
+        return RunResult(output.getvalue(), diagnostics.items, diagnostics.exit_code)
+
+
+# Runs one snippet after another on the same interpreter, like lines typed
+# into the REPL, so later snippets see the variables, functions and classes
+# of earlier ones. A session must not run two snippets at once.
+class LoxSession:
+    def __init__(self, runtime: LoxRuntime) -> None:
+        self._runtime = runtime
+        self._interpreter = runtime._new_interpreter()
+
+    def run(self, source: str, globals: Mapping[str, Any] | None = None) -> RunResult:
+        return self._runtime._run_on(self._interpreter, source, globals)
+
+
+def to_lox(name: str, value: Any) -> Any:
+    if value is None or isinstance(value, (bool, str, LoxCallable, LoxInstance)):
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    raise TypeError(
+        f"Global '{name}' is a {type(value).__name__}, which has no Lox equivalent."
+    )
+
+
+def run(
+    source: str,
+    interpreter: Interpreter,
+    scanner: ScannerKind = ScannerKind.REGEX,
+    cache_directory: Path | None = None,
+    opt_level: int = 0,
+) -> None:
+    interpreter.diagnostics.source = source
+    program = None
+    if cache_directory is not None:
+        program = program_cache.load(source, cache_directory, opt_level)
+    if program is not None:
+        statements = program.statements
+    else:
+        statements = front_end(source, interpreter, scanner, opt_level)
+        if statements is None:
+            return
+        if cache_directory is not None:
+            program_cache.save(
+                CompiledProgram(statements),
+                source,
+                cache_directory,
+                opt_level,
+            )
+    if interpreter.call_cache is not None:
+        PurityAnalyzer(interpreter).analyze(statements)
+    interpreter.start_limits()
+    interpreter.interpret(statements)
+
+
+def front_end(
+    source: str,
+    interpreter: Interpreter,
+    scanner: ScannerKind = ScannerKind.REGEX,
+    opt_level: int = 0,
+) -> list[Stmt] | None:
+    diagnostics = interpreter.diagnostics
+    offsets = diagnostics.source is not None
+    tokens = get_scanner(scanner)(source, offsets, diagnostics).iter_tokens()
+    parser = Parser(tokens, diagnostics)
+    statements = parser.parse()
+    if diagnostics.had_error:
+        return None
+    resolver = Resolver(interpreter)
+    resolver.resolve_statements(statements)
+    if diagnostics.had_error:
+        return None
+    return Optimizer(interpreter, opt_level).optimize(statements)
+
+
+def get_interpreter(
+    engine: Engine, diagnostics: Diagnostics | None = None
+) -> Interpreter:
+    match engine:
+        case Engine.TREE:
+            return Interpreter(diagnostics)
+        case Engine.CLOSURE:
+            return ClosureInterpreter(diagnostics)
+        case Engine.VM:
+            return VMInterpreter(diagnostics)
+
+
+def get_scanner(scanner: ScannerKind) -> type[Scanner] | type[RegexScanner]:
+    match scanner:
+        case ScannerKind.CLASSIC:
+            return Scanner
+        case ScannerKind.REGEX:
+            return RegexScanner
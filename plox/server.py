@@ -0,0 +1,113 @@
+import asyncio
+import json
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from functools import partial
+from pathlib import Path
+from typing import Any
+
+from plox.runtime import LoxRuntime, LoxSession, RunResult
+
+# Longest request line the server reads, in bytes. A longer one is skipped and
+# answered with an error.
+MAX_LINE = 1024 * 1024
+
+
+# Serves a LoxRuntime over a socket. A connection sends one JSON object per
+# line and gets one back per line, in order:
+#
+#   {"source": "print 1 + 2;"}
+#   {"output": "3\n", "diagnostics": [], "exit_code": 0}
+#
+# Requests carry optional "globals" for LoxRuntime.run, and "session": true
+# runs the source on an interpreter kept for the rest of the connection, so it
+# sees what earlier session requests defined. Programs run on a pool of
+# threads as big as the runtime's, which leaves the event loop free to accept
+# and read while they run. The runtime's limits are what stop a runaway
+# program; the thread running it can't be interrupted from outside.
+class LoxServer:
+    def __init__(self, runtime: LoxRuntime, max_line: int = MAX_LINE) -> None:
+        self._runtime = runtime
+        self._max_line = max_line
+        self._executor = ThreadPoolExecutor(max_workers=runtime.size)
+
+    async def start_tcp(self, host: str, port: int) -> asyncio.Server:
+        return await asyncio.start_server(self.handle, host, port, limit=self._max_line)
+
+    async def start_unix(self, path: Path) -> asyncio.Server:
+        return await asyncio.start_unix_server(self.handle, path, limit=self._max_line)
+
+    async def serve_tcp(self, host: str, port: int) -> None:
+        async with await self.start_tcp(host, port) as server:
+            await server.serve_forever()
+
+    async def serve_unix(self, path: Path) -> None:
+        async with await self.start_unix(path) as server:
+            await server.serve_forever()
+
+    def close(self) -> None:
+        self._executor.shutdown(cancel_futures=True)
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        session: LoxSession | None = None
+        try:
+            while True:
+                try:
+                    line = await self._read_line(reader)
+                    if not line:
+                        break
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("Request must be a JSON object.")
+                    source = request.get("source")
+                    if not isinstance(source, str):
+                        raise ValueError("Request needs a 'source' string.")
+                    if request.get("session") and session is None:
+                        session = self._runtime.session()
+                    response = await self._run(
+                        session if request.get("session") else None,
+                        source,
+                        request.get("globals"),
+                    )
+                except ConnectionError:
+                    raise
+                except Exception as e:
+                    response = {"error": f"{type(e).__name__}: {e}"}
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    # Like StreamReader.readline, but a line longer than the limit is read to
+    # its end and dropped, so the request after it is still read whole.
+    async def _read_line(self, reader: asyncio.StreamReader) -> bytes:
+        try:
+            return await reader.readuntil(b"\n")
+        except asyncio.IncompleteReadError as e:
+            return e.partial
+        except asyncio.LimitOverrunError:
+            pass
+        while True:
+            try:
+                await reader.readuntil(b"\n")
+                break
+            except asyncio.IncompleteReadError:
+                break
+            except asyncio.LimitOverrunError as e:
+                await reader.readexactly(e.consumed)
+        raise ValueError(f"Request is longer than {self._max_line} bytes.")
+
+    async def _run(
+        self, session: LoxSession | None, source: str, globals: Any
+    ) -> dict[str, Any]:
+        execute = self._runtime.run if session is None else session.run
+        loop = asyncio.get_running_loop()
+        result: RunResult = await loop.run_in_executor(
+            self._executor, partial(execute, source, globals)
+        )
+        return asdict(result)
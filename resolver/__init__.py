@@ -1,3 +1,4 @@
+from .purity import PurityAnalyzer
 from .resolver import Resolver
 
-__all__ = ["Resolver"]
+__all__ = ["Resolver", "PurityAnalyzer"]
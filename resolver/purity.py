@@ -0,0 +1,234 @@
+from collections import defaultdict
+
+from abstract_syntax_tree.expressions import (
+    Assign,
+    Binary,
+    Call,
+    Expr,
+    Get,
+    Grouping,
+    Literal,
+    Logical,
+    Set,
+    Super,
+    This,
+    Unary,
+    Variable,
+)
+from abstract_syntax_tree.statements import (
+    Block,
+    Class,
+    Expression,
+    Function,
+    If,
+    Print,
+    Return,
+    Stmt,
+    Var,
+    While,
+)
+from interpreter import Interpreter
+from scanner.token import Token
+
+# A variable is identified by the scope that declares it and its slot there,
+# or by its name when it is global.
+Binding = tuple[int | None, int | str]
+
+
+class FunctionSummary:
+    __slots__ = ("depth", "impure", "callees")
+
+    def __init__(self) -> None:
+        self.depth = 0
+        self.impure = False
+        self.callees: list[Binding] = []
+
+
+# A function is pure when it reads and assigns only its own parameters and
+# locals, prints nothing, touches no fields, declares no functions or classes
+# and calls only pure functions, so a call with the same arguments always
+# returns the same value and nothing else can tell it ran. Callees are found by
+# name, and a name only counts as a function when one `fun` declaration binds
+# it and nothing assigns to it. Calls may be recursive, so every candidate
+# starts out pure and the ones calling anything else are dropped until nothing
+# changes. Scopes are opened exactly where the Resolver opens them so that its
+# depths can be followed back to the declaring scope.
+class PurityAnalyzer(Expr.Visitor[None], Stmt.Visitor[None]):
+    def __init__(self, interpreter: Interpreter) -> None:
+        self._interpreter = interpreter
+        self._scopes: list[int] = []
+        self._scope_count = 0
+        self._functions: list[FunctionSummary] = []
+        self._candidates: dict[Function, FunctionSummary] = {}
+        self._declarations: defaultdict[Binding, list[Stmt]] = defaultdict(list)
+        self._assigned: set[Binding] = set()
+
+    def analyze(self, statements: list[Stmt]) -> None:
+        for statement in statements:
+            self._visit(statement)
+        pure = {
+            function
+            for function, summary in self._candidates.items()
+            if not summary.impure
+        }
+        changed = True
+        while changed:
+            changed = False
+            for function in list(pure):
+                callees = self._candidates[function].callees
+                if any(self._function(callee) not in pure for callee in callees):
+                    pure.discard(function)
+                    changed = True
+        for function in pure:
+            self._interpreter.resolve_pure(function)
+
+    def _visit(self, x: Expr | Stmt) -> None:
+        x.accept(self)
+
+    def _function(self, binding: Binding) -> Stmt | None:
+        declarations = self._declarations.get(binding)
+        if binding in self._assigned or declarations is None:
+            return None
+        if len(declarations) != 1:
+            return None
+        return declarations[0]
+
+    def _binding(self, node: Expr | Stmt, name: Token) -> Binding:
+        local = node._local
+        if local is None:
+            return (None, name.lexeme)
+        depth, slot = local
+        return (self._scopes[-1 - depth], slot)
+
+    def _is_own_local(self, node: Expr) -> bool:
+        local = node._local
+        return local is not None and local[0] < self._functions[-1].depth
+
+    def _mark_impure(self) -> None:
+        if self._functions:
+            self._functions[-1].impure = True
+
+    def _begin_scope(self) -> None:
+        self._scope_count += 1
+        self._scopes.append(self._scope_count)
+        if self._functions:
+            self._functions[-1].depth += 1
+
+    def _end_scope(self) -> None:
+        self._scopes.pop()
+        if self._functions:
+            self._functions[-1].depth -= 1
+
+    def _analyze_function(self, function: Function, candidate: bool) -> None:
+        summary = FunctionSummary()
+        self._functions.append(summary)
+        self._begin_scope()
+        for statement in function._body:
+            self._visit(statement)
+        self._end_scope()
+        self._functions.pop()
+        if candidate:
+            self._candidates.update({function: summary})
+
+    def visit_block_stmt(self, stmt: Block) -> None:
+        self._begin_scope()
+        for statement in stmt._statements:
+            self._visit(statement)
+        self._end_scope()
+
+    def visit_class_stmt(self, stmt: Class) -> None:
+        self._mark_impure()
+        self._declarations[self._binding(stmt, stmt._name)].append(stmt)
+        if stmt._superclass is not None:
+            self._visit(stmt._superclass)
+            self._begin_scope()
+        for method in stmt._methods:
+            self._analyze_function(method, False)
+        if stmt._superclass is not None:
+            self._end_scope()
+
+    def visit_function_stmt(self, stmt: Function) -> None:
+        self._mark_impure()
+        self._declarations[self._binding(stmt, stmt._name)].append(stmt)
+        self._analyze_function(stmt, True)
+
+    def visit_expression_stmt(self, stmt: Expression) -> None:
+        self._visit(stmt._expression)
+
+    def visit_if_stmt(self, stmt: If) -> None:
+        self._visit(stmt._condition)
+        self._visit(stmt._then_branch)
+        if stmt._else_branch:
+            self._visit(stmt._else_branch)
+
+    def visit_print_stmt(self, stmt: Print) -> None:
+        self._mark_impure()
+        self._visit(stmt._expression)
+
+    def visit_return_stmt(self, stmt: Return) -> None:
+        if stmt._value is not None:
+            self._visit(stmt._value)
+
+    def visit_var_stmt(self, stmt: Var) -> None:
+        if stmt._initializer is not None:
+            self._visit(stmt._initializer)
+        self._declarations[self._binding(stmt, stmt._name)].append(stmt)
+
+    def visit_while_stmt(self, stmt: While) -> None:
+        self._visit(stmt._condition)
+        self._visit(stmt._body)
+
+    def visit_assign_expr(self, expr: Assign) -> None:
+        self._visit(expr._value)
+        self._assigned.add(self._binding(expr, expr._name))
+        if self._functions and not self._is_own_local(expr):
+            self._mark_impure()
+
+    def visit_binary_expr(self, expr: Binary) -> None:
+        self._visit(expr._left)
+        self._visit(expr._right)
+
+    def visit_call_expr(self, expr: Call) -> None:
+        callee = expr._callee
+        if type(callee) is not Variable:
+            self._mark_impure()
+            self._visit(callee)
+        elif self._functions:
+            if self._is_own_local(callee):
+                self._mark_impure()
+            else:
+                self._functions[-1].callees.append(self._binding(callee, callee._name))
+        for argument in expr._arguments:
+            self._visit(argument)
+
+    def visit_get_expr(self, expr: Get) -> None:
+        self._mark_impure()
+        self._visit(expr._object)
+
+    def visit_grouping_expr(self, expr: Grouping) -> None:
+        self._visit(expr._expression)
+
+    def visit_literal_expr(self, expr: Literal) -> None:
+        pass
+
+    def visit_logical_expr(self, expr: Logical) -> None:
+        self._visit(expr._left)
+        self._visit(expr._right)
+
+    def visit_set_expr(self, expr: Set) -> None:
+        self._mark_impure()
+        self._visit(expr._value)
+        self._visit(expr._object)
+
+    def visit_super_expr(self, expr: Super) -> None:
+        self._mark_impure()
+
+    def visit_this_expr(self, expr: This) -> None:
+        self._mark_impure()
+
+    def visit_unary_expr(self, expr: Unary) -> None:
+        self._visit(expr._right)
+
+    def visit_variable_expr(self, expr: Variable) -> None:
+        if self._functions and not self._is_own_local(expr):
+            self._mark_impure()
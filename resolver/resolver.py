@@ -11,6 +11,8 @@ from abstract_syntax_tree.expressions import (
     Literal,
     Logical,
     Set,
+    Super,
+    This,
     Unary,
     Variable,
 )
@@ -26,21 +28,36 @@ from abstract_syntax_tree.statements import (
     Var,
     While,
 )
-from errors import ErrorHandler
+from errors import Diagnostics, Phase
 from interpreter import Interpreter
 from scanner.token import Token
 
 
+# A method's receiver is not given a scope of its own: `this` takes the slot
+# after the parameters in the method's scope, so a call only ever builds the
+# one environment. The superclass lives in a single-slot scope wrapped around a
+# subclass's methods, created once when the class statement runs.
 class Resolver(Expr.Visitor[None], Stmt.Visitor[None]):
     class FunctionType(Enum):
         NONE = auto()
         FUNCTION = auto()
+        INITIALIZER = auto()
         METHOD = auto()
 
-    def __init__(self, interpreter: Interpreter) -> None:
+    class ClassType(Enum):
+        NONE = auto()
+        CLASS = auto()
+        SUBCLASS = auto()
+
+    def __init__(
+        self, interpreter: Interpreter, diagnostics: Diagnostics | None = None
+    ) -> None:
         self._interpreter = interpreter
+        self._diagnostics = diagnostics or interpreter.diagnostics
         self._scopes: deque[dict[str, bool]] = deque()
+        self._slots: deque[dict[str, int]] = deque()
         self._current_function = Resolver.FunctionType.NONE
+        self._current_class = Resolver.ClassType.NONE
 
     def resolve(self, x: Expr | Stmt) -> None:
         x.accept(self)
@@ -58,49 +75,88 @@ class Resolver(Expr.Visitor[None], Stmt.Visitor[None]):
         for param in function._params:
             self._declare(param)
             self._define(param)
+        if f_type != Resolver.FunctionType.FUNCTION:
+            self._declare_synthetic("this")
         self.resolve_statements(function._body)
-        self._end_scope()
+        self._end_scope(function)
         self._current_function = enclosing_function
 
+    def _error(self, token: Token, message: str) -> None:
+        self._diagnostics.error(Phase.RESOLVE, token, message)
+
     def _begin_scope(self) -> None:
         self._scopes.append({})
+        self._slots.append({})
 
-    def _end_scope(self) -> None:
+    def _end_scope(self, node: Block | Function) -> None:
         self._scopes.pop()
+        self._interpreter.resolve_scope(node, len(self._slots.pop()))
 
     def _declare(self, name: Token) -> None:
         if not self._scopes:
             return None
         scope = self._scopes[-1]
         if name.lexeme in scope.keys():
-            ErrorHandler.error(name, "Already a variable with this name in this scope.")
+            self._error(name, "Already a variable with this name in this scope.")
         scope.update({name.lexeme: False})
+        slots = self._slots[-1]
+        if name.lexeme not in slots.keys():
+            slots.update({name.lexeme: len(slots)})
+
+    def _declare_synthetic(self, name: str) -> None:
+        self._scopes[-1].update({name: True})
+        slots = self._slots[-1]
+        slots.update({name: len(slots)})
 
     def _define(self, name: Token) -> None:
         if not self._scopes:
             return None
         self._scopes[-1].update({name.lexeme: True})
 
-    def _resolve_local(self, expr: Expr, name: Token):
-        for i, scope in enumerate(reversed(self._scopes)):
-            if name.lexeme in scope.keys():
-                self._interpreter.resolve(expr, i)
+    def _resolve_declaration(self, stmt: Stmt, name: Token) -> None:
+        if not self._slots:
+            return None
+        self._interpreter.resolve(stmt, 0, self._slots[-1][name.lexeme])
+
+    def _resolve_local(self, expr: Expr, name: Token) -> None:
+        for i, slots in enumerate(reversed(self._slots)):
+            if name.lexeme in slots.keys():
+                self._interpreter.resolve(expr, i, slots[name.lexeme])
+                return
 
     def visit_block_stmt(self, stmt: Block) -> None:
         self._begin_scope()
         self.resolve_statements(stmt._statements)
-        self._end_scope()
+        self._end_scope(stmt)
 
     def visit_class_stmt(self, stmt: Class) -> None:
+        enclosing_class = self._current_class
+        self._current_class = Resolver.ClassType.CLASS
         self._declare(stmt._name)
         self._define(stmt._name)
+        self._resolve_declaration(stmt, stmt._name)
+        superclass = stmt._superclass
+        if superclass is not None:
+            if superclass._name.lexeme == stmt._name.lexeme:
+                self._error(superclass._name, "A class can't inherit from itself.")
+            self._current_class = Resolver.ClassType.SUBCLASS
+            self.resolve(superclass)
+            self._begin_scope()
+            self._declare_synthetic("super")
         for method in stmt._methods:
             declaration = Resolver.FunctionType.METHOD
+            if method._name.lexeme == "init":
+                declaration = Resolver.FunctionType.INITIALIZER
             self._resolve_function(method, declaration)
+        if superclass is not None:
+            self._scopes.pop()
+            self._slots.pop()
+        self._current_class = enclosing_class
 
     def visit_function_stmt(self, stmt: Function) -> None:
         self._declare(stmt._name)
         self._define(stmt._name)
+        self._resolve_declaration(stmt, stmt._name)
         self._resolve_function(stmt, Resolver.FunctionType.FUNCTION)
 
     def visit_expression_stmt(self, stmt: Expression) -> None:
@@ -117,8 +173,10 @@ class Resolver(Expr.Visitor[None], Stmt.Visitor[None]):
 
     def visit_return_stmt(self, stmt: Return) -> None:
         if self._current_function == Resolver.FunctionType.NONE:
-            ErrorHandler.error(stmt._keyword, "Can't return from top-level code.")
+            self._error(stmt._keyword, "Can't return from top-level code.")
         if stmt._value is not None:
+            if self._current_function == Resolver.FunctionType.INITIALIZER:
+                self._error(stmt._keyword, "Can't return a value from an initializer.")
             self.resolve(stmt._value)
 
     def visit_var_stmt(self, stmt: Var) -> None:
@@ -126,6 +184,7 @@ class Resolver(Expr.Visitor[None], Stmt.Visitor[None]):
         if stmt._initializer is not None:
             self.resolve(stmt._initializer)
         self._define(stmt._name)
+        self._resolve_declaration(stmt, stmt._name)
 
     def visit_while_stmt(self, stmt: While) -> None:
         self.resolve(stmt._condition)
@@ -161,12 +220,28 @@ class Resolver(Expr.Visitor[None], Stmt.Visitor[None]):
         self.resolve(expr._value)
         self.resolve(expr._object)
 
+    def visit_super_expr(self, expr: Super) -> None:
+        if self._current_class == Resolver.ClassType.NONE:
+            self._error(expr._keyword, "Can't use 'super' outside of a class.")
+        elif self._current_class != Resolver.ClassType.SUBCLASS:
+            self._error(
+                expr._keyword, "Can't use 'super' in a class with no superclass."
+            )
+        self._resolve_local(expr, expr._keyword)
+        self._resolve_local(expr._this, expr._this._keyword)
+
+    def visit_this_expr(self, expr: This) -> None:
+        if self._current_class == Resolver.ClassType.NONE:
+            self._error(expr._keyword, "Can't use 'this' outside of a class.")
+            return
+        self._resolve_local(expr, expr._keyword)
+
     def visit_unary_expr(self, expr: Unary) -> None:
         self.resolve(expr._right)
 
     def visit_variable_expr(self, expr: Variable) -> None:
         if self._scopes and self._scopes[-1].get(expr._name.lexeme) is False:
-            ErrorHandler.error(
+            self._error(
                 expr._name, "Can't read local variable in it's own initializer."
             )
         self._resolve_local(expr, expr._name)
@@ -1,3 +1,4 @@
+from .regex_scanner import RegexScanner
 from .scanner import Scanner
 
-__all__ = ["Scanner"]
+__all__ = ["RegexScanner", "Scanner"]
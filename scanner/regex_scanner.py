@@ -0,0 +1,186 @@
+import re
+import sys
+
+from typing import Generator, Iterator, TextIO
+
+from errors import Diagnostics, ErrorHandler, Phase
+
+from .scanner import Scanner
+from .token import Token, TokenType
+
+# One alternative per lexical class, tried in order at each position. The
+# identifier class is deliberately wider than the classic scanner's rules
+# (any \w after the first character) and non-ASCII matches are trimmed to
+# the classic definition, which keeps the common ASCII case to a single match.
+TOKEN_PATTERN = re.compile(
+    r"""
+    (?P<whitespace>[ \t\r\n]+)
+    | (?P<comment>//[^\n]*)
+    | (?P<number>[0-9]+(?:\.[0-9]+)?)
+    | (?P<identifier>[^\W\d]\w*)
+    | (?P<string>"[^"]*")
+    | (?P<unterminated>"[^"]*)
+    | (?P<operator>!=|==|<=|>=|[(){},.\-+;*!=<>/])
+    | (?P<other>.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+OPERATORS = {
+    "(": TokenType.LEFT_PAREN,
+    ")": TokenType.RIGHT_PAREN,
+    "{": TokenType.LEFT_BRACE,
+    "}": TokenType.RIGHT_BRACE,
+    ",": TokenType.COMMA,
+    ".": TokenType.DOT,
+    "-": TokenType.MINUS,
+    "+": TokenType.PLUS,
+    ";": TokenType.SEMICOLON,
+    "*": TokenType.STAR,
+    "/": TokenType.SLASH,
+    "!": TokenType.BANG,
+    "!=": TokenType.BANG_EQUAL,
+    "=": TokenType.EQUAL,
+    "==": TokenType.EQUAL_EQUAL,
+    ">": TokenType.GREATER,
+    ">=": TokenType.GREATER_EQUAL,
+    "<": TokenType.LESS,
+    "<=": TokenType.LESS_EQUAL,
+}
+
+
+class RegexScanner:
+    def __init__(
+        self,
+        source: str | TextIO,
+        offsets: bool = False,
+        diagnostics: Diagnostics | None = None,
+    ) -> None:
+        self._source = source
+        self._offsets = offsets
+        self._diagnostics = diagnostics or ErrorHandler.diagnostics
+        self._line = 1
+        self._offset = 0
+
+    def scan_tokens(self) -> list[Token]:
+        return list(self.iter_tokens())
+
+    def iter_tokens(self) -> Iterator[Token]:
+        if isinstance(self._source, str):
+            yield from self._scan(self._source, True)
+        else:
+            # Streams are read a line at a time. A token that runs up to the
+            # end of the text read so far may continue in the next line, so it
+            # is held back and rescanned once more input has arrived.
+            pending = ""
+            for chunk in self._source:
+                pending = yield from self._scan(pending + chunk, False)
+            yield from self._scan(pending, True)
+        token = Token(TokenType.EOF, "", None, self._line)
+        if self._offsets:
+            token.start = token.end = self._offset
+        yield token
+
+    def _scan(self, source: str, final: bool) -> Generator[Token, None, str]:
+        match_at = TOKEN_PATTERN.match
+        keywords = Scanner.keywords
+        intern = sys.intern
+        offsets = self._offsets
+        error = self._diagnostics.error
+        line = self._line
+        position = 0
+        end = len(source)
+        while position < end:
+            match = match_at(source, position)
+            if not final and match.end() == end:
+                self._line = line
+                self._offset += position
+                return source[position:]
+            kind = match.lastgroup
+            text = match.group()
+            start = position
+            position = match.end()
+            if kind == "whitespace":
+                line += text.count("\n")
+                continue
+            elif kind == "identifier":
+                if not text.isascii():
+                    trimmed = _classic_identifier(text)
+                    if not trimmed:
+                        error(
+                            Phase.SCAN,
+                            line,
+                            f"Unexpected character: {text[0]}",
+                            self._offset + start,
+                        )
+                        position = start + 1
+                        continue
+                    text = trimmed
+                    position = start + len(text)
+                text = intern(text)
+                token = Token(
+                    keywords.get(text, TokenType.IDENTIFIER), text, None, line
+                )
+            elif kind == "operator":
+                text = intern(text)
+                token = Token(OPERATORS[text], text, None, line)
+            elif kind == "number":
+                token = Token(TokenType.NUMBER, text, float(text), line)
+            elif kind == "string":
+                line += text.count("\n")
+                token = Token(TokenType.STRING, text, text[1:-1], line)
+            elif kind == "unterminated":
+                line += text.count("\n")
+                error(Phase.SCAN, line, "Unterminated string.", self._offset + start)
+                continue
+            else:
+                if kind == "other":
+                    error(
+                        Phase.SCAN,
+                        line,
+                        f"Unexpected character: {text}",
+                        self._offset + start,
+                    )
+                continue
+            if offsets:
+                token.start = self._offset + start
+                token.end = self._offset + position
+            yield token
+        self._line = line
+        self._offset += end
+        return ""
+
+
+def _classic_identifier(text: str) -> str:
+    if not (text[0].isalpha() or text[0] == "_"):
+        return ""
+    for i, char in enumerate(text):
+        if not (char.isalpha() or char == "_" or char in "0123456789"):
+            return text[:i]
+    return text
+
+
+def _fields(token: Token) -> tuple:
+    return (token.type, token.lexeme, token.literal, token.line)
+
+
+def verify(source: str) -> str | None:
+    outputs = []
+    for scanner in (Scanner, RegexScanner):
+        diagnostics = Diagnostics(source, echo=False)
+        tokens = scanner(source, diagnostics=diagnostics).scan_tokens()
+        outputs.append((tokens, diagnostics.items))
+    (expected, expected_errors), (actual, actual_errors) = outputs
+    for i, (a, b) in enumerate(zip(expected, actual)):
+        if _fields(a) != _fields(b):
+            return (
+                f"token {i}: expected {a!r} on line {a.line}, "
+                f"got {b!r} on line {b.line}"
+            )
+    if len(expected) != len(actual):
+        return f"expected {len(expected)} tokens, got {len(actual)}"
+    if expected_errors != actual_errors:
+        expected_text = "".join(f"{error}\n" for error in expected_errors)
+        actual_text = "".join(f"{error}\n" for error in actual_errors)
+        return f"errors differ:\n{expected_text}---\n{actual_text}"
+    return None
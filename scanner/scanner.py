@@ -1,6 +1,8 @@
-from typing import Any
+import sys
 
-from errors import ErrorHandler
+from typing import Any, Iterator
+
+from errors import Diagnostics, ErrorHandler, Phase
 
 from .token import Token, TokenType
 
@@ -25,8 +27,15 @@ class Scanner:
         "while": TokenType.WHILE,
     }
 
-    def __init__(self, source: str) -> None:
+    def __init__(
+        self,
+        source: str,
+        offsets: bool = False,
+        diagnostics: Diagnostics | None = None,
+    ) -> None:
         self._source = source
+        self._offsets = offsets
+        self._diagnostics = diagnostics or ErrorHandler.diagnostics
         self._tokens: list[Token] = []
         self._start = 0
         self._current = 0
@@ -60,7 +69,13 @@ class Scanner:
 
     def _add_token(self, t_type: TokenType, literal: Any | None = None) -> None:
         text = self._source[self._start : self._current]
-        self._tokens.append(Token(t_type, text, literal, self._line))
+        if literal is None:
+            text = sys.intern(text)
+        token = Token(t_type, text, literal, self._line)
+        if self._offsets:
+            token.start = self._start
+            token.end = self._current
+        self._tokens.append(token)
 
     def _string(self) -> None:
         while self._peek() != '"' and not self._is_at_end():
@@ -68,7 +83,9 @@ class Scanner:
                 self._line += 1
             self._advance()
         if self._is_at_end():
-            ErrorHandler.error(self._line, "Unterminated string.")
+            self._diagnostics.error(
+                Phase.SCAN, self._line, "Unterminated string.", self._start
+            )
             return
         self._advance()
         self._add_token(
@@ -104,11 +121,19 @@ class Scanner:
         self._add_token(t_type)
 
     def scan_tokens(self) -> list[Token]:
+        return list(self.iter_tokens())
+
+    def iter_tokens(self) -> Iterator[Token]:
         while not self._is_at_end():
             self._start = self._current
             self.scan_token()
-        self._tokens.append(Token(TokenType.EOF, "", None, self._line))
-        return self._tokens
+            if self._tokens:
+                yield from self._tokens
+                self._tokens.clear()
+        token = Token(TokenType.EOF, "", None, self._line)
+        if self._offsets:
+            token.start = token.end = len(self._source)
+        yield token
 
     def scan_token(self) -> None:
         char = self._advance()
@@ -176,4 +201,9 @@ class Scanner:
                     self._identifier()
                 # Anythin else
                 else:
-                    ErrorHandler.error(self._line, f"Unexpected character: {char}")
+                    self._diagnostics.error(
+                        Phase.SCAN,
+                        self._line,
+                        f"Unexpected character: {char}",
+                        self._start,
+                    )
@@ -53,18 +53,35 @@ class TokenType(Enum):
     EOF = auto()
 
 
+# Scripts can run to millions of tokens, so tokens carry no instance dict.
+# Identifier, keyword and operator lexemes are interned by the scanners, which
+# means every occurrence of a name shares one string and dict lookups keyed on
+# `lexeme` can short-circuit on identity. `start` and `end` are offsets into the
+# source and are only filled in when a scanner is asked to record them.
 class Token:
+    __slots__ = ("type", "lexeme", "literal", "line", "start", "end")
+
     def __init__(
         self,
         t_type: TokenType,
         lexeme: str,
         literal: Any,
         line: int,
+        start: int | None = None,
+        end: int | None = None,
     ) -> None:
         self.type = t_type
         self.lexeme = lexeme
         self.literal = literal
         self.line = line
+        self.start = start
+        self.end = end
+
+    def __getstate__(self) -> tuple:
+        return (self.type, self.lexeme, self.literal, self.line, self.start, self.end)
+
+    def __setstate__(self, state: tuple) -> None:
+        self.type, self.lexeme, self.literal, self.line, self.start, self.end = state
 
     def __repr__(self) -> str:
         if self.literal is None:
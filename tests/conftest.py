@@ -0,0 +1,4 @@
+# The errors and scanner packages import each other, which only works when
+# scanner is imported first, as the CLI and the runtime do. Importing it here
+# lets a test module import errors before anything else.
+import scanner  # noqa: F401
@@ -0,0 +1,82 @@
+import pickle
+
+from abstract_syntax_tree.expressions import Expr, all_slots
+from abstract_syntax_tree.fused import (
+    GlobalCall,
+    LocalAdd,
+    LocalCompare,
+    LocalIncrement,
+)
+from abstract_syntax_tree.statements import Stmt
+from interpreter import Interpreter
+from interpreter.fusion import Fuser
+from plox.runtime import front_end
+from scanner.token import Token
+
+SOURCE = """
+fun count() {
+  var i = 0;
+  var total = 0;
+  while (i < 10) {
+    i = i + 1;
+    total = total + i;
+  }
+  return total;
+}
+print count();
+"""
+
+
+def nodes(value: object) -> list[Expr | Stmt]:
+    if isinstance(value, list):
+        return [node for item in value for node in nodes(item)]
+    if not isinstance(value, (Expr, Stmt)):
+        return []
+    found = [value]
+    for slot in all_slots(type(value)):
+        found.extend(nodes(getattr(value, slot)))
+    return found
+
+
+def fields(node: Expr | Stmt) -> dict[str, object]:
+    values = {}
+    for slot in all_slots(type(node)):
+        value = getattr(node, slot)
+        if isinstance(value, Token):
+            values[slot] = value.__getstate__()
+        elif slot != "_cache" and not isinstance(value, (Expr, Stmt, list)):
+            values[slot] = value
+    return values
+
+
+def test_all_slots_includes_inherited_slots() -> None:
+    slots = all_slots(LocalIncrement)
+    assert slots[:3] == ("_name", "_value", "_local")
+    assert "_constant" in slots
+
+
+def test_fused_nodes_pickle_with_every_field() -> None:
+    interpreter = Interpreter()
+    statements = front_end(SOURCE, interpreter)
+    assert statements is not None
+    Fuser(interpreter).fuse(statements)
+    loaded = pickle.loads(pickle.dumps(statements))
+
+    before, after = nodes(statements), nodes(loaded)
+    assert [type(node) for node in after] == [type(node) for node in before]
+    fused = {type(node) for node in after}
+    assert {GlobalCall, LocalAdd, LocalCompare, LocalIncrement} <= fused
+    for original, copy in zip(before, after):
+        assert fields(copy) == fields(original)
+
+
+def test_node_ids_are_distinct_and_kept_by_fused_nodes() -> None:
+    interpreter = Interpreter()
+    statements = front_end(SOURCE, interpreter)
+    assert statements is not None
+    ids = [node._id for node in nodes(statements)]
+    assert len(set(ids)) == len(ids)
+    Fuser(interpreter).fuse(statements)
+    assert sorted(node._id for node in nodes(statements)) == sorted(ids)
+    loaded = pickle.loads(pickle.dumps(statements))
+    assert not {node._id for node in nodes(loaded)} & set(ids)
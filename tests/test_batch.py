@@ -0,0 +1,87 @@
+from functools import partial
+from pathlib import Path
+
+import pytest
+
+from typer.testing import CliRunner
+
+from plox import batch
+from plox.main import app, run_with
+from plox.runtime import Engine, ScannerKind
+
+SCRIPTS = {
+    "ok.lox": 'print "ok";',
+    "static.lox": "print (;",
+    "runtime.lox": 'print "before";\nprint nope;',
+}
+
+
+def write_scripts(directory: Path) -> list[Path]:
+    for name, source in SCRIPTS.items():
+        (directory / name).write_text(source)
+    return batch.discover(str(directory))
+
+
+def crash(source: str) -> int:
+    raise ValueError("boom")
+
+
+@pytest.mark.parametrize("engine", list(Engine))
+def test_each_script_gets_its_status_and_output(engine: Engine, tmp_path: Path) -> None:
+    execute = partial(
+        run_with,
+        engine=engine,
+        scanner=ScannerKind.REGEX,
+        cache_directory=None,
+        opt_level=0,
+    )
+    results = batch.run_all(write_scripts(tmp_path), execute, jobs=2)
+    captured = {
+        Path(result.path).name: (result.status, result.stdout, result.stderr)
+        for result in results
+    }
+    assert captured == {
+        "ok.lox": (0, "ok\n", ""),
+        "static.lox": (65, "", "[line 1] Error a ';': Expect expression.\n"),
+        "runtime.lox": (70, "before\nUndefined variable 'nope'.\n[line 2]\n", ""),
+    }
+
+
+def test_crashes_are_recorded_with_their_traceback(tmp_path: Path) -> None:
+    path = tmp_path / "any.lox"
+    path.write_text("print 1;")
+    result = batch.run_script(crash, path)
+    assert result.status == batch.CRASHED
+    assert result.stderr.rstrip().endswith("ValueError: boom")
+
+
+def test_discover_sorts_matches_and_rejects_no_match(tmp_path: Path) -> None:
+    write_scripts(tmp_path)
+    (tmp_path / "notes.txt").write_text("")
+    paths = batch.discover(str(tmp_path / "*.lox"))
+    assert [path.name for path in paths] == ["ok.lox", "runtime.lox", "static.lox"]
+    with pytest.raises(batch.BatchError):
+        batch.discover(str(tmp_path / "*.missing"))
+
+
+def test_report_counts_each_status() -> None:
+    results = [
+        batch.ScriptResult("a.lox", 0, 0.1, "", ""),
+        batch.ScriptResult("b.lox", 65, 0.2, "", ""),
+        batch.ScriptResult("c.lox", 70, 0.3, "", ""),
+        batch.ScriptResult("d.lox", batch.CRASHED, 0.4, "", ""),
+    ]
+    lines = batch.report(results, 1.0).splitlines()
+    assert lines[0] == (
+        "4 scripts in 1.000s: 1 ok, 1 static errors, 1 runtime errors, 1 crashed"
+    )
+    assert [line.split()[0] for line in lines[1:]] == ["65", "70", "1"]
+
+
+def test_batch_exits_with_1_when_a_script_fails(tmp_path: Path) -> None:
+    (tmp_path / "ok.lox").write_text("print 1;")
+    result = CliRunner().invoke(app, ["batch", str(tmp_path), "--jobs", "1"])
+    assert result.exit_code == 0
+    write_scripts(tmp_path)
+    result = CliRunner().invoke(app, ["batch", str(tmp_path), "--jobs", "1"])
+    assert result.exit_code == 1
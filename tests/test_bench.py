@@ -0,0 +1,65 @@
+import json
+
+from itertools import chain
+from pathlib import Path
+
+import pytest
+
+from typer.testing import CliRunner
+
+from plox import bench
+from plox.main import app
+
+# Twenty timed runs, shuffled: 1s up to 20s.
+DURATIONS = [
+    float(n)
+    for n in (7, 3, 20, 1, 12, 5, 9, 18, 2, 15, 4, 6, 8, 10, 11, 13, 14, 16, 17, 19)
+]
+
+
+def result(name: str, median: float) -> bench.BenchmarkResult:
+    return bench.BenchmarkResult(name, "tree", 1, 1, median, median, median, 1.0)
+
+
+def test_measure_reports_min_median_and_p95(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    path = tmp_path / "loop.lox"
+    path.write_text("// ops: 210\nprint 1;")
+    clock = iter(chain.from_iterable((0.0, duration) for duration in DURATIONS))
+    monkeypatch.setattr(bench, "perf_counter", lambda: next(clock))
+    measured = bench.measure(path, "tree", len(DURATIONS), lambda source: 0)
+    assert (measured.min, measured.median, measured.p95) == (1.0, 10.5, 19.0)
+    assert (measured.ops, measured.ops_per_second) == (210, 20.0)
+
+
+def test_benchmarks_that_fail_are_errors(tmp_path: Path) -> None:
+    path = tmp_path / "broken.lox"
+    path.write_text("print nope;")
+    with pytest.raises(bench.BenchmarkError):
+        bench.measure(path, "tree", 1, lambda source: 70)
+
+
+def test_regression_is_the_percent_change_in_median() -> None:
+    assert bench.regression(result("a", 1.5), result("a", 1.2)) == pytest.approx(25)
+    assert bench.regression(result("a", 0.9), result("a", 1.2)) == pytest.approx(-25)
+
+
+def test_report_compares_with_the_baseline() -> None:
+    lines = bench.report(
+        [result("fib", 1.1), result("new", 1.0)], {"fib": result("fib", 1.0)}
+    ).splitlines()
+    assert lines[0].endswith("vs base")
+    assert lines[1].endswith("+10.0%")
+    assert lines[2].endswith("n/a")
+
+
+def test_bench_fails_past_the_allowed_regression(tmp_path: Path) -> None:
+    (tmp_path / "quick.lox").write_text("// ops: 1\nprint 1;")
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps([vars(result("quick", 1e-9))]))
+    options = ["bench", "--runs", "1", "--directory", str(tmp_path)]
+    options += ["--baseline", str(baseline)]
+    assert CliRunner().invoke(app, options).exit_code == 0
+    options += ["--max-regression", "50"]
+    assert CliRunner().invoke(app, options).exit_code == 1
@@ -0,0 +1,80 @@
+import os
+
+from pathlib import Path
+
+import pytest
+
+from errors import Diagnostics
+from interpreter import Interpreter
+from plox import cache
+from plox.cache import CompiledProgram
+from plox.runtime import Engine, LoxRuntime, front_end
+
+SOURCE = """
+class Counter {
+  init() { this.count = 0; }
+  add(n) {
+    for (var i = 0; i < n; i = i + 1) this.count = this.count + 1;
+    return this;
+  }
+}
+fun make() {
+  var counter = Counter();
+  fun add(n) { return counter.add(n).count; }
+  return add;
+}
+var add = make();
+add(2);
+print add(3);
+"""
+
+
+def compile_source(source: str) -> CompiledProgram:
+    statements = front_end(source, Interpreter(Diagnostics(echo=False)))
+    assert statements is not None
+    return CompiledProgram(statements)
+
+
+@pytest.mark.parametrize("engine", list(Engine))
+def test_cached_program_runs_like_a_fresh_one(engine: Engine, tmp_path: Path) -> None:
+    runtime = LoxRuntime(engine, size=1, cache_directory=tmp_path)
+    first = runtime.run(SOURCE)
+    assert cache.cache_path(SOURCE, tmp_path).exists()
+    assert cache.load(SOURCE, tmp_path) is not None
+    second = runtime.run(SOURCE)
+    assert first.output == second.output == "5\n"
+    assert second.exit_code == 0
+
+
+def test_artifacts_are_keyed_by_opt_level(tmp_path: Path) -> None:
+    cache.save(compile_source(SOURCE), SOURCE, tmp_path, opt_level=1)
+    assert cache.load(SOURCE, tmp_path, opt_level=1) is not None
+    assert cache.load(SOURCE, tmp_path, opt_level=0) is None
+
+
+def test_new_directories_are_private(tmp_path: Path) -> None:
+    directory = tmp_path / "plox"
+    assert cache.save(compile_source(SOURCE), SOURCE, directory) is not None
+    assert directory.stat().st_mode & 0o777 == 0o700
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="needs user ids")
+def test_writable_directories_are_refused(tmp_path: Path) -> None:
+    assert cache.save(compile_source(SOURCE), SOURCE, tmp_path) is not None
+    tmp_path.chmod(0o777)
+    try:
+        assert not cache.is_trusted(tmp_path)
+        assert cache.load(SOURCE, tmp_path) is None
+        assert cache.save(compile_source("print 1;"), "print 1;", tmp_path) is None
+    finally:
+        tmp_path.chmod(0o700)
+
+
+def test_eviction_drops_the_least_recently_used(tmp_path: Path) -> None:
+    for age, name in enumerate(["new", "middle", "old"]):
+        path = tmp_path / f"{name}{cache.SUFFIX}"
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (1000 - age, 1000 - age))
+    cache.evict(tmp_path, max_size=250)
+    remaining = sorted(path.stem for path in tmp_path.glob(f"*{cache.SUFFIX}"))
+    assert remaining == ["middle", "new"]
@@ -0,0 +1,42 @@
+import pytest
+
+from errors import Phase
+from plox.runtime import Engine, LoxRuntime
+
+SELF_REFERENCE = "Can't read local variable in it's own initializer."
+LOCALS = "{\n" + "".join(f"var a{i};" for i in range(257)) + "\n}"
+
+
+def first_error(engine: Engine, source: str) -> tuple[Phase, int, int | None, str]:
+    [diagnostic, *_] = LoxRuntime(engine, size=1).run(source).diagnostics
+    return diagnostic.phase, diagnostic.line, diagnostic.column, diagnostic.message
+
+
+@pytest.mark.parametrize("engine", list(Engine))
+@pytest.mark.parametrize(
+    "source, expected",
+    [
+        ('print "a" @;', (Phase.SCAN, 1, 11, "Unexpected character: @")),
+        ("print (1;", (Phase.PARSE, 1, 9, "Expect ')' after expression.")),
+        ("{ var a = a; }", (Phase.RESOLVE, 1, 11, SELF_REFERENCE)),
+        ("print 1;\nprint x + nil;", (Phase.RUNTIME, 2, 7, "Undefined variable 'x'.")),
+        (
+            "print 1 + nil;",
+            (Phase.RUNTIME, 1, 9, "Operands must be two numbers or two strings."),
+        ),
+        (
+            "fun f() {}\n  f(1);",
+            (Phase.RUNTIME, 2, 6, "Expected 0 arguments but got 1."),
+        ),
+    ],
+)
+def test_every_phase_reports_columns(
+    engine: Engine, source: str, expected: tuple[Phase, int, int, str]
+) -> None:
+    assert first_error(engine, source) == expected
+
+
+def test_compile_errors_report_columns() -> None:
+    column = LOCALS.index("a255") - LOCALS.index("\n")
+    expected = (Phase.COMPILE, 2, column, "Too many local variables in function.")
+    assert first_error(Engine.VM, LOCALS) == expected
@@ -0,0 +1,172 @@
+import pytest
+
+from plox.runtime import Engine, LoxRuntime, RunResult
+
+PROGRAMS = {
+    "arithmetic": (
+        """
+        print 1 + 2 * 3 - 4 / 8;
+        print -(3) == -3;
+        print "a" + "b" == "ab";
+        print !nil and (1 < 2 or 3 > 4);
+        print 7 >= 7 and 6 <= 5;
+        print nil == false;
+        """,
+        "6.5\ntrue\ntrue\ntrue\nfalse\nfalse\n",
+    ),
+    "scopes": (
+        """
+        var a = "global";
+        {
+          var a = "outer";
+          {
+            var a = "inner";
+            print a;
+          }
+          print a;
+        }
+        print a;
+        """,
+        "inner\nouter\nglobal\n",
+    ),
+    "loops": (
+        """
+        var total = 0;
+        for (var i = 0; i < 10; i = i + 1) {
+          if (i == 5) total = total + 100;
+          else total = total + i;
+        }
+        var j = 3;
+        while (j > 0) j = j - 1;
+        print total;
+        print j;
+        """,
+        "140\n0\n",
+    ),
+    "closures": (
+        """
+        fun counter() {
+          var count = 0;
+          fun increment() { count = count + 1; return count; }
+          return increment;
+        }
+        var a = counter();
+        var b = counter();
+        a(); a();
+        print a();
+        print b();
+        var fs = nil;
+        for (var i = 0; i < 3; i = i + 1) {
+          fun show() { print i; }
+          if (i == 1) fs = show;
+        }
+        fs();
+        """,
+        "3\n1\n3\n",
+    ),
+    "recursion": (
+        """
+        fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); }
+        fun noReturn() {}
+        print fib(15);
+        print noReturn();
+        print fib;
+        print clock() > 0;
+        """,
+        "610\nnil\n<fn fib>\ntrue\n",
+    ),
+    "classes": (
+        """
+        class Animal {
+          init(name) { this.name = name; }
+          speak() { return this.name + " makes a sound"; }
+          rename(name) { this.name = name; return this; }
+        }
+        class Dog < Animal {
+          init(name) { super.init(name); this.tricks = 0; }
+          speak() { return super.speak() + ", woof"; }
+        }
+        var d = Dog("Rex");
+        print d.speak();
+        print d.rename("Max").speak();
+        var speak = d.speak;
+        d.name = "Bo";
+        print speak();
+        print d.init("Al") == d;
+        print Dog;
+        print d;
+        """,
+        "Rex makes a sound, woof\nMax makes a sound, woof\nBo makes a sound, woof\n"
+        "true\nDog\nDog instance\n",
+    ),
+    "fields holding functions": (
+        """
+        class Box {}
+        fun double(x) { return x * 2; }
+        var box = Box();
+        box.f = double;
+        print box.f(21);
+        """,
+        "42\n",
+    ),
+}
+
+ERRORS = {
+    "undefined variable": (
+        "print 1;\nprint nope;",
+        "1\n",
+        2,
+        "Undefined variable 'nope'.",
+    ),
+    "bad operands": (
+        'print "a" - 1;',
+        "",
+        1,
+        "Operands must be numbers.",
+    ),
+    "arity": (
+        "fun f(a) {}\nf();",
+        "",
+        2,
+        "Expected 1 arguments but got 0.",
+    ),
+    "not callable": ('"text"();', "", 1, "Can only call functions and classes."),
+    "missing property": (
+        "class A {}\nprint A().x;",
+        "",
+        2,
+        "Undefined property 'x'.",
+    ),
+    "bad superclass": (
+        "var NotClass = 1;\nclass A < NotClass {}",
+        "",
+        2,
+        "Superclass must be a class.",
+    ),
+    "stack overflow": ("fun f() { f(); }\nf();", "", 1, "Stack overflow."),
+}
+
+
+def run(engine: Engine, source: str) -> RunResult:
+    return LoxRuntime(engine, size=1).run(source)
+
+
+@pytest.mark.parametrize("engine", list(Engine))
+@pytest.mark.parametrize("name", PROGRAMS)
+def test_programs_print_the_same_on_every_engine(engine: Engine, name: str) -> None:
+    source, expected = PROGRAMS[name]
+    result = run(engine, source)
+    assert (result.output, result.diagnostics) == (expected, [])
+
+
+@pytest.mark.parametrize("engine", list(Engine))
+@pytest.mark.parametrize("name", ERRORS)
+def test_runtime_errors_match_on_every_engine(engine: Engine, name: str) -> None:
+    source, output, line, message = ERRORS[name]
+    result = run(engine, source)
+    assert result.output == output
+    assert result.exit_code == 70
+    [error] = result.diagnostics
+    assert (error.line, error.message) == (line, message)
+    tree = run(Engine.TREE, source).diagnostics
+    assert result.diagnostics == tree
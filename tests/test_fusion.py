@@ -0,0 +1,105 @@
+from io import StringIO
+
+import pytest
+
+from abstract_syntax_tree.expressions import Expr, all_slots
+from abstract_syntax_tree.fused import (
+    GlobalCall,
+    LocalAdd,
+    LocalCompare,
+    LocalIncrement,
+)
+from abstract_syntax_tree.statements import Stmt
+from errors import Diagnostics
+from interpreter import Interpreter, Output
+from interpreter.fusion import Fuser
+from plox.runtime import front_end, run
+
+PROGRAMS = [
+    """
+    fun loop() {
+      var total = 0;
+      for (var i = 0; i < 10; i = i + 1) total = total + i;
+      var j = 10;
+      while (j >= 0) j = j - 3;
+      return total + j;
+    }
+    print loop();
+    """,
+    """
+    fun mixed() {
+      var a = "con";
+      var b = "cat";
+      var n = nil;
+      var t = true;
+      print a + b;
+      print n == 10;
+      print n != 10;
+      print t == 1;
+      {
+        var inner = 2;
+        fun nested() { return inner < 3; }
+        print nested();
+      }
+    }
+    mixed();
+    """,
+    """
+    fun first() { return 1; }
+    fun call() { return first(); }
+    print call();
+    fun first() { return 2; }
+    print call();
+    class Point { init(x) { this.x = x; } }
+    fun make(x) { return Point(x).x; }
+    print make(3);
+    print clock() > 0;
+    """,
+    'fun f() { var s = "a"; return s < 10; } print f();',
+    'fun f() { var s = "a"; s = s + 1; return s; } print f();',
+    'fun f() { var a = "a"; var b = 1; return a + b; } print f();',
+    'var notFunction = "x"; fun f() { return notFunction(); } print f();',
+    "fun g(a) { return a; } fun f() { return g(); } print f();",
+    "fun f() { return missing(); } print f();",
+]
+
+
+class UnfusedInterpreter(Interpreter):
+    def _fuse(self, statements: list[Stmt]) -> None:
+        pass
+
+
+def nodes(value: object) -> list[Expr | Stmt]:
+    if isinstance(value, list):
+        return [node for item in value for node in nodes(item)]
+    if not isinstance(value, (Expr, Stmt)):
+        return []
+    found = [value]
+    for slot in all_slots(type(value)):
+        found.extend(nodes(getattr(value, slot)))
+    return found
+
+
+def execute(source: str, interpreter: Interpreter) -> tuple[str, list[object]]:
+    diagnostics = Diagnostics(echo=False)
+    output = StringIO()
+    interpreter.diagnostics = diagnostics
+    interpreter.output = Output(output)
+    run(source, interpreter)
+    return output.getvalue(), diagnostics.items
+
+
+def test_loops_are_fused() -> None:
+    interpreter = Interpreter()
+    statements = front_end(PROGRAMS[0] + PROGRAMS[2], interpreter)
+    assert statements is not None
+    Fuser(interpreter).fuse(statements)
+    fused = {type(node) for node in nodes(statements)}
+    assert {GlobalCall, LocalAdd, LocalCompare, LocalIncrement} <= fused
+
+
+@pytest.mark.parametrize("source", PROGRAMS)
+def test_fused_nodes_behave_like_the_nodes_they_replace(source: str) -> None:
+    fused = execute(source, Interpreter())
+    assert fused == execute(source, UnfusedInterpreter())
+    assert fused[0] or fused[1]
@@ -0,0 +1,63 @@
+import pytest
+
+from abstract_syntax_tree.inline_cache import EMPTY, POLYMORPHIC_LIMIT, InlineCache
+from plox.runtime import Engine, LoxRuntime
+
+# One call site and one field site seeing six classes, more than a cache keeps,
+# and a field that shadows a method of the same name.
+SOURCE = """
+class A { name() { return "A"; } }
+class B { name() { return "B"; } }
+class C { name() { return "C"; } }
+class D { name() { return "D"; } }
+class E { name() { return "E"; } }
+class F { name() { return "F"; } }
+fun shout() { return "field"; }
+var result = "";
+var sizes = 0;
+for (var round = 0; round < 3; round = round + 1) {
+  var things = List();
+  things.push(A()); things.push(B()); things.push(C());
+  things.push(D()); things.push(E()); things.push(F());
+  var shadowed = A();
+  shadowed.name = shout;
+  things.push(shadowed);
+  for (var i = 0; i < things.len(); i = i + 1) {
+    var thing = things.get(i);
+    thing.size = i;
+    result = result + thing.name();
+    sizes = sizes + thing.size;
+  }
+}
+print result;
+print sizes;
+"""
+
+
+def test_only_the_first_keys_are_remembered() -> None:
+    cache = InlineCache()
+    computed: list[int] = []
+
+    def compute(key: int) -> str:
+        computed.append(key)
+        return f"value {key}"
+
+    keys = list(range(POLYMORPHIC_LIMIT + 2))
+    for _ in range(3):
+        for key in keys:
+            assert cache.miss(key, compute) == f"value {key}"
+            assert (cache.key, cache.value) == (key, f"value {key}")
+    overflow = keys[POLYMORPHIC_LIMIT:]
+    assert computed == keys + overflow + overflow
+
+
+def test_an_empty_cache_matches_no_key() -> None:
+    cache = InlineCache()
+    assert cache.key is EMPTY
+    assert cache.key is not None
+
+
+@pytest.mark.parametrize("engine", list(Engine))
+def test_megamorphic_sites_still_find_the_right_member(engine: Engine) -> None:
+    result = LoxRuntime(engine, size=1).run(SOURCE)
+    assert result.output == "ABCDEFfield" * 3 + "\n63\n"
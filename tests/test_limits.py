@@ -0,0 +1,73 @@
+import pytest
+
+from errors import Diagnostics
+from interpreter import Limits
+from plox.main import run_stream
+from plox.runtime import Engine, LoxRuntime, get_interpreter
+from scanner import RegexScanner
+
+DOUBLING = 'var s = "ab"; while (true) s = s + s;'
+HUGE_FILL = "var l = NumberList(); l.fill(0, 10000000000);"
+REPEATED_SUM = """
+var l = NumberList();
+l.fill(1, 100000);
+var total = 0;
+while (true) total = total + l.sum();
+"""
+
+
+def error(engine: Engine, limits: Limits, source: str) -> str:
+    result = LoxRuntime(engine, size=1, limits=limits).run(source)
+    assert result.exit_code == 70
+    return result.diagnostics[0].message
+
+
+@pytest.mark.parametrize("engine", list(Engine))
+def test_long_strings_are_charged_by_length(engine: Engine) -> None:
+    limits = Limits(steps=10000)
+    assert error(engine, limits, DOUBLING) == "Step limit of 10000 exceeded."
+
+
+@pytest.mark.parametrize("engine", list(Engine))
+def test_bulk_list_operations_are_charged_before_they_run(engine: Engine) -> None:
+    limits = Limits(steps=10000)
+    assert error(engine, limits, HUGE_FILL) == "Step limit of 10000 exceeded."
+    assert error(engine, limits, REPEATED_SUM) == "Step limit of 10000 exceeded."
+
+
+@pytest.mark.parametrize("engine", list(Engine))
+def test_bulk_operations_check_the_clock(engine: Engine) -> None:
+    limits = Limits(seconds=0.1)
+    assert error(engine, limits, REPEATED_SUM) == "Time limit of 0.1s exceeded."
+
+
+@pytest.mark.parametrize("engine", list(Engine))
+def test_size_limit(engine: Engine) -> None:
+    limits = Limits(size=1000)
+    message = "Size limit of 1000 exceeded."
+    assert error(engine, limits, DOUBLING) == message
+    assert error(engine, limits, HUGE_FILL) == message
+    assert error(engine, limits, "var l = List(); while (true) l.push(1);") == message
+    result = LoxRuntime(engine, size=1, limits=limits).run(
+        "var l = NumberList(); l.fill(2, 1000); print l.sum();"
+    )
+    assert result.output == "2000\n"
+
+
+@pytest.mark.parametrize("engine", list(Engine))
+def test_slices_count_as_instances(engine: Engine) -> None:
+    limits = Limits(instances=5)
+    source = "var l = List(); for (var i = 0; i < 100; i = i + 1) l = l.slice(0, 0);"
+    assert error(engine, limits, source) == "Instance limit of 5 exceeded."
+
+
+@pytest.mark.parametrize("engine", list(Engine))
+def test_streamed_statements_share_the_limits(engine: Engine) -> None:
+    source = "for (var i = 0; i < 800; i = i + 1) {}\n" * 3
+    diagnostics = Diagnostics(source, echo=False)
+    interpreter = get_interpreter(engine, diagnostics)
+    interpreter.limits = Limits(steps=2000)
+    tokens = RegexScanner(source, diagnostics=diagnostics).iter_tokens()
+    run_stream(tokens, interpreter)
+    [failure] = diagnostics.items
+    assert (failure.line, failure.message) == (3, "Step limit of 2000 exceeded.")
@@ -0,0 +1,34 @@
+import pytest
+
+from interpreter import Interpreter
+from plox.runtime import Engine, LoxRuntime
+
+SOURCE = """
+var l = NumberList();
+l.fill(2, 3);
+l.push(5);
+l.set(0, 1);
+print l.len();
+print l.sum();
+print l.slice(1, 3).max();
+var m = List();
+m.push("a");
+m.push(nil);
+print m.pop();
+print m.get(0);
+"""
+
+
+@pytest.mark.parametrize("engine", list(Engine))
+def test_list_methods(engine: Engine) -> None:
+    result = LoxRuntime(engine, size=1).run(SOURCE)
+    assert result.output == "4\n10\n2\nnil\na\n"
+
+
+def test_unbound_native_methods_take_the_receiver_first() -> None:
+    interpreter = Interpreter()
+    number_list = interpreter.globals._values["NumberList"]
+    items = number_list.call(interpreter, [])
+    push = number_list.find_method("push")
+    push.call(interpreter, [items, 7.0])
+    assert number_list.find_method("sum").call(interpreter, [items]) == 7.0
@@ -0,0 +1,95 @@
+import pytest
+
+from abstract_syntax_tree import ASTPrinter
+from interpreter import Interpreter
+from plox.runtime import Engine, LoxRuntime, front_end
+
+SOURCE = """
+print 1 + 2 * 3;
+if (false) print 1; else print "x" + "y";
+while (false) print 3;
+fun f() { return 1; print 2; }
+1 + 2;
+print -(2) < 3 and nil;
+print 1 + nil;
+"""
+
+PROGRAMS = [
+    """
+    var a = "con" + "cat";
+    print a + (2 * 3 == 6);
+    """,
+    """
+    fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); }
+    if (1 > 2) print "never"; else print fib(10 + 2);
+    while (nil) print "never";
+    for (var i = 0; i < 3; i = i + 1) { if (true) print i * (1 + 1); }
+    """,
+    """
+    fun early(x) {
+      if (!true) return "no";
+      return x;
+      print "unreachable";
+    }
+    print early(!nil or false);
+    {}
+    print -(-0) == 0;
+    """,
+    """
+    class A { value() { return 2 + 2; } }
+    print A().value() / (4 - 4);
+    print "s" + 1;
+    """,
+]
+
+
+def tree(source: str, opt_level: int) -> list[str]:
+    statements = front_end(source, Interpreter(), opt_level=opt_level)
+    assert statements is not None
+    return [ASTPrinter().print(statement) for statement in statements]
+
+
+def test_level_0_leaves_the_tree_alone() -> None:
+    assert tree(SOURCE, 0)[0] == "(print (+ 1.0 (* 2.0 3.0)))"
+
+
+def test_level_1_folds_constants() -> None:
+    assert tree(SOURCE, 1) == [
+        "(print 7.0)",
+        "(if-else False (print 1.0) (print xy))",
+        "(while False (print 3.0))",
+        "(fun f () (return 1.0)(print 2.0))",
+        "(; 3.0)",
+        "(print nil)",
+        "(print (+ 1.0 nil))",
+    ]
+
+
+def test_level_2_removes_dead_code() -> None:
+    assert tree(SOURCE, 2) == [
+        "(print 7.0)",
+        "(print xy)",
+        "(fun f () (return 1.0))",
+        "(print nil)",
+        "(print (+ 1.0 nil))",
+    ]
+
+
+@pytest.mark.parametrize("engine", list(Engine))
+@pytest.mark.parametrize("source", PROGRAMS)
+def test_every_level_runs_the_same(engine: Engine, source: str) -> None:
+    results = [
+        LoxRuntime(engine, size=1, opt_level=level).run(source) for level in range(3)
+    ]
+    assert results[1] == results[0]
+    assert results[2] == results[0]
+
+
+def test_errors_in_constants_still_happen_at_runtime() -> None:
+    result = LoxRuntime(opt_level=2).run('print "ok";\n\nprint 1 + nil;')
+    assert result.output == "ok\n"
+    [error] = result.diagnostics
+    assert (error.line, error.message) == (
+        3,
+        "Operands must be two numbers or two strings.",
+    )
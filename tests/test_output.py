@@ -0,0 +1,61 @@
+from io import StringIO
+from pathlib import Path
+
+import pytest
+
+from typer.testing import CliRunner
+
+from errors import Diagnostics
+from interpreter import Output
+from plox.main import app
+from plox.runtime import Engine, get_interpreter, run
+
+FAILING = "print 1;\nprint 2;\nprint 1 + nil;\n"
+FAILING_OUTPUT = "1\n2\nOperands must be two numbers or two strings.\n[line 3]\n"
+
+
+def test_lines_wait_until_the_buffer_is_full() -> None:
+    file = StringIO()
+    output = Output(file, buffer_size=10, line_buffered=False)
+    output.write_line("1234")
+    assert file.getvalue() == ""
+    output.write_line("5678")
+    assert file.getvalue() == "1234\n5678\n"
+    output.write_line("9")
+    assert file.getvalue() == "1234\n5678\n"
+    output.flush()
+    assert file.getvalue() == "1234\n5678\n9\n"
+
+
+def test_line_buffered_output_writes_every_line() -> None:
+    file = StringIO()
+    output = Output(file, line_buffered=True)
+    output.write_line("a")
+    assert file.getvalue() == "a\n"
+
+
+@pytest.mark.parametrize("engine", list(Engine))
+def test_output_is_flushed_before_a_runtime_error(
+    engine: Engine, capsys: pytest.CaptureFixture[str]
+) -> None:
+    interpreter = get_interpreter(engine, Diagnostics())
+    interpreter.output = Output(line_buffered=False)
+    run(FAILING, interpreter)
+    assert capsys.readouterr().out == FAILING_OUTPUT
+
+
+@pytest.mark.parametrize("stream", [False, True])
+@pytest.mark.parametrize("engine", list(Engine))
+def test_interpret_flushes_before_it_exits(
+    engine: Engine, stream: bool, tmp_path: Path
+) -> None:
+    script = tmp_path / "script.lox"
+    options = ["--engine", engine.value, "--stream" if stream else "--no-stream"]
+
+    script.write_text(FAILING)
+    result = CliRunner().invoke(app, ["interpret", *options, str(script)])
+    assert (result.exit_code, result.stdout) == (70, FAILING_OUTPUT)
+
+    script.write_text('for (var i = 0; i < 3; i = i + 1) print i;\nprint "done";')
+    result = CliRunner().invoke(app, ["interpret", *options, str(script)])
+    assert (result.exit_code, result.stdout) == (0, "0\n1\n2\ndone\n")
@@ -0,0 +1,61 @@
+import sys
+
+from io import StringIO
+
+from errors import Diagnostics
+from interpreter import Interpreter, Output, ProfilingInterpreter
+from plox.runtime import run
+
+SOURCE = """
+class Pair {
+  init(a, b) { this.a = a; this.b = b; }
+  sum() { return this.a + this.b; }
+}
+fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); }
+print Pair(fib(10), 1).sum();
+"""
+
+
+def profile(source: str, interpreter: Interpreter) -> tuple[str, Diagnostics]:
+    diagnostics = Diagnostics(echo=False)
+    output = StringIO()
+    interpreter.diagnostics = diagnostics
+    interpreter.output = Output(output)
+    run(source, interpreter)
+    return output.getvalue(), diagnostics
+
+
+def test_function_calls_are_counted() -> None:
+    interpreter = ProfilingInterpreter()
+    output, diagnostics = profile(SOURCE, interpreter)
+    assert output == "56\n"
+    calls = {
+        declaration._name.lexeme: stats.count
+        for declaration, stats in interpreter.function_stats.items()
+    }
+    assert calls == {"fib": 177, "init": 1, "sum": 1}
+    assert "<script>;fib;fib 0" not in interpreter.collapsed_stacks()
+
+
+def test_profiled_programs_recurse_as_deep_as_unprofiled_ones() -> None:
+    source = """
+    fun depth(n) { if (n == 0) return 0; return depth(n - 1) + 1; }
+    print depth(85);
+    """
+    for interpreter in (Interpreter(), ProfilingInterpreter()):
+        output, diagnostics = profile(source, interpreter)
+        assert output == "85\n"
+        assert not diagnostics.had_runtime_error
+
+
+def test_call_errors_are_reported_at_the_call() -> None:
+    _, diagnostics = profile("var x = 1;\nx();", ProfilingInterpreter())
+    [error] = diagnostics.items
+    assert (error.line, error.message) == (2, "Can only call functions and classes.")
+
+
+def test_the_recursion_limit_is_restored() -> None:
+    limit = sys.getrecursionlimit()
+    for source in ("print 1;", "fun f() { f(); } f();", "print nope;"):
+        profile(source, ProfilingInterpreter())
+        assert sys.getrecursionlimit() == limit
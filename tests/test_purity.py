@@ -0,0 +1,105 @@
+from io import StringIO
+
+import pytest
+
+from errors import Diagnostics
+from interpreter import Interpreter, Output
+from lox_builtins import CallCache
+from lox_builtins.memo import MISSING, call_key
+from plox.runtime import Engine, front_end, get_interpreter, run
+from resolver import PurityAnalyzer
+
+SOURCE = """
+var limit = 10;
+var counter = 0;
+class Box {}
+
+fun add(a, b) { return a + b; }
+fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); }
+fun even(n) { if (n == 0) return true; return odd(n - 1); }
+fun odd(n) { if (n == 0) return false; return even(n - 1); }
+fun loops(n) { var total = 0; while (n > 0) { total = total + n; n = n - 1; } return total; }
+
+fun printer(x) { print x; return x; }
+fun readsGlobal(x) { return x + limit; }
+fun writesGlobal() { counter = counter + 1; return counter; }
+fun callsImpure(x) { return printer(x); }
+fun usesFields(box) { return box.value; }
+fun makesClosure() { fun inner() { return 1; } return inner; }
+fun callsArgument(f) { return f(); }
+fun reassigned() { return 1; }
+reassigned = add;
+fun callsReassigned() { return reassigned(); }
+fun enclosing() {
+  var captured = 1;
+  fun readsCaptured() { return captured; }
+  return readsCaptured;
+}
+"""
+
+PURE = {"add", "fib", "even", "odd", "loops", "inner", "reassigned"}
+
+
+def pure_functions(source: str) -> set[str]:
+    interpreter = Interpreter(Diagnostics(echo=False))
+    statements = front_end(source, interpreter)
+    assert statements is not None
+    PurityAnalyzer(interpreter).analyze(statements)
+    return {function._name.lexeme for function in interpreter._pure}
+
+
+def memoized_run(engine: Engine, source: str, cache: CallCache) -> str:
+    output = StringIO()
+    interpreter = get_interpreter(engine, Diagnostics(source, echo=False))
+    interpreter.output = Output(output)
+    interpreter.call_cache = cache
+    run(source, interpreter)
+    assert not interpreter.diagnostics.items
+    return output.getvalue()
+
+
+def test_pure_functions_are_accepted_and_others_rejected() -> None:
+    assert pure_functions(SOURCE) == PURE
+
+
+def test_calls_to_a_name_declared_twice_are_impure() -> None:
+    source = "fun f() { return 1; } fun g() { return f(); } fun f() { return 2; }"
+    assert pure_functions(source) == {"f"}
+
+
+@pytest.mark.parametrize("engine", [Engine.TREE, Engine.CLOSURE])
+def test_memoized_calls_return_the_same_results(engine: Engine) -> None:
+    source = SOURCE + "print fib(25); print fib(25); print loops(10); print add(1, 2);"
+    cache = CallCache(4096)
+    assert memoized_run(engine, source, cache) == "75025\n75025\n55\n3\n"
+    assert cache.misses == 26 + 1 + 1
+    assert cache.hits == 23 + 1
+
+
+@pytest.mark.parametrize("engine", [Engine.TREE, Engine.CLOSURE])
+def test_impure_functions_are_not_memoized(engine: Engine) -> None:
+    source = SOURCE + "printer(1); printer(1); print writesGlobal() + writesGlobal();"
+    cache = CallCache(4096)
+    assert memoized_run(engine, source, cache) == "1\n1\n3\n"
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def test_the_least_recently_used_entry_is_evicted() -> None:
+    cache = CallCache(2)
+    cache.put(("a",), 1)
+    cache.put(("b",), 2)
+    assert cache.get(("a",)) == 1
+    cache.put(("c",), 3)
+    assert cache.get(("b",)) is MISSING
+    assert (cache.get(("a",)), cache.get(("c",))) == (1, 3)
+    assert cache.report() == "Pure calls: 3 hits, 1 misses, 2/2 entries"
+
+
+def test_only_plain_values_make_keys() -> None:
+    interpreter = Interpreter()
+    [declaration] = front_end("fun f(a) { return a; }", interpreter) or []
+    assert call_key(declaration, [1.0, "s", None, True]) is not None
+    assert call_key(declaration, [True]) != call_key(declaration, [1.0])
+    assert call_key(declaration, [-0.0]) is None
+    assert call_key(declaration, [float("nan")]) is None
+    assert call_key(declaration, [interpreter.globals._values["clock"]]) is None
@@ -0,0 +1,110 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from errors import ErrorHandler
+from interpreter import Interpreter
+from parser import Parser
+from plox.runtime import Engine, LoxRuntime
+from resolver import Resolver
+from scanner import Scanner
+
+
+def job(index: int) -> str:
+    source = f"""
+    var mine = {index};
+    var total = 0;
+    for (var i = 0; i < 200; i = i + 1) total = total + mine;
+    print name + ": " + name;
+    print total;
+    """
+    if index % 3 == 0:
+        source += "print undefined;"
+    return source
+
+
+@pytest.mark.parametrize("engine", list(Engine))
+def test_threads_sharing_a_runtime_see_only_their_own_run(engine: Engine) -> None:
+    runtime = LoxRuntime(engine, size=3)
+
+    def run(index: int) -> tuple[int, object]:
+        return index, runtime.run(job(index), globals={"name": f"job{index}"})
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(run, range(60)))
+    for index, result in results:
+        assert result.output == f"job{index}: job{index}\n{200 * index}\n"
+        if index % 3 == 0:
+            assert result.exit_code == 70
+            [error] = result.diagnostics
+            assert error.message == "Undefined variable 'undefined'."
+        else:
+            assert result.exit_code == 0
+            assert result.diagnostics == []
+
+
+@pytest.mark.parametrize("engine", list(Engine))
+def test_leases_start_from_the_builtins(engine: Engine) -> None:
+    runtime = LoxRuntime(engine, size=1)
+    first = runtime.run(
+        "var leaked = 1; fun f() {} class C {} clock = nil;", globals={"given": 2}
+    )
+    assert first.exit_code == 0
+    for name in ("leaked", "f", "C", "given"):
+        result = runtime.run(f"print {name};")
+        assert result.diagnostics[0].message == f"Undefined variable '{name}'."
+    result = runtime.run("print clock() > 0; print List().len();")
+    assert result.output == "true\n0\n"
+
+
+@pytest.mark.parametrize("engine", list(Engine))
+def test_sessions_keep_their_state(engine: Engine) -> None:
+    runtime = LoxRuntime(engine, size=1)
+    session = runtime.session()
+    session.run("var count = 1; class Box { init(v) { this.v = v; } }")
+    assert session.run("count = count + 1; print count;").output == "2\n"
+    failed = session.run("print missing;")
+    assert failed.exit_code == 70
+    result = session.run("print Box(count).v;", globals={"extra": 3})
+    assert (result.output, result.exit_code, result.diagnostics) == ("2\n", 0, [])
+    assert session.run("print extra;").output == "3\n"
+    assert runtime.run("print count;").exit_code == 70
+
+
+def test_components_without_diagnostics_report_to_the_error_handler(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    monkeypatch.setattr(ErrorHandler, "had_error", False)
+    monkeypatch.setattr(ErrorHandler, "had_runtime_error", False)
+
+    Parser(Scanner("print 1 +;").scan_tokens()).parse()
+    assert ErrorHandler.had_error
+    assert "Expect expression." in capsys.readouterr().err
+
+    interpreter = Interpreter()
+    assert interpreter.diagnostics is ErrorHandler.diagnostics
+    statements = Parser(Scanner("print -nil;").scan_tokens()).parse()
+    Resolver(interpreter).resolve_statements(statements)
+    interpreter.interpret(statements)
+    assert ErrorHandler.had_runtime_error
+    assert "Operand must be a number." in capsys.readouterr().out
+    assert ErrorHandler.diagnostics.items == []
+
+
+def test_runs_report_to_their_own_diagnostics(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(ErrorHandler, "had_error", False)
+    result = LoxRuntime(size=1).run("print 1 +;")
+    assert result.exit_code == 65
+    assert not ErrorHandler.had_error
+
+
+@pytest.mark.parametrize("engine", list(Engine))
+def test_functions_from_earlier_snippets_print_to_the_current_run(
+    engine: Engine,
+) -> None:
+    session = LoxRuntime(engine, size=1).session()
+    assert session.run("fun f() { print 1; }").output == ""
+    assert session.run("f(); print 5;").output == "1\n5\n"
+    assert session.run("f();").output == "1\n"
@@ -0,0 +1,33 @@
+from pathlib import Path
+
+import pytest
+
+from scanner.regex_scanner import verify
+
+BENCHMARKS = Path(__file__).parent.parent / "benchmarks"
+
+SOURCES = [
+    "",
+    "print 1 + 2.5 * (3 - 4) / 5;",
+    'var s = "multi\nline"; // comment\nprint s;',
+    "a != b == c <= d >= e < f > g and h or !i;",
+    "class A < B { init() { this.x = super.y; } }",
+    "fun f(a, b) { return a.b(c)[0]; }",
+    "var x = 12.;\nvar y = .5;",
+    '"unterminated',
+    "print @ # 1;",
+    "// only a comment",
+    "\n\n\tvar\r\nx\n=\n1\n;",
+]
+
+
+@pytest.mark.parametrize("source", SOURCES)
+def test_regex_scanner_matches_the_classic_scanner(source: str) -> None:
+    assert verify(source) is None
+
+
+@pytest.mark.parametrize(
+    "path", sorted(BENCHMARKS.glob("*.lox")), ids=lambda path: path.name
+)
+def test_regex_scanner_matches_on_the_benchmarks(path: Path) -> None:
+    assert verify(path.read_text()) is None
@@ -0,0 +1,113 @@
+import asyncio
+import json
+
+from typing import Any
+
+import pytest
+
+from interpreter import Limits
+from plox.runtime import Engine, LoxRuntime
+from plox.server import MAX_LINE, LoxServer
+
+
+async def exchange(port: int, requests: list[bytes]) -> list[dict[str, Any]]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    replies = []
+    for request in requests:
+        writer.write(request + b"\n")
+        await writer.drain()
+        replies.append(json.loads(await reader.readline()))
+    writer.close()
+    await writer.wait_closed()
+    return replies
+
+
+def serve(
+    runtime: LoxRuntime, *clients: list[bytes], max_line: int = MAX_LINE
+) -> list[list[dict[str, Any]]]:
+    async def main() -> list[list[dict[str, Any]]]:
+        server = LoxServer(runtime, max_line)
+        try:
+            async with await server.start_tcp("127.0.0.1", 0) as listening:
+                port = listening.sockets[0].getsockname()[1]
+                return await asyncio.gather(
+                    *(exchange(port, requests) for requests in clients)
+                )
+        finally:
+            server.close()
+
+    return asyncio.run(main())
+
+
+def request(source: str, **fields: Any) -> bytes:
+    return json.dumps({"source": source, **fields}).encode()
+
+
+@pytest.mark.parametrize("engine", list(Engine))
+def test_runs_requests_in_order(engine: Engine) -> None:
+    [replies] = serve(
+        LoxRuntime(engine, size=2),
+        [request("print 1 + 2;"), request("print x * 2;", globals={"x": 21})],
+    )
+    assert replies == [
+        {"output": "3\n", "diagnostics": [], "exit_code": 0},
+        {"output": "42\n", "diagnostics": [], "exit_code": 0},
+    ]
+
+
+def test_malformed_requests_get_an_error() -> None:
+    [replies] = serve(
+        LoxRuntime(size=1),
+        [b"{not json", b"[1, 2]", b'{"source": 1}', request("print 1;")],
+    )
+    assert replies[0]["error"].startswith("JSONDecodeError: ")
+    assert replies[1] == {"error": "ValueError: Request must be a JSON object."}
+    assert replies[2] == {"error": "ValueError: Request needs a 'source' string."}
+    assert replies[3]["output"] == "1\n"
+
+
+def test_lox_errors_are_reported_in_the_reply() -> None:
+    [[reply]] = serve(LoxRuntime(size=1), [request("print nope;")])
+    assert reply["exit_code"] == 70
+    assert reply["diagnostics"][0]["message"] == "Undefined variable 'nope'."
+
+
+@pytest.mark.parametrize("length", [200, 600_000])
+def test_overlong_lines_are_skipped(length: int) -> None:
+    overlong = request("print 1;" + " " * length)
+    [replies] = serve(LoxRuntime(size=1), [overlong, request("print 2;")], max_line=100)
+    assert replies == [
+        {"error": "ValueError: Request is longer than 100 bytes."},
+        {"output": "2\n", "diagnostics": [], "exit_code": 0},
+    ]
+
+
+@pytest.mark.parametrize("engine", list(Engine))
+def test_runaway_programs_time_out(engine: Engine) -> None:
+    runtime = LoxRuntime(engine, size=1, limits=Limits(seconds=0.2))
+    [replies] = serve(runtime, [request("while (true) {}"), request("print 1;")])
+    assert replies[0]["exit_code"] == 70
+    assert replies[0]["diagnostics"][0]["message"] == "Time limit of 0.2s exceeded."
+    assert replies[1]["output"] == "1\n"
+
+
+def test_sessions_belong_to_their_connection() -> None:
+    first, second = serve(
+        LoxRuntime(size=2),
+        [request("var a = 1;", session=True), request("print a;", session=True)],
+        [request("print a;", session=True)],
+    )
+    assert first[1]["output"] == "1\n"
+    assert second[0]["exit_code"] == 70
+
+
+def test_concurrent_clients_get_their_own_results() -> None:
+    clients = [
+        [request(f"print n * {i};", globals={"n": n}) for n in range(5)]
+        for i in range(8)
+    ]
+    results = serve(LoxRuntime(Engine.CLOSURE, size=3), *clients)
+    for i, replies in enumerate(results):
+        assert [reply["output"] for reply in replies] == [
+            f"{n * i}\n" for n in range(5)
+        ]
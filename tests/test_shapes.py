@@ -0,0 +1,68 @@
+from io import StringIO
+
+import pytest
+
+from errors import Diagnostics
+from interpreter import Interpreter, Output
+from lox_builtins.shape import Shape
+from plox.runtime import Engine, LoxRuntime, run
+
+SOURCE = """
+class Point {
+  init(x, y) { this.x = x; this.y = y; }
+  sum() { return this.x + this.y; }
+}
+class Point3 < Point {
+  init(x, y, z) { super.init(x, y); this.z = z; }
+  sum() { return super.sum() + this.z; }
+}
+var a = Point(1, 2);
+var b = Point(3, 4);
+var c = Point(5, 6);
+c.x = 7;
+c.label = "c";
+var d = Point(0, 0);
+d.label = "d";
+var e = Point(0, 0);
+e.y = 1;
+var f = Point3(1, 2, 3);
+print a.sum() + b.sum() + c.sum();
+print c.label + d.label;
+print f.sum();
+print f.x;
+"""
+
+
+def test_transitions_are_shared() -> None:
+    root = Shape({})
+    x = root.with_field("x")
+    assert root.with_field("x") is x
+    assert x.with_field("y") is root.with_field("x").with_field("y")
+    assert x.with_field("y") is not root.with_field("y").with_field("x")
+    assert [x.with_field("y").index(name) for name in "xyz"] == [0, 1, None]
+
+
+def test_storing_to_a_known_field_keeps_the_shape() -> None:
+    shape = Shape({}).with_field("x")
+    assert shape.transition("x") == (0, shape)
+    index, target = shape.transition("y")
+    assert (index, target) == (1, shape.with_field("y"))
+
+
+def test_instances_with_the_same_fields_share_a_shape() -> None:
+    interpreter = Interpreter(Diagnostics(echo=False))
+    interpreter.output = Output(StringIO())
+    run(SOURCE, interpreter)
+    values = interpreter.globals._values
+    a, b, c, d, e, f = (values[name] for name in "abcdef")
+    assert a._shape is b._shape is e._shape
+    assert c._shape is d._shape is not a._shape
+    assert c._values == [7.0, 6.0, "c"]
+    assert f._shape is not a._shape
+    assert f._values == [1.0, 2.0, 3.0]
+
+
+@pytest.mark.parametrize("engine", list(Engine))
+def test_fields_read_back_on_every_engine(engine: Engine) -> None:
+    result = LoxRuntime(engine, size=1).run(SOURCE)
+    assert result.output == "23\ncd\n6\n1\n"
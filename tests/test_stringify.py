@@ -0,0 +1,67 @@
+from typing import Any
+
+import pytest
+
+from interpreter.stringify import RECENT_LIMIT, stringify
+
+
+# How the interpreter printed values before numbers got their own formatting.
+def baseline(value: Any) -> str:
+    if value is None:
+        return "nil"
+    if isinstance(value, float):
+        text = str(value)
+        if text.endswith(".0"):
+            text = text[:-2]
+        return text
+    if isinstance(value, bool):
+        return str(value).lower()
+    return str(value)
+
+
+VALUES = [
+    0.0,
+    -0.0,
+    1.0,
+    -3.0,
+    0.1,
+    2.5e-10,
+    123.456,
+    1e15,
+    9999999999999998.0,
+    1e16,
+    -1e16,
+    1e16 + 2,
+    1.5e300,
+    float("inf"),
+    float("-inf"),
+    float("nan"),
+    None,
+    True,
+    False,
+    "text",
+    "4.0",
+]
+
+
+@pytest.mark.parametrize("value", VALUES, ids=repr)
+def test_matches_the_baseline(value: Any) -> None:
+    assert stringify(value) == baseline(value)
+    assert stringify(value) == baseline(value)
+
+
+def test_zero_keeps_its_sign_after_other_numbers() -> None:
+    assert [stringify(value) for value in (0.0, -0.0, 0.0, -0.0)] == [
+        "0",
+        "-0",
+        "0",
+        "-0",
+    ]
+
+
+def test_results_stay_right_past_the_cache_size() -> None:
+    values = [float(n) for n in range(-RECENT_LIMIT, RECENT_LIMIT)]
+    for _ in range(2):
+        assert [stringify(value) for value in values] == [
+            baseline(value) for value in values
+        ]
@@ -0,0 +1,5 @@
+from .interpreter import VMInterpreter
+from .objects import CallFrame, Closure, Upvalue
+from .vm import VM
+
+__all__ = ["CallFrame", "Closure", "Upvalue", "VM", "VMInterpreter"]
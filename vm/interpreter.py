@@ -0,0 +1,24 @@
+from abstract_syntax_tree.statements import Stmt
+from compiler import Compiler
+from errors import Diagnostics, LoxRuntimeError
+from interpreter import Interpreter
+
+from .vm import VM
+
+
+class VMInterpreter(Interpreter):
+    def __init__(self, diagnostics: Diagnostics | None = None) -> None:
+        super().__init__(diagnostics)
+        self._vm = VM(self)
+
+    def interpret(self, statements: list[Stmt]) -> None:
+        function = Compiler(self.diagnostics).compile(statements)
+        if self.diagnostics.had_error:
+            return
+        try:
+            self._vm.interpret(function)
+        except LoxRuntimeError as e:
+            self.output.flush()
+            self.diagnostics.runtime_error(e)
+        finally:
+            self.output.flush()
@@ -0,0 +1,32 @@
+from typing import Any
+
+from compiler import FunctionProto
+
+
+class Upvalue:
+    __slots__ = ("location", "closed")
+
+    def __init__(self, location: int) -> None:
+        # Index of the captured stack slot, or None once the value is closed.
+        self.location: int | None = location
+        self.closed: Any = None
+
+
+class Closure:
+    __slots__ = ("function", "upvalues")
+
+    def __init__(self, function: FunctionProto, upvalues: list[Upvalue]) -> None:
+        self.function = function
+        self.upvalues = upvalues
+
+    def __repr__(self) -> str:
+        return repr(self.function)
+
+
+class CallFrame:
+    __slots__ = ("closure", "ip", "base")
+
+    def __init__(self, closure: Closure, ip: int, base: int) -> None:
+        self.closure = closure
+        self.ip = ip
+        self.base = base
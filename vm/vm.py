@@ -0,0 +1,521 @@
+from typing import Any, TYPE_CHECKING
+
+from compiler import FunctionProto, OpCode
+from errors import LoxNativeError, LoxRuntimeError
+from lox_builtins import LoxBoundMethod, LoxCallable, LoxClass, LoxInstance
+
+from .objects import CallFrame, Closure, Upvalue
+
+if TYPE_CHECKING:
+    from interpreter import Interpreter
+
+FRAMES_MAX = 1024
+
+# The dispatch loop compares against plain ints: comparing against IntEnum
+# members costs an attribute lookup and an enum comparison per instruction.
+CONSTANT = int(OpCode.CONSTANT)
+NIL = int(OpCode.NIL)
+TRUE = int(OpCode.TRUE)
+FALSE = int(OpCode.FALSE)
+POP = int(OpCode.POP)
+GET_LOCAL = int(OpCode.GET_LOCAL)
+SET_LOCAL = int(OpCode.SET_LOCAL)
+GET_GLOBAL = int(OpCode.GET_GLOBAL)
+DEFINE_GLOBAL = int(OpCode.DEFINE_GLOBAL)
+SET_GLOBAL = int(OpCode.SET_GLOBAL)
+GET_UPVALUE = int(OpCode.GET_UPVALUE)
+SET_UPVALUE = int(OpCode.SET_UPVALUE)
+GET_PROPERTY = int(OpCode.GET_PROPERTY)
+SET_PROPERTY = int(OpCode.SET_PROPERTY)
+EQUAL = int(OpCode.EQUAL)
+NOT_EQUAL = int(OpCode.NOT_EQUAL)
+GREATER = int(OpCode.GREATER)
+GREATER_EQUAL = int(OpCode.GREATER_EQUAL)
+LESS = int(OpCode.LESS)
+LESS_EQUAL = int(OpCode.LESS_EQUAL)
+ADD = int(OpCode.ADD)
+SUBTRACT = int(OpCode.SUBTRACT)
+MULTIPLY = int(OpCode.MULTIPLY)
+DIVIDE = int(OpCode.DIVIDE)
+NOT = int(OpCode.NOT)
+NEGATE = int(OpCode.NEGATE)
+PRINT = int(OpCode.PRINT)
+JUMP = int(OpCode.JUMP)
+JUMP_IF_FALSE = int(OpCode.JUMP_IF_FALSE)
+LOOP = int(OpCode.LOOP)
+CALL = int(OpCode.CALL)
+CLOSURE = int(OpCode.CLOSURE)
+CLOSE_UPVALUE = int(OpCode.CLOSE_UPVALUE)
+RETURN = int(OpCode.RETURN)
+CLASS = int(OpCode.CLASS)
+METHOD = int(OpCode.METHOD)
+INHERIT = int(OpCode.INHERIT)
+GET_SUPER = int(OpCode.GET_SUPER)
+INVOKE = int(OpCode.INVOKE)
+SUPER_INVOKE = int(OpCode.SUPER_INVOKE)
+
+
+class VM:
+    def __init__(self, interpreter: "Interpreter") -> None:
+        self._interpreter = interpreter
+        self._globals = interpreter.globals._values
+        self._stack: list[Any] = []
+        self._frames: list[CallFrame] = []
+        self._open_upvalues: dict[int, Upvalue] = {}
+
+    def interpret(self, function: FunctionProto) -> None:
+        closure = Closure(function, [])
+        self._stack = [closure]
+        self._frames = [CallFrame(closure, 0, 0)]
+        self._open_upvalues = {}
+        self._run()
+
+    def _error(self, closure: Closure, ip: int, message: str) -> LoxRuntimeError:
+        return LoxRuntimeError(closure.function.chunk.token_at(ip - 1), message)
+
+    # Everything CALL can be applied to other than a closure. Bound methods and
+    # classes put the receiver in the callee's slot and return the closure to
+    # run, if any; natives run here and leave their result on the stack.
+    def _call_value(
+        self, callee: Any, argc: int, closure: Closure, ip: int
+    ) -> Closure | None:
+        stack = self._stack
+        if type(callee) is LoxBoundMethod:
+            method = callee._method
+            if type(method) is not Closure:
+                self._invoke_native(method, callee._receiver, argc, closure, ip)
+                return None
+            stack[-1 - argc] = callee._receiver
+            return method
+        if type(callee) is LoxClass:
+            interpreter = self._interpreter
+            interpreter._instances_left -= 1
+            if interpreter._instances_left < 0:
+                message = interpreter._too_many_instances().args[0]
+                raise self._error(closure, ip, message)
+            stack[-1 - argc] = LoxInstance(callee)
+            initializer = callee._methods.get("init")
+            if initializer is None and argc != 0:
+                raise self._error(closure, ip, f"Expected 0 arguments but got {argc}.")
+            return initializer
+        if isinstance(callee, LoxCallable):
+            if argc != callee.arity():
+                raise self._error(
+                    closure, ip, f"Expected {callee.arity()} arguments but got {argc}."
+                )
+            start = len(stack) - argc
+            try:
+                result = callee.call(self._interpreter, stack[start:])
+            except LoxNativeError as e:
+                raise self._error(closure, ip, e.args[0])
+            del stack[start - 1 :]
+            stack.append(result)
+            return None
+        raise self._error(closure, ip, "Can only call functions and classes.")
+
+    # Methods of native classes such as List run here, on the arguments at the
+    # top of the stack, and leave their result in place of the callee.
+    def _invoke_native(
+        self, method: Any, receiver: Any, argc: int, closure: Closure, ip: int
+    ) -> None:
+        if argc != method.arity():
+            raise self._error(
+                closure, ip, f"Expected {method.arity()} arguments but got {argc}."
+            )
+        stack = self._stack
+        start = len(stack) - argc
+        try:
+            result = method.invoke(self._interpreter, receiver, stack[start:])
+        except LoxNativeError as e:
+            raise self._error(closure, ip, e.args[0])
+        del stack[start - 1 :]
+        stack.append(result)
+
+    # Raised for a call that would push a frame past `max_frames`, which is
+    # FRAMES_MAX unless the interpreter's depth limit is lower.
+    def _stack_overflow(self, closure: Closure, ip: int) -> LoxRuntimeError:
+        if len(self._frames) < FRAMES_MAX:
+            return self._error(closure, ip, self._interpreter._too_deep().args[0])
+        return self._error(closure, ip, "Stack overflow.")
+
+    def _refuel(self, closure: Closure, ip: int) -> int:
+        try:
+            return self._interpreter._refuel()
+        except LoxNativeError as e:
+            raise self._error(closure, ip, e.args[0])
+
+    def _charge(self, closure: Closure, ip: int, items: int) -> None:
+        try:
+            self._interpreter._charge(items)
+        except LoxNativeError as e:
+            raise self._error(closure, ip, e.args[0])
+
+    def _capture_upvalue(self, location: int) -> Upvalue:
+        upvalue = self._open_upvalues.get(location)
+        if upvalue is None:
+            upvalue = self._open_upvalues[location] = Upvalue(location)
+        return upvalue
+
+    def _close_upvalues(self, last: int) -> None:
+        open_upvalues = self._open_upvalues
+        for location in [location for location in open_upvalues if location >= last]:
+            upvalue = open_upvalues.pop(location)
+            upvalue.closed = self._stack[location]
+            upvalue.location = None
+
+    def _run(self) -> None:
+        stack = self._stack
+        frames = self._frames
+        values = self._globals
+        interpreter = self._interpreter
+        stringify = interpreter._stringify
+        write_line = interpreter.output.write_line
+        is_equal = interpreter._is_equal
+        fuel = interpreter._fuel
+        max_frames = min(FRAMES_MAX, interpreter._max_depth + 1)
+        push = stack.append
+        pop = stack.pop
+
+        frame = frames[-1]
+        closure = frame.closure
+        code = closure.function.chunk.code
+        constants = closure.function.chunk.constants
+        caches = closure.function.chunk.caches
+        ip = frame.ip
+        base = frame.base
+
+        while True:
+            op = code[ip]
+            ip += 1
+            if op == GET_LOCAL:
+                push(stack[base + code[ip]])
+                ip += 1
+            elif op == CONSTANT:
+                push(constants[code[ip] << 8 | code[ip + 1]])
+                ip += 2
+            elif op == SET_LOCAL:
+                stack[base + code[ip]] = stack[-1]
+                ip += 1
+            elif op == POP:
+                pop()
+            elif op == JUMP_IF_FALSE:
+                value = stack[-1]
+                if value is None or value is False:
+                    ip += code[ip] << 8 | code[ip + 1]
+                ip += 2
+            elif op == LOOP:
+                fuel -= 1
+                if fuel < 0:
+                    fuel = self._refuel(closure, ip)
+                ip -= code[ip] << 8 | code[ip + 1]
+                ip += 2
+            elif op == JUMP:
+                ip += (code[ip] << 8 | code[ip + 1]) + 2
+            elif op == ADD:
+                b = pop()
+                a = stack[-1]
+                if isinstance(a, float) and isinstance(b, float):
+                    stack[-1] = a + b
+                elif isinstance(a, str) and isinstance(b, str):
+                    if len(a) + len(b) >= interpreter._bulk_size:
+                        self._charge(closure, ip, len(a) + len(b))
+                    stack[-1] = a + b
+                else:
+                    raise self._error(
+                        closure, ip, "Operands must be two numbers or two strings."
+                    )
+            elif op == SUBTRACT:
+                b = pop()
+                a = stack[-1]
+                if not (isinstance(a, float) and isinstance(b, float)):
+                    raise self._error(closure, ip, "Operands must be numbers.")
+                stack[-1] = a - b
+            elif op == LESS:
+                b = pop()
+                a = stack[-1]
+                if not (isinstance(a, float) and isinstance(b, float)):
+                    raise self._error(closure, ip, "Operands must be numbers.")
+                stack[-1] = a < b
+            elif op == GET_GLOBAL:
+                name = constants[code[ip] << 8 | code[ip + 1]]
+                ip += 2
+                try:
+                    push(values[name])
+                except KeyError:
+                    raise self._error(closure, ip, f"Undefined variable '{name}'.")
+            elif op == GET_UPVALUE:
+                upvalue = closure.upvalues[code[ip]]
+                ip += 1
+                location = upvalue.location
+                push(upvalue.closed if location is None else stack[location])
+            elif op == SET_UPVALUE:
+                upvalue = closure.upvalues[code[ip]]
+                ip += 1
+                location = upvalue.location
+                if location is None:
+                    upvalue.closed = stack[-1]
+                else:
+                    stack[location] = stack[-1]
+            elif op == CALL:
+                argc = code[ip]
+                ip += 1
+                callee = stack[-1 - argc]
+                if type(callee) is not Closure:
+                    callee = self._call_value(callee, argc, closure, ip)
+                    if callee is None:
+                        continue
+                function = callee.function
+                if argc != function.arity:
+                    raise self._error(
+                        closure,
+                        ip,
+                        f"Expected {function.arity} arguments but got {argc}.",
+                    )
+                if len(frames) >= max_frames:
+                    raise self._stack_overflow(closure, ip)
+                fuel -= 1
+                if fuel < 0:
+                    fuel = self._refuel(closure, ip)
+                frame.ip = ip
+                frame = CallFrame(callee, 0, len(stack) - argc - 1)
+                frames.append(frame)
+                closure = callee
+                code = function.chunk.code
+                constants = function.chunk.constants
+                caches = function.chunk.caches
+                ip = 0
+                base = frame.base
+            elif op == INVOKE:
+                argc = code[ip + 4]
+                instance = stack[-1 - argc]
+                cache = caches[code[ip + 2] << 8 | code[ip + 3]]
+                ip += 5
+                if not isinstance(instance, LoxInstance):
+                    raise self._error(closure, ip, "Only instances have properties.")
+                if cache.key is instance._shape:
+                    callee = cache.value
+                else:
+                    name = constants[code[ip - 5] << 8 | code[ip - 4]]
+                    callee = cache.miss(
+                        instance._shape,
+                        lambda shape: instance._lookup(shape, name),
+                    )
+                if type(callee) is int:
+                    # A field holding a callable: call it like CALL would.
+                    callee = stack[-1 - argc] = instance._values[callee]
+                    if type(callee) is not Closure:
+                        callee = self._call_value(callee, argc, closure, ip)
+                        if callee is None:
+                            continue
+                elif callee is None:
+                    name = constants[code[ip - 5] << 8 | code[ip - 4]]
+                    raise self._error(closure, ip, f"Undefined property '{name}'.")
+                elif type(callee) is not Closure:
+                    self._invoke_native(callee, instance, argc, closure, ip)
+                    continue
+                function = callee.function
+                if argc != function.arity:
+                    raise self._error(
+                        closure,
+                        ip,
+                        f"Expected {function.arity} arguments but got {argc}.",
+                    )
+                if len(frames) >= max_frames:
+                    raise self._stack_overflow(closure, ip)
+                fuel -= 1
+                if fuel < 0:
+                    fuel = self._refuel(closure, ip)
+                frame.ip = ip
+                frame = CallFrame(callee, 0, len(stack) - argc - 1)
+                frames.append(frame)
+                closure = callee
+                code = function.chunk.code
+                constants = function.chunk.constants
+                caches = function.chunk.caches
+                ip = 0
+                base = frame.base
+            elif op == RETURN:
+                result = pop()
+                if self._open_upvalues:
+                    self._close_upvalues(base)
+                frames.pop()
+                del stack[base:]
+                if not frames:
+                    interpreter._fuel = fuel
+                    return
+                push(result)
+                frame = frames[-1]
+                closure = frame.closure
+                code = closure.function.chunk.code
+                constants = closure.function.chunk.constants
+                caches = closure.function.chunk.caches
+                ip = frame.ip
+                base = frame.base
+            elif op == NIL:
+                push(None)
+            elif op == TRUE:
+                push(True)
+            elif op == FALSE:
+                push(False)
+            elif op == SET_GLOBAL:
+                name = constants[code[ip] << 8 | code[ip + 1]]
+                ip += 2
+                if name not in values:
+                    raise self._error(closure, ip, f"Undefined variable '{name}'.")
+                values[name] = stack[-1]
+            elif op == DEFINE_GLOBAL:
+                values[constants[code[ip] << 8 | code[ip + 1]]] = pop()
+                ip += 2
+            elif op == GET_PROPERTY:
+                instance = stack[-1]
+                cache = caches[code[ip + 2] << 8 | code[ip + 3]]
+                ip += 4
+                if not isinstance(instance, LoxInstance):
+                    raise self._error(closure, ip, "Only instances have properties.")
+                if cache.key is instance._shape:
+                    found = cache.value
+                else:
+                    name = constants[code[ip - 4] << 8 | code[ip - 3]]
+                    found = cache.miss(
+                        instance._shape,
+                        lambda shape: instance._lookup(shape, name),
+                    )
+                if type(found) is int:
+                    stack[-1] = instance._values[found]
+                elif found is not None:
+                    stack[-1] = LoxBoundMethod(instance, found)
+                else:
+                    name = constants[code[ip - 4] << 8 | code[ip - 3]]
+                    raise self._error(closure, ip, f"Undefined property '{name}'.")
+            elif op == SET_PROPERTY:
+                value = pop()
+                instance = stack[-1]
+                cache = caches[code[ip + 2] << 8 | code[ip + 3]]
+                ip += 4
+                if not isinstance(instance, LoxInstance):
+                    raise self._error(closure, ip, "Only instances have fields.")
+                shape = instance._shape
+                if cache.key is shape:
+                    index, target = cache.value
+                else:
+                    name = constants[code[ip - 4] << 8 | code[ip - 3]]
+                    index, target = cache.miss(
+                        shape, lambda shape: shape.transition(name)
+                    )
+                if target is shape:
+                    instance._values[index] = value
+                else:
+                    instance._shape = target
+                    instance._values.append(value)
+                stack[-1] = value
+            elif op == EQUAL:
+                b = pop()
+                stack[-1] = is_equal(stack[-1], b)
+            elif op == NOT_EQUAL:
+                b = pop()
+                stack[-1] = not is_equal(stack[-1], b)
+            elif op == GREATER:
+                b = pop()
+                a = stack[-1]
+                if not (isinstance(a, float) and isinstance(b, float)):
+                    raise self._error(closure, ip, "Operands must be numbers.")
+                stack[-1] = a > b
+            elif op == GREATER_EQUAL:
+                b = pop()
+                a = stack[-1]
+                if not (isinstance(a, float) and isinstance(b, float)):
+                    raise self._error(closure, ip, "Operands must be numbers.")
+                stack[-1] = a >= b
+            elif op == LESS_EQUAL:
+                b = pop()
+                a = stack[-1]
+                if not (isinstance(a, float) and isinstance(b, float)):
+                    raise self._error(closure, ip, "Operands must be numbers.")
+                stack[-1] = a <= b
+            elif op == MULTIPLY:
+                b = pop()
+                a = stack[-1]
+                if not (isinstance(a, float) and isinstance(b, float)):
+                    raise self._error(closure, ip, "Operands must be numbers.")
+                stack[-1] = a * b
+            elif op == DIVIDE:
+                b = pop()
+                a = stack[-1]
+                if not (isinstance(a, float) and isinstance(b, float)):
+                    raise self._error(closure, ip, "Operands must be numbers.")
+                stack[-1] = a / b if b else float("nan")
+            elif op == NOT:
+                value = stack[-1]
+                stack[-1] = value is None or value is False
+            elif op == NEGATE:
+                value = stack[-1]
+                if not isinstance(value, float):
+                    raise self._error(closure, ip, "Operand must be a number.")
+                stack[-1] = -value
+            elif op == PRINT:
+                write_line(stringify(pop()))
+            elif op == CLOSURE:
+                function = constants[code[ip] << 8 | code[ip + 1]]
+                ip += 2
+                upvalues: list[Upvalue] = []
+                for _ in range(function.upvalue_count):
+                    if code[ip]:
+                        upvalues.append(self._capture_upvalue(base + code[ip + 1]))
+                    else:
+                        upvalues.append(closure.upvalues[code[ip + 1]])
+                    ip += 2
+                push(Closure(function, upvalues))
+            elif op == CLOSE_UPVALUE:
+                self._close_upvalues(len(stack) - 1)
+                pop()
+            elif op == CLASS:
+                push(LoxClass(constants[code[ip] << 8 | code[ip + 1]], None, {}))
+                ip += 2
+            elif op == METHOD:
+                method = pop()
+                stack[-1]._methods[constants[code[ip] << 8 | code[ip + 1]]] = method
+                ip += 2
+            elif op == INHERIT:
+                superclass = stack[-2]
+                if not isinstance(superclass, LoxClass):
+                    raise self._error(closure, ip, "Superclass must be a class.")
+                subclass = pop()
+                subclass.superclass = superclass
+                subclass._methods.update(superclass._methods)
+            elif op == GET_SUPER:
+                name = constants[code[ip] << 8 | code[ip + 1]]
+                ip += 2
+                method = pop()._methods.get(name)
+                if method is None:
+                    raise self._error(closure, ip, f"Undefined property '{name}'.")
+                stack[-1] = LoxBoundMethod(stack[-1], method)
+            elif op == SUPER_INVOKE:
+                name = constants[code[ip] << 8 | code[ip + 1]]
+                argc = code[ip + 2]
+                ip += 3
+                callee = pop()._methods.get(name)
+                if callee is None:
+                    raise self._error(closure, ip, f"Undefined property '{name}'.")
+                function = callee.function
+                if argc != function.arity:
+                    raise self._error(
+                        closure,
+                        ip,
+                        f"Expected {function.arity} arguments but got {argc}.",
+                    )
+                if len(frames) >= max_frames:
+                    raise self._stack_overflow(closure, ip)
+                fuel -= 1
+                if fuel < 0:
+                    fuel = self._refuel(closure, ip)
+                frame.ip = ip
+                frame = CallFrame(callee, 0, len(stack) - argc - 1)
+                frames.append(frame)
+                closure = callee
+                code = function.chunk.code
+                constants = function.chunk.constants
+                caches = function.chunk.caches
+                ip = 0
+                base = frame.base
+            else:
+                raise self._error(closure, ip, f"Unknown opcode {op}.")